@@ -5,13 +5,15 @@ This module handles communication between the edge device (Jetson/Mac)
 and the ClientBridge website backend.
 """
 
-import requests
 import base64
 import cv2
 import numpy as np
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 
+# requests is imported inside the request methods, so importing this module
+# (CLI paths, the supervisor) does not pay for it
+
 
 @dataclass
 class APIResponse:
@@ -22,6 +24,7 @@ class APIResponse:
     customer_id: Optional[int] = None
     visit_count: Optional[int] = None
     similarity: Optional[float] = None  # For returning customers
+    superseded: bool = False  # True if an earlier (speculative) result was reverted
 
 
 class ClientBridgeAPI:
@@ -128,6 +131,8 @@ class ClientBridgeAPI:
         Returns:
             True if API is healthy, False otherwise
         """
+        import requests
+        
         try:
             response = requests.get(
                 f"{self.base_url}/api/edge/health",
@@ -156,6 +161,8 @@ class ClientBridgeAPI:
         Returns:
             APIResponse with success status and customer details
         """
+        import requests
+        
         try:
             payload = {
                 "personId": person_id,
@@ -209,6 +216,8 @@ class ClientBridgeAPI:
         Returns:
             APIResponse with success status and updated visit count
         """
+        import requests
+        
         try:
             payload = {
                 "personId": person_id,
@@ -249,7 +258,8 @@ class ClientBridgeAPI:
         self,
         embedding: np.ndarray,
         frame: Optional[np.ndarray] = None,
-        bbox: tuple = None
+        bbox: tuple = None,
+        supersedes: Optional[APIResponse] = None
     ) -> APIResponse:
         """
         Send embedding to server for identification.
@@ -257,10 +267,16 @@ class ClientBridgeAPI:
         
         This is the PRIMARY method for the new server-side matching architecture.
         
+        With supersedes, this is a refinement of an earlier (speculative) result
+        for the same person: the server first reverts that result - removes the
+        customer it created, or takes back the visit it counted - then matches
+        the new embedding as usual.
+        
         Args:
             embedding: 512-dimensional face embedding from InsightFace
             frame: Best frame of the visitor's face (optional, for photo storage)
             bbox: (x1, y1, x2, y2) bounding box for face crop (from InsightFace detection)
+            supersedes: Earlier successful response for this person to replace
             
         Returns:
             APIResponse with:
@@ -269,6 +285,8 @@ class ClientBridgeAPI:
                 - visit_count: Total number of visits
                 - similarity: Match similarity (only for returning customers)
         """
+        import requests
+        
         try:
             payload = {
                 "embedding": embedding.tolist(),  # Convert numpy to list
@@ -278,6 +296,12 @@ class ClientBridgeAPI:
             if frame is not None:
                 payload["imageBase64"] = self._frame_to_base64(frame, bbox)
             
+            if supersedes is not None:
+                payload["supersedes"] = {
+                    "customerId": supersedes.customer_id,
+                    "status": supersedes.status
+                }
+            
             response = requests.post(
                 f"{self.base_url}/api/edge/identify",
                 json=payload,
@@ -293,7 +317,50 @@ class ClientBridgeAPI:
                 status=data.get("status"),  # "new" or "returning"
                 customer_id=data.get("customerId"),
                 visit_count=data.get("visitCount"),
-                similarity=data.get("similarity")
+                similarity=data.get("similarity"),
+                superseded=data.get("superseded", False)
+            )
+            
+        except requests.exceptions.Timeout:
+            return APIResponse(success=False, message="Request timed out")
+        except requests.exceptions.ConnectionError:
+            return APIResponse(success=False, message="Could not connect to server")
+        except Exception as e:
+            return APIResponse(success=False, message=str(e))
+
+    
+    def report_counts(self, camera_id: str, periods: List[Dict[str, Any]]) -> APIResponse:
+        """
+        Report anonymous footfall counts (people_count cameras).
+        
+        Args:
+            camera_id: Camera ID from cameras.yaml
+            periods: [{"start": ISO time, "end": ISO time, "entries": int, "exits": int}, ...]
+            
+        Returns:
+            APIResponse with success status (on failure the caller keeps the periods and resends)
+        """
+        import requests
+        
+        try:
+            payload = {
+                "locationId": self.location_id,
+                "cameraId": camera_id,
+                "periods": periods
+            }
+            
+            response = requests.post(
+                f"{self.base_url}/api/edge/counts",
+                json=payload,
+                headers=self._get_headers(),
+                timeout=self.timeout
+            )
+            
+            data = response.json()
+            
+            return APIResponse(
+                success=data.get("success", False),
+                message=data.get("message", "")
             )
             
         except requests.exceptions.Timeout:
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Online Burst Scoring Module
+Scores capture-burst frames on a worker thread while the capture is running.
+
+Instead of storing every (hires, lowres) pair and scoring afterwards, frames
+are queued as they arrive and scored concurrently. Only the top-K frames by
+quality score are retained; hires data for everything else is dropped as soon
+as it is scored. Burst memory is bounded by the retention capacity, and the
+scoring phase ends almost as soon as the capture does.
+
+The scorer also tells the capture loop when the burst can end early: once
+enough frames have passed the quality gate with margin, or once the face has
+been missing for several consecutive frames (person left the ROI).
+
+An optional on_pass callback sees the full frame of every complete score
+that passes the gate (used for speculative identification), and external
+code can end the burst with request_stop().
+
+With compact_scale > 0, retained frames are reduced to a padded face region
+(frame_store.compact_frame) before they enter the heap, so the top-K no longer
+pin full 4K decode buffers.
+
+MultiFaceBurstScorer handles several people in the same burst: YuNet runs
+once per frame, each detected face is assigned to the person (lane) whose
+face it continues, and every lane is an OnlineBurstScorer fed the
+precomputed face, so each person keeps its own scores and top-K.
+"""
+
+import heapq
+import logging
+import queue
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from face_tracker import BBox, bbox_iou
+from frame_quality import (
+    compute_quality_score, detect_faces, FaceLocator, KEYPOINT_NAMES, QualityScore, SessionTable, SESSION_DTYPE
+)
+from frame_store import FrameStore, compact_frame
+
+logger = logging.getLogger(__name__)
+
+# Seconds finish() waits to hand the stop sentinel to the workers and for each to exit
+SHUTDOWN_TIMEOUT_SEC = 5.0
+
+
+def _stop_workers(work_queue: queue.Queue, threads: List[threading.Thread], name: str) -> None:
+    """
+    Send one stop sentinel per worker and join them, without blocking forever.
+
+    If the workers stopped consuming (they should not - per-frame errors are
+    caught), a full queue would block put() indefinitely and hang the capture
+    loop; its pending frames are discarded instead.
+    """
+    for sent in range(len(threads)):
+        try:
+            work_queue.put(None, timeout=SHUTDOWN_TIMEOUT_SEC)
+        except queue.Full:
+            logger.error(f"{name}: workers not consuming frames, discarding {work_queue.qsize()} queued")
+            while True:
+                try:
+                    work_queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                for _ in range(len(threads) - sent):
+                    work_queue.put_nowait(None)
+            except queue.Full:
+                pass
+            break
+    for thread in threads:
+        thread.join(timeout=SHUTDOWN_TIMEOUT_SEC)
+        if thread.is_alive():
+            logger.error(f"{name}: worker {thread.name} did not stop within {SHUTDOWN_TIMEOUT_SEC:g}s")
+
+
+class OnlineBurstScorer:
+    """
+    Concurrent scorer with bounded top-K frame retention.
+
+    Usage:
+        scorer = OnlineBurstScorer(top_k=5, min_score=350)
+        scorer.start()
+        for idx, (hires, lowres) in enumerate(burst):
+            scorer.submit(idx, hires, lowres, timestamp)
+        scored = scorer.finish()  # SessionTable, best first
+
+    Frame trimming (skip_start/skip_end) is applied in finish(), once the burst
+    length is known. The heap keeps skip_start + skip_end extra slots so the
+    top-K survive trimming.
+    """
+
+    def __init__(
+        self,
+        top_k: int = 5,
+        min_score: Optional[float] = None,
+        skip_start: int = 0,
+        skip_end: int = 0,
+        queue_size: int = 8,
+        early_exit: bool = True,
+        stop_after_passed: int = 0,
+        stop_margin: float = 1.0,
+        stop_after_missed: int = 0,
+        num_workers: int = 1,
+        compact_scale: float = 0.0,
+        thumb_width: int = 0,
+        on_pass: Optional[Callable[[int, np.ndarray, np.ndarray, QualityScore,
+                                    Optional[np.ndarray], float], None]] = None,
+        locator: Optional[FaceLocator] = None
+    ):
+        """
+        Args:
+            top_k: Number of frames to return from finish()
+            min_score: Quality gate used for early-exit scoring
+            skip_start: Number of frames to drop from start (person entering)
+            skip_end: Number of frames to drop from end (person leaving)
+            queue_size: Max frames waiting to be scored (further frames are dropped)
+            early_exit: Cut scoring short below the gate / current top-K cutoff
+            stop_after_passed: Request stop once this many frames scored >= min_score × stop_margin (0 = never)
+            stop_margin: Multiplier on min_score for a frame to count towards stop_after_passed
+            stop_after_missed: Request stop after this many consecutive frames without a face (0 = never)
+            num_workers: Scoring threads (each uses its own YuNet instance)
+            compact_scale: Keep only a face region this many bbox sizes wide for
+                           retained frames (0 = keep full frames)
+            thumb_width: Context thumbnail width for compact frames (0 = none)
+            on_pass: Called as on_pass(idx, hires, lowres, score, keypoints, det_score) from
+                     the scoring thread for each frame past skip_start with a complete
+                     score >= min_score; keypoints are this scorer's face's (5, 2) YuNet
+                     landmarks in lowres coordinates (None without an external or
+                     bbox-local detection pass)
+            locator: Bbox-local detection seeded with the trigger face (None = full-frame YuNet)
+        """
+        self.top_k = top_k
+        self.min_score = min_score
+        self.skip_start = skip_start
+        self.skip_end = skip_end
+        self.early_exit = early_exit
+        self.stop_after_passed = stop_after_passed
+        self.stop_margin = stop_margin
+        self.stop_after_missed = stop_after_missed
+        self.capacity = top_k + skip_start + skip_end
+        self.num_workers = max(1, num_workers)
+        self.compact_scale = compact_scale
+        self.thumb_width = thumb_width
+        self.on_pass = on_pass
+        self.locator = locator
+        self._stop_request: Optional[str] = None
+        self.last_bbox: Optional[Tuple[int, int, int, int]] = None  # Face box in the latest frame with a face
+        self._last_face_idx = -1
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._heap: List[Tuple] = []  # (total, idx, timestamp, hires, lowres, score, thumbnail, origin, keypoints, det_score)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+        # Per-burst counters
+        self.frames_submitted = 0
+        self.frames_dropped = 0  # Queue full - scorer fell behind
+        self.frames_scored = 0
+        self.frames_with_face = 0
+        self.frames_failed = 0  # Scoring raised - counted as a frame without a face
+        self.frames_passed = 0  # Frames past skip_start with score >= min_score × stop_margin
+        self.consecutive_missed = 0
+
+    def start(self) -> None:
+        """Start the scoring worker threads."""
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"burst-scorer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, idx: int, frame_hires: np.ndarray, frame_lowres: np.ndarray,
+               timestamp: float = 0.0) -> bool:
+        """
+        Queue a frame for scoring (non-blocking).
+
+        Args:
+            idx: Frame index within the burst
+            frame_hires: Cropped hires frame (kept if the frame makes the top-K)
+            frame_lowres: Resized frame used for scoring
+            timestamp: Seconds since capture start
+
+        Returns:
+            False if the queue was full and the frame was dropped
+        """
+        self.frames_submitted += 1
+        try:
+            self._queue.put_nowait((idx, timestamp, frame_hires, frame_lowres))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def _cutoff(self) -> Optional[float]:
+        """Current early-exit cutoff: max(gate, lowest retained score when heap is full)."""
+        if not self.early_exit:
+            return None
+        cutoff = self.min_score
+        with self._lock:
+            if len(self._heap) >= self.capacity:
+                lowest = self._heap[0][0]
+                cutoff = lowest if cutoff is None else max(cutoff, lowest)
+        return cutoff
+
+    def _run(self) -> None:
+        """Worker loop: score frames until a None sentinel arrives."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self.process(*item)
+            except Exception:
+                logger.exception(f"Scoring burst frame {item[0]} failed")
+                self.record_failure()
+
+    def record_failure(self) -> None:
+        """Count a frame whose scoring raised as scored without a face."""
+        with self._lock:
+            self.frames_scored += 1
+            self.frames_failed += 1
+            self.consecutive_missed += 1
+
+    def process(self, idx: int, timestamp: float, frame_hires: np.ndarray, frame_lowres: np.ndarray,
+                face: Optional[Tuple[BBox, dict]] = None, detected: bool = False) -> None:
+        """
+        Score one frame and update retention (called by the worker threads).
+
+        Args:
+            idx: Frame index within the burst
+            timestamp: Seconds since capture start
+            frame_hires: Cropped hires frame
+            frame_lowres: Resized frame used for scoring
+            face: (bbox, landmarks) of this scorer's face from an external detection pass
+            detected: face comes from an external detection pass (None = face absent);
+                      otherwise YuNet runs here (in the locator window, else on the
+                      full frame scoring the largest face)
+        """
+        if not detected and self.locator is not None:
+            face, detected = self.locator.detect(frame_lowres, timestamp), True
+        if detected:
+            score = None if face is None else compute_quality_score(
+                frame_lowres, bbox=face[0], landmarks=face[1], cutoff=self._cutoff())
+        else:
+            score = compute_quality_score(frame_lowres, cutoff=self._cutoff())
+        keypoints, det_score = None, 0.0
+        if face is not None:
+            keypoints = np.array([face[1][name] for name in KEYPOINT_NAMES], dtype=np.float32)
+            det_score = face[1]['score']
+
+        if (self.on_pass is not None and score is not None and self.min_score is not None
+                and idx >= self.skip_start and not score.partial and score.total >= self.min_score):
+            self.on_pass(idx, frame_hires, frame_lowres, score, keypoints, det_score)
+
+        # Compact only frames that will enter the heap (outside the lock)
+        thumbnail, origin = None, (0, 0)
+        if score is not None and self.compact_scale > 0 and self._would_retain(score.total):
+            frame_hires, frame_lowres, thumbnail, origin = compact_frame(
+                frame_hires, frame_lowres, score.bbox, self.compact_scale, self.thumb_width)
+
+        with self._lock:
+            self.frames_scored += 1
+            if score is None:
+                self.consecutive_missed += 1
+                return
+            self.frames_with_face += 1
+            self.consecutive_missed = 0
+            if idx > self._last_face_idx:
+                self._last_face_idx = idx
+                self.last_bbox = score.bbox
+
+            if (self.min_score is not None and idx >= self.skip_start and not score.partial
+                    and score.total >= self.min_score * self.stop_margin):
+                self.frames_passed += 1
+
+            entry = (score.total, idx, timestamp, frame_hires, frame_lowres, score, thumbnail, origin,
+                     keypoints, det_score)
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, entry)
+            elif score.total > self._heap[0][0]:
+                # Evicted frame's hires/lowres are released here
+                heapq.heapreplace(self._heap, entry)
+
+    def _would_retain(self, total: float) -> bool:
+        """Whether a frame with this score would currently enter the heap."""
+        with self._lock:
+            return len(self._heap) < self.capacity or total > self._heap[0][0]
+
+    def request_stop(self, reason: str) -> None:
+        """Ask the capture loop to end the burst (reported as the stop reason)."""
+        self._stop_request = reason
+
+    def stop_reason(self) -> Optional[str]:
+        """
+        Check whether the capture can end early.
+
+        Returns:
+            A reason passed to request_stop(),
+            "quality" if enough frames passed the gate with margin,
+            "face_lost" if the face has been missing for too many frames,
+            None to keep capturing
+        """
+        if self._stop_request is not None:
+            return self._stop_request
+        if self.stop_after_passed and self.frames_passed >= self.stop_after_passed:
+            return "quality"
+        if self.stop_after_missed and self.consecutive_missed >= self.stop_after_missed:
+            return "face_lost"
+        return None
+
+    def finish(self, total_frames: Optional[int] = None, trim_tail: bool = True) -> SessionTable:
+        """
+        Drain the queue, stop the worker, and return the retained frames.
+
+        Args:
+            total_frames: Burst length used for tail trimming (default: frames submitted)
+            trim_tail: Apply skip_end trimming (skip for bursts stopped on quality,
+                       where the last frames are not the person leaving)
+
+        Returns:
+            SessionTable of the retained frames, sorted by total score descending
+        """
+        _stop_workers(self._queue, self._threads, "Online scorer")
+        self._threads = []
+
+        if total_frames is None:
+            total_frames = self.frames_submitted
+
+        with self._lock:
+            entries = sorted(self._heap, key=lambda e: e[0], reverse=True)
+            self._heap = []
+
+        # Trim frames from start and end (same rule as select_best_frame)
+        skip_end = self.skip_end if trim_tail else 0
+        if self.skip_start + skip_end < total_frames:
+            end = total_frames - skip_end
+            entries = [e for e in entries if self.skip_start <= e[1] < end]
+
+        if self.frames_dropped:
+            logger.warning(f"Online scorer fell behind: {self.frames_dropped} frames dropped")
+        if self.frames_failed:
+            logger.warning(f"Online scorer: {self.frames_failed} frames failed to score")
+
+        entries = entries[:self.top_k]
+        store = FrameStore()
+        rows = np.zeros(len(entries), dtype=SESSION_DTYPE)
+        for i, (_, idx, timestamp, hires, lowres, score, thumbnail, origin, keypoints, det_score) in enumerate(entries):
+            SessionTable.set_row(rows, i, idx, score, store.add(hires, lowres, thumbnail), timestamp,
+                                 det_score=det_score, crop_origin=origin, keypoints=keypoints)
+        logger.debug(f"Retained {len(entries)} frames, {store.nbytes() / 1e6:.1f} MB")
+        return SessionTable(rows, store)
+
+
+class MultiFaceBurstScorer:
+    """
+    Online scoring of several faces per burst frame.
+
+    Same capture-side interface as OnlineBurstScorer (start, submit,
+    stop_reason). YuNet runs once per frame on the worker threads; faces are
+    assigned to lanes greedily by IoU with each lane's last face box, then by
+    centroid distance. Each lane is an OnlineBurstScorer (no threads of its
+    own) and finish() returns one SessionTable per lane. Retained frames carry
+    their YuNet keypoints, so all lanes can be embedded in one aligned batch.
+
+    Usage:
+        scorer = MultiFaceBurstScorer([bbox_a, bbox_b], min_det_conf=0.8, top_k=5, min_score=350)
+        scorer.start()
+        ...submit frames...
+        reasons = scorer.finish()   # Per-lane stop reasons
+        tables = [lane.finish(total_frames=n, trim_tail=...) for lane in scorer.lanes]
+    """
+
+    def __init__(
+        self,
+        face_bboxes: List[BBox],
+        min_det_conf: float = 0.0,
+        iou_threshold: float = 0.3,
+        max_centroid_distance: float = 1.0,
+        queue_size: int = 8,
+        num_workers: int = 1,
+        **lane_kwargs
+    ):
+        """
+        Args:
+            face_bboxes: Trigger face box of each person, in lowres coordinates
+            min_det_conf: YuNet confidence for faces in burst frames
+            iou_threshold: Minimum IoU to continue a lane's face
+            max_centroid_distance: Otherwise, max centroid distance in box diagonals
+            queue_size: Frames waiting to be scored; extra frames are dropped
+            num_workers: Detection/scoring threads
+            **lane_kwargs: OnlineBurstScorer arguments for every lane (top_k, min_score, ...)
+        """
+        self.min_det_conf = min_det_conf
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.num_workers = max(1, num_workers)
+        self.lanes = [OnlineBurstScorer(queue_size=1, **lane_kwargs) for _ in face_bboxes]
+        for lane, bbox in zip(self.lanes, face_bboxes):
+            lane.last_bbox = tuple(bbox)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+
+    @property
+    def frames_with_face(self) -> int:
+        return sum(lane.frames_with_face for lane in self.lanes)
+
+    def start(self) -> None:
+        """Start the detection/scoring worker threads."""
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"multi-scorer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, idx: int, frame_hires: np.ndarray, frame_lowres: np.ndarray,
+               timestamp: float = 0.0) -> bool:
+        """Queue a frame for scoring (non-blocking). False if it was dropped."""
+        self.frames_submitted += 1
+        for lane in self.lanes:
+            lane.frames_submitted += 1
+        try:
+            self._queue.put_nowait((idx, timestamp, frame_hires, frame_lowres))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def _assign(self, faces: List[Tuple[BBox, dict]]) -> List[Optional[Tuple[BBox, dict]]]:
+        """Face for each lane (None if the lane's face is not in this frame)."""
+        pairs = []
+        for li, lane in enumerate(self.lanes):
+            last = lane.last_bbox
+            diag = max(np.hypot(last[2] - last[0], last[3] - last[1]), 1.0)
+            for fi, (bbox, _) in enumerate(faces):
+                iou = bbox_iou(last, bbox)
+                if iou >= self.iou_threshold:
+                    pairs.append(((0, -iou), li, fi))
+                    continue
+                dist = np.hypot((bbox[0] + bbox[2] - last[0] - last[2]) / 2,
+                                (bbox[1] + bbox[3] - last[1] - last[3]) / 2) / diag
+                if dist <= self.max_centroid_distance:
+                    pairs.append(((1, dist), li, fi))
+        pairs.sort(key=lambda p: p[0])
+
+        assigned: List[Optional[Tuple[BBox, dict]]] = [None] * len(self.lanes)
+        used_faces = set()
+        for _, li, fi in pairs:
+            if assigned[li] is None and fi not in used_faces:
+                assigned[li] = faces[fi]
+                used_faces.add(fi)
+        return assigned
+
+    def _run(self) -> None:
+        """Worker loop: detect once per frame, score each lane's face."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            idx, timestamp, frame_hires, frame_lowres = item
+            try:
+                faces = detect_faces(frame_lowres, min_confidence=self.min_det_conf)
+                assigned = self._assign(faces)
+            except Exception:
+                logger.exception(f"Detecting faces in burst frame {idx} failed")
+                for lane in self.lanes:
+                    lane.record_failure()
+                continue
+            for lane, face in zip(self.lanes, assigned):
+                try:
+                    lane.process(idx, timestamp, frame_hires, frame_lowres, face=face, detected=True)
+                except Exception:
+                    logger.exception(f"Scoring burst frame {idx} failed")
+                    lane.record_failure()
+
+    def stop_reason(self) -> Optional[str]:
+        """A stop reason once every lane can stop (the first lane's), else None."""
+        reasons = [lane.stop_reason() for lane in self.lanes]
+        if all(reason is not None for reason in reasons):
+            return reasons[0]
+        return None
+
+    def finish(self, total_frames: Optional[int] = None) -> List[Optional[str]]:
+        """
+        Drain the queue and stop the workers. Lanes are finished by their own
+        finish() (via select_best_frame), with per-lane tail trimming.
+
+        Returns:
+            Stop reason of each lane (None = ran the full duration)
+        """
+        _stop_workers(self._queue, self._threads, "Multi-face scorer")
+        self._threads = []
+        if self.frames_dropped:
+            logger.warning(f"Multi-face scorer fell behind: {self.frames_dropped} frames dropped")
+        return [lane.stop_reason() for lane in self.lanes]
@@ -13,6 +13,18 @@ from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
+# Entry directions accepted for `entry_line` (see face_tracker.EntryLine)
+ENTRY_DIRECTIONS = ("up", "down", "left", "right", "any")
+
+# ONNX Runtime option values (see face_recognition.session_options)
+ORT_EXECUTION_MODES = ("sequential", "parallel")
+ORT_GRAPH_OPTIMIZATIONS = ("disabled", "basic", "extended", "all")
+
+# Frame ranking and fusion frame selection (see visitor_counter.select_best_frame
+# and compute_fused_embedding)
+SCORING_MODES = ("metrics", "embedding_norm")
+FUSION_SELECTIONS = ("top", "diverse")
+
 # =============================================================================
 # DATA CLASSES
 # =============================================================================
@@ -28,6 +40,17 @@ class FaceRecognitionSettings:
     cooldown_seconds: int = 10
     min_quality_score: float = 350
     min_detection_score: float = 0.70
+    scoring_workers: int = 1  # Threads for burst scoring/embedding
+    scoring_mode: str = "metrics"  # "metrics" or "embedding_norm"
+    fusion_selection: str = "top"  # "top" or "diverse" (pose/time-spread fusion frames)
+    entry_line: Optional[Dict[str, Any]] = None  # {'points': [[x, y], [x, y]], 'direction': ...}, normalized
+    # ONNX Runtime (InsightFace) sessions - keep threads x cameras <= cores to avoid oversubscription
+    ort_intra_op_threads: int = 0  # 0 = ORT default (one per core)
+    ort_inter_op_threads: int = 0  # 0 = ORT default; only used with ort_execution_mode "parallel"
+    ort_execution_mode: str = "sequential"  # "sequential" or "parallel"
+    ort_graph_optimization: str = "all"  # "disabled", "basic", "extended" or "all"
+    ort_memory_arena: bool = True  # CPU memory arena (faster allocation, higher RSS)
+    ort_spin_wait: bool = True  # Idle threads spin (lower latency, CPU burn between runs)
 
 
 @dataclass
@@ -38,13 +61,23 @@ class LiveStreamSettings:
     jpeg_quality: int = 80
 
 
+@dataclass
+class PeopleCountSettings:
+    """Settings for anonymous people counting use case (no recognition)."""
+    target_width: int = 640  # Faces only need to be detectable, not recognizable
+    process_every_n_frames: int = 2
+    motion_threshold: float = 0.2  # % of motion-thumbnail pixels changed to run detection; 0 = always detect
+    report_interval_sec: float = 60.0  # Seconds between count reports to the server
+    entry_line: Optional[Dict[str, Any]] = None  # Required: counting line (same format as face_recognition)
+
+
 @dataclass
 class CameraConfig:
     """Configuration for a single camera."""
     id: str
     name: str
     rtsp_url: str
-    use_case: str  # "face_recognition" or "live_stream"
+    use_case: str  # "face_recognition", "live_stream" or "people_count"
     enabled: bool = True
     settings: Dict[str, Any] = field(default_factory=dict)
     
@@ -61,6 +94,28 @@ class CameraConfig:
             cooldown_seconds=self.settings.get('cooldown_seconds', 10),
             min_quality_score=self.settings.get('min_quality_score', 350),
             min_detection_score=self.settings.get('min_detection_score', 0.70),
+            scoring_workers=self.settings.get('scoring_workers', 1),
+            scoring_mode=self.settings.get('scoring_mode', 'metrics'),
+            fusion_selection=self.settings.get('fusion_selection', 'top'),
+            entry_line=self.settings.get('entry_line'),
+            ort_intra_op_threads=self.settings.get('ort_intra_op_threads', 0),
+            ort_inter_op_threads=self.settings.get('ort_inter_op_threads', 0),
+            ort_execution_mode=self.settings.get('ort_execution_mode', 'sequential'),
+            ort_graph_optimization=self.settings.get('ort_graph_optimization', 'all'),
+            ort_memory_arena=self.settings.get('ort_memory_arena', True),
+            ort_spin_wait=self.settings.get('ort_spin_wait', True),
+        )
+    
+    def get_people_count_settings(self) -> PeopleCountSettings:
+        """Get typed people counting settings."""
+        if self.use_case != "people_count":
+            raise ValueError(f"Camera {self.id} is not configured for people_count")
+        return PeopleCountSettings(
+            target_width=self.settings.get('target_width', 640),
+            process_every_n_frames=self.settings.get('process_every_n_frames', 2),
+            motion_threshold=self.settings.get('motion_threshold', 0.2),
+            report_interval_sec=self.settings.get('report_interval_sec', 60.0),
+            entry_line=self.settings.get('entry_line'),
         )
     
     def get_live_stream_settings(self) -> LiveStreamSettings:
@@ -256,8 +311,46 @@ def validate_config(config: SystemConfig) -> List[str]:
             errors.append(f"Camera {cam.id}: rtsp_url is required")
         
         # Check use case
-        if cam.use_case not in ("face_recognition", "live_stream"):
+        if cam.use_case not in ("face_recognition", "live_stream", "people_count"):
             errors.append(f"Camera {cam.id}: invalid use_case '{cam.use_case}'")
+        
+        # Check entry line (normalized end points + direction); people counting counts crossings of it
+        entry_line = cam.settings.get('entry_line') if cam.use_case in ("face_recognition", "people_count") else None
+        if entry_line is None and cam.use_case == "people_count":
+            errors.append(f"Camera {cam.id}: people_count requires settings.entry_line")
+        if entry_line is not None:
+            points = entry_line.get('points') if isinstance(entry_line, dict) else None
+            if (not isinstance(points, list) or len(points) != 2
+                    or not all(isinstance(p, list) and len(p) == 2
+                               and all(isinstance(v, (int, float)) and 0 <= v <= 1 for v in p) for p in points)):
+                errors.append(f"Camera {cam.id}: entry_line.points must be two [x, y] pairs in 0-1")
+            elif points[0] == points[1]:
+                errors.append(f"Camera {cam.id}: entry_line end points must differ")
+            if isinstance(entry_line, dict) and entry_line.get('direction', 'any') not in ENTRY_DIRECTIONS:
+                errors.append(f"Camera {cam.id}: invalid entry_line.direction '{entry_line.get('direction')}'")
+            if isinstance(entry_line, dict) and not isinstance(entry_line.get('capture_inside_start', True), bool):
+                errors.append(f"Camera {cam.id}: entry_line.capture_inside_start must be true or false")
+            inside_band = entry_line.get('inside_band', 0.1) if isinstance(entry_line, dict) else 0.1
+            if not isinstance(inside_band, (int, float)) or not 0 < inside_band <= 1:
+                errors.append(f"Camera {cam.id}: entry_line.inside_band must be in 0-1")
+            edge_margin = entry_line.get('edge_margin', 0.05) if isinstance(entry_line, dict) else 0.05
+            if not isinstance(edge_margin, (int, float)) or not 0 <= edge_margin < 0.5:
+                errors.append(f"Camera {cam.id}: entry_line.edge_margin must be in 0-0.5")
+        
+        # Check ONNX Runtime session options
+        if cam.use_case == "face_recognition":
+            if cam.settings.get('scoring_mode', 'metrics') not in SCORING_MODES:
+                errors.append(f"Camera {cam.id}: invalid scoring_mode '{cam.settings['scoring_mode']}'")
+            if cam.settings.get('fusion_selection', 'top') not in FUSION_SELECTIONS:
+                errors.append(f"Camera {cam.id}: invalid fusion_selection '{cam.settings['fusion_selection']}'")
+            if cam.settings.get('ort_execution_mode', 'sequential') not in ORT_EXECUTION_MODES:
+                errors.append(f"Camera {cam.id}: invalid ort_execution_mode '{cam.settings['ort_execution_mode']}'")
+            if cam.settings.get('ort_graph_optimization', 'all') not in ORT_GRAPH_OPTIMIZATIONS:
+                errors.append(f"Camera {cam.id}: invalid ort_graph_optimization '{cam.settings['ort_graph_optimization']}'")
+            for key in ('ort_intra_op_threads', 'ort_inter_op_threads'):
+                value = cam.settings.get(key, 0)
+                if not isinstance(value, int) or value < 0:
+                    errors.append(f"Camera {cam.id}: {key} must be a non-negative integer")
     
     return errors
 
@@ -31,6 +31,91 @@ QUALITY_TOP_N_FRAMES: int = 5  # Number of top frames to show in debug output
 FRAMES_SKIP_START: int = 1  # Skip first N frames before scoring
 FRAMES_SKIP_END: int = 10    # Skip last N frames before scoring
 
+# Online scoring - score frames on a worker thread while the burst is captured.
+# Only the top K frames (plus FRAMES_SKIP_START + FRAMES_SKIP_END slots for
+# trimming) keep their hires data; everything else is dropped once scored.
+ONLINE_SCORING: bool = True
+ONLINE_SCORING_TOP_K: int = 5       # Frames kept for fusion/debug (>= EMBEDDING_FUSION_TOP_N)
+ONLINE_SCORING_QUEUE_SIZE: int = 8  # Frames waiting to be scored; extra frames are dropped
+
+# Compact burst storage (requires ONLINE_SCORING) - frames retained by the online
+# scorer keep only a padded face region (hires and lowres, owned copies) plus a
+# small context thumbnail for debug, instead of full frames whose hires part is
+# a view pinning the 4K decode buffer. The API upload crop (bbox + 50% padding)
+# fits inside a region of 2× the bbox.
+CAPTURE_COMPACT_FRAMES: bool = True
+CAPTURE_FACE_CROP_SCALE: float = 2.5  # Region size relative to the face bbox
+CAPTURE_THUMBNAIL_WIDTH: int = 320    # Context thumbnail width for debug (0 = none)
+
+# JPEG frame store - bursts kept in full (post-capture scoring, embedding_norm
+# mode, debug frame stream) hold hires frames JPEG-encoded in memory. Frames are
+# encoded on background threads as they arrive and decoded only when read
+# (embedding, debug output); scoring uses the raw lowres frames. Trades
+# encode/decode CPU for RAM; the session summary reports both.
+CAPTURE_JPEG_STORE: bool = False
+CAPTURE_JPEG_QUALITY: int = 95  # Higher = larger, closer to raw for embeddings
+CAPTURE_JPEG_WORKERS: int = 1   # Encoder threads (shared by all cameras)
+
+# Frame prefilter - cheap whole-ROI statistics (thumbnail mean/std, gradient
+# energy on sampled rows, ~1 ms) checked before YuNet. Frames that cannot yield a
+# usable face (lights off, IR switch-over, camera refocusing) skip detection and
+# never start a burst. Skips are counted by reason in the session summary.
+PREFILTER_ENABLED: bool = True
+PREFILTER_MIN_MEAN: float = 25.0      # Mean gray level below = dark
+PREFILTER_MAX_MEAN: float = 235.0     # Mean gray level above = overexposed
+PREFILTER_MIN_STD: float = 8.0        # Gray std below = no contrast
+PREFILTER_MIN_GRADIENT: float = 1.0   # Mean |horizontal gradient| below = blurred (0 = off)
+
+# Near-duplicate suppression - a burst frame is dropped before it is resized,
+# stored or scored if a 32x32 grayscale thumbnail around the trigger face differs
+# from the last kept frame by less than the threshold (mean absolute difference,
+# 0-255). Saves scoring work when the person stands still.
+CAPTURE_DEDUP_ENABLED: bool = True
+CAPTURE_DEDUP_THRESHOLD: float = 2.0  # ~sensor noise is < 1; slight head movement is > 3
+CAPTURE_DEDUP_MAX_SKIP: int = 4       # Keep a frame anyway after this many consecutive drops (0 = no limit)
+
+# Early burst termination (requires ONLINE_SCORING). Capture duration stays the ceiling.
+# Stop once EMBEDDING_FUSION_TOP_N frames scored >= MIN_QUALITY_SCORE × margin,
+# or once no face was found in N consecutive frames (person left the ROI).
+EARLY_STOP_ENABLED: bool = True
+EARLY_STOP_SCORE_MARGIN: float = 1.2   # 1.2 = 20% above the quality gate
+EARLY_STOP_FACE_LOST_FRAMES: int = 5   # Consecutive frames without a face
+
+# Bbox-local detection (metrics scoring, single-face bursts) - burst frames are
+# searched for the face only in a window around its previous bbox, shifted by the
+# estimated motion and padded by PAD face sizes on each side. A frame whose window
+# holds no face falls back to a full-frame search. YuNet cost scales with input
+# area, so a 3x3-face window instead of the whole frame cuts burst detection time.
+LOCAL_DETECTION_ENABLED: bool = True
+LOCAL_DETECTION_PAD: float = 1.0  # Window margin per side, in face widths/heights
+
+# Speculative identify (requires ONLINE_SCORING) - the first burst frame that
+# passes the quality gate is embedded and sent to the server while the burst is
+# still being captured. A confident returning match (similarity >= server
+# threshold + margin) is final and stops the burst. Otherwise the fused
+# embedding is compared with the speculative one; only if they differ is it sent,
+# flagged as superseding the speculative result (server reverts that result).
+SPECULATIVE_IDENTIFY: bool = False
+SPECULATIVE_CONFIDENT_MARGIN: float = 0.10     # Added to SIMILARITY_THRESHOLD
+SPECULATIVE_CONFIRM_SIMILARITY: float = 0.95   # cos(fused, speculative) that needs no refinement
+
+# ONNX Runtime session options for the InsightFace models (legacy defaults;
+# per-camera `ort_*` settings in cameras.yaml). Each camera worker is a separate
+# process with its own thread pools: with the ORT default (one intra-op thread per
+# core) several cameras oversubscribe the CPU. Keep intra-op threads x cameras
+# <= cores; `python test/ort_session_benchmark.py --cameras N` finds the best mix.
+ORT_INTRA_OP_THREADS: int = 0             # 0 = ORT default (one per core)
+ORT_INTER_OP_THREADS: int = 0             # 0 = ORT default (parallel execution mode only)
+ORT_EXECUTION_MODE: str = "sequential"    # "sequential" or "parallel"
+ORT_GRAPH_OPTIMIZATION: str = "all"       # "disabled", "basic", "extended", "all"
+ORT_MEMORY_ARENA: bool = True             # CPU memory arena: faster allocations, higher RSS
+ORT_SPIN_WAIT: bool = True                # Idle threads spin: lower latency, CPU burn between runs
+
+# Threads for burst scoring and embedding extraction (legacy default; per-camera
+# `scoring_workers` in cameras.yaml). Each thread gets its own YuNet instance;
+# the ONNX Runtime session is shared (run() is thread-safe and releases the GIL).
+SCORING_WORKERS: int = 1
+
 # Quality scoring - Multiplicative penalty system
 # Each factor independently impacts the score via: score × factor^(importance/5)
 # Importance scale: 0 = ignored, 5 = linear penalty, 10 = quadratic penalty
@@ -44,6 +129,36 @@ QUALITY_IMPORTANCE: dict = {
 
 QUALITY_BASE_SCORE: float = 1000.0  # Starting score before penalties
 
+# Face ROI normalization - resample each face ROI (grayscale) to a fixed
+# size x size before computing sharpness/brightness/contrast. Makes scoring cost
+# constant per frame and sharpness thresholds independent of face size.
+# 0 = use the native ROI (original behavior). Thresholds may need recalibration.
+QUALITY_ROI_CANONICAL_SIZE: int = 0  # e.g. 112
+QUALITY_SHARPNESS_ESTIMATOR: str = "laplacian"  # laplacian, laplacian32, tenengrad, fft
+
+# Early exit: metrics are evaluated cheapest-first (Laplacian last) and a frame
+# stops scoring once its score can no longer reach MIN_QUALITY_SCORE or the
+# current top EMBEDDING_FUSION_TOP_N frames of the burst.
+# Metrics with importance 0 are never computed.
+QUALITY_EARLY_EXIT: bool = True
+
+# Batch scoring kernels (quality_kernels.py) for post-capture burst scoring:
+# face size, pose, frontality, brightness and contrast for the whole burst in
+# one fused call instead of per-frame scalar Python.
+# "python" = per-frame reference path, "auto" = numba if installed else numpy,
+# "numba", "numpy". Online (per-frame) scoring always uses the reference path.
+QUALITY_KERNEL_BACKEND: str = "python"
+
+# Frame ranking mode:
+# "metrics"        = multiplicative frame_quality score (above)
+# "embedding_norm" = raw ArcFace embedding norm from one batched recognition pass
+#                    over aligned crops; the embeddings are reused for fusion.
+#                    Online scoring is bypassed (the burst is embedded after capture).
+QUALITY_SCORING_MODE: str = "metrics"
+# Embedding norm that maps to a score of 1000 in embedding_norm mode, so
+# MIN_QUALITY_SCORE keeps its meaning. Calibrate with test/embedding_norm_benchmark.py
+EMBEDDING_NORM_REFERENCE: float = 20.0
+
 # =============================================================================
 # QUALITY SCORING THRESHOLDS
 # =============================================================================
@@ -68,6 +183,16 @@ QUALITY_THRESHOLDS: dict = {
         'critical': 50,         # Laplacian variance below 50 = very blurry
         'good': 300,            # Above 300 = sharp enough
     },
+    # Alternative sharpness estimators (see QUALITY_SHARPNESS_ESTIMATOR).
+    # Starting points - calibrate with test/sharpness_estimator_benchmark.py
+    'sharpness_tenengrad': {
+        'critical': 1500,       # Mean squared Sobel magnitude
+        'good': 6000,
+    },
+    'sharpness_fft': {
+        'critical': 0.02,       # High-frequency share of spectral energy
+        'good': 0.10,
+    },
     'brightness': {
         'critical_low': 30,     # Below 30 = too dark
         'good_low': 80,         # 80-180 = optimal range
@@ -100,6 +225,35 @@ SIMILARITY_THRESHOLD: float = 0.50  # Cosine similarity threshold for matching
                                      # Higher = fewer matches (risk: same person counted twice)
 
 COOLDOWN_SECONDS: int = 5  # Wait time before processing next person
+                           # (with the tracker: before retrying a track that was not identified)
+
+# Face tracking - detections are associated into tracks (IoU, then centroid
+# distance) and each track is identified once; a lingering person is not
+# captured again, and a second person does not wait for a global cooldown.
+TRACKER_ENABLED: bool = True
+TRACKER_IOU_THRESHOLD: float = 0.3
+TRACKER_MAX_CENTROID_DISTANCE: float = 1.0  # In track box diagonals, for boxes that no longer overlap
+TRACKER_MAX_AGE_SEC: float = 2.0            # Drop tracks not seen for this long
+TRACKER_KALMAN: bool = False                # Constant-velocity smoothing of track centroids
+
+# Entry line (requires TRACKER_ENABLED; legacy default - per-camera `entry_line` in
+# cameras.yaml). A capture starts only when a track's centroid crosses the line in
+# the entry direction; faces that never cross (staff walking past, people at the
+# counter, faces at the ROI edge) start no burst. Points are normalized (x, y) in
+# the cropped/resized processing frame; direction: up, down, left, right or any.
+# Tracks first seen just past the line, clear of the frame edges, are captured too
+# ('capture_inside_start', default True; 'inside_band' = max distance past the line,
+# default 0.1; 'edge_margin' = edge band, default 0.05).
+# e.g. {'points': [[0.0, 0.6], [1.0, 0.6]], 'direction': 'down'}
+ENTRY_LINE: dict = None  # None = every track may trigger a capture
+
+# Multi-face capture (requires ONLINE_SCORING, metrics scoring) - every face in
+# the trigger frame that needs capturing gets its own session in the same burst:
+# YuNet runs once per burst frame, faces are assigned to sessions (IoU, then
+# centroid distance as for tracking), and each session keeps its own scores and
+# fusion. Fusion candidates of all faces are embedded in one batched call.
+MULTI_FACE_ENABLED: bool = True
+MULTI_FACE_MAX: int = 4  # Largest faces captured per burst
 
 # =============================================================================
 # EMBEDDING FUSION SETTINGS
@@ -113,6 +267,16 @@ EMBEDDING_FUSION_WEIGHT_POWER: float = 0.3  # Soft weighting exponent
                                              # Higher = quality score matters more
                                              # 0.3 means 900 vs 300 score → 1.4x weight difference (not 3x)
 
+# Fusion frame selection: "top" = highest quality scores (usually consecutive
+# frames with the same pose); "diverse" = greedy selection that penalizes frames
+# close in pose (yaw/pitch) and time to frames already picked, so fewer
+# embeddings cover more of the burst.
+EMBEDDING_FUSION_SELECTION: str = "top"
+EMBEDDING_FUSION_DIVERSITY: float = 0.5        # Penalty weight 0-1 (0 = same as "top")
+EMBEDDING_FUSION_POSE_SCALE_DEG: float = 5.0   # Yaw/pitch distance at which frames stop looking alike
+EMBEDDING_FUSION_TIME_SCALE_SEC: float = 0.5   # Time distance at which frames stop looking alike
+EMBEDDING_FUSION_CANDIDATES: int = 8           # Fully scored frames to choose from in "diverse" mode
+
 # =============================================================================
 # QUALITY GATE THRESHOLDS (False Positive Prevention)
 # =============================================================================
@@ -145,6 +309,18 @@ else:
     # Mac / Development
     MODEL_DIR: str = os.path.join(_HOME, ".insightface/models")
 
+# Optimized ONNX Runtime model cache
+# The first worker start writes each InsightFace model's optimized graph here
+# (keyed by model hash, ORT version and session options); later starts load it
+# directly and skip graph optimization. Corrupt entries are detected and rebuilt.
+MODEL_CACHE_ENABLED: bool = True
+MODEL_CACHE_DIR: str = os.path.join(MODEL_DIR, "ort_cache")
+
+# Model warm-up at worker start
+# Runs synthetic inputs at the real frame/batch shapes through YuNet and every
+# InsightFace model before counting starts, so detector creation, ORT kernel
+# selection and arena growth don't land on the first visitor (or in the timing stats).
+MODEL_WARMUP_ENABLED: bool = True
 
 
 API_BASE_URL: str = "https://dashboard.smoothflow.ai"  # Production URL
@@ -1,15 +1,18 @@
 
-import cv2
 import numpy as np
 import logging
 import os
-from typing import Optional, Tuple, List
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, List
 
-# Suppress InsightFace download messages
-os.environ['INSIGHTFACE_LOG_LEVEL'] = '50'
+# InsightFace and ONNX Runtime are imported on first use, so importing this
+# module (CLI paths, the supervisor) does not pay for them
+if TYPE_CHECKING:
+    import onnxruntime as ort
 
-import insightface
-from insightface.app import FaceAnalysis
+from model_cache import cached_model_path, cached_session
 
 logger = logging.getLogger(__name__)
 
@@ -22,38 +25,215 @@ try:
     MODEL_NAME = cfg.INSIGHTFACE_MODEL
     MODEL_DIR = cfg.MODEL_DIR
     SIMILARITY_THRESHOLD = cfg.SIMILARITY_THRESHOLD
+    MODEL_CACHE_DIR = cfg.MODEL_CACHE_DIR if cfg.MODEL_CACHE_ENABLED else None
 except ImportError:
     MODEL_NAME = "buffalo_s"
     MODEL_DIR = "/home/mafiq/zmisc/models/insightface"
     SIMILARITY_THRESHOLD = 0.45
+    MODEL_CACHE_DIR = None
+
+# =============================================================================
+# ONNX RUNTIME SESSION OPTIONS
+# =============================================================================
+
+# Names of ort.ExecutionMode / ort.GraphOptimizationLevel members
+EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+# session_options() defaults = what InsightFace's own sessions get
+_DEFAULT_SESSION_OPTIONS = dict(intra_op_threads=0, inter_op_threads=0, execution_mode="sequential",
+                                graph_optimization="all", memory_arena=True, spin_wait=True)
+_session_config: Dict[str, Any] = {}  # Options that differ from the defaults
+
+def session_options(
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    execution_mode: str = "sequential",
+    graph_optimization: str = "all",
+    memory_arena: bool = True,
+    spin_wait: bool = True
+) -> 'ort.SessionOptions':
+    """
+    Build ORT session options.
+    
+    Args:
+        intra_op_threads: Threads inside one operator (0 = ORT default, one per core)
+        inter_op_threads: Threads across operators, parallel mode only (0 = ORT default)
+        execution_mode: "sequential" or "parallel"
+        graph_optimization: "disabled", "basic", "extended" or "all"
+        memory_arena: Keep the CPU memory arena (faster allocations, higher RSS)
+        spin_wait: Let idle pool threads spin (lower latency, burns CPU between runs)
+    """
+    import onnxruntime as ort
+    
+    so = ort.SessionOptions()
+    so.intra_op_num_threads = intra_op_threads
+    so.inter_op_num_threads = inter_op_threads
+    so.execution_mode = getattr(ort.ExecutionMode, EXECUTION_MODES[execution_mode])
+    so.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[graph_optimization])
+    so.enable_cpu_mem_arena = memory_arena
+    spin = "1" if spin_wait else "0"
+    so.add_session_config_entry("session.intra_op.allow_spinning", spin)
+    so.add_session_config_entry("session.inter_op.allow_spinning", spin)
+    return so
+
+def configure_sessions(**options) -> None:
+    """
+    Set the ORT session options (session_options() arguments) for the analyzer.
+    
+    Must be called before the first get_face_analyzer() in the process; each
+    camera worker is its own process, so options are per camera.
+    """
+    if _face_app is not None:
+        logger.warning("Face analyzer already created - ORT session options not applied")
+    _session_config.clear()
+    _session_config.update({k: v for k, v in options.items() if _DEFAULT_SESSION_OPTIONS.get(k) != v})
 
 # =============================================================================
 # FACE ANALYZER
 # =============================================================================
 
 _face_app = None
+_face_app_lock = threading.Lock()
+
+# Model weights loaded by a preloading parent (preload_weights), by model file.
+# Forked workers hand them to ORT as initializers instead of loading their own.
+_shared_weights: Dict[str, Dict[str, np.ndarray]] = {}
+_shared_values: List['ort.OrtValue'] = []  # Keeps the initializers alive for the sessions' lifetime
+
+def preload_weights(option_sets: List[Dict[str, Any]]) -> int:
+    """
+    Load the analyzer's model weights to share with forked workers (copy-on-write).
+    
+    ORT sessions are not fork-safe (their thread pools do not survive fork), so
+    only the weights are loaded here; each worker still creates its own sessions
+    after the fork, with these arrays as initializers. The file a worker will
+    load is the optimized cache entry for its session options (written here if
+    missing), so the preloaded arrays are the ones its session actually uses.
+    
+    Args:
+        option_sets: session_options() arguments of each worker that will fork
+    
+    Returns:
+        Bytes of weights preloaded
+    """
+    import onnx
+    from onnx import numpy_helper
+    os.environ['INSIGHTFACE_LOG_LEVEL'] = '50'  # Suppress InsightFace download messages
+    from insightface.utils.storage import ensure_available
+    
+    model_dir = ensure_available('models', MODEL_NAME, root=MODEL_DIR)
+    model_files = sorted(f for f in os.listdir(model_dir) if f.endswith('.onnx'))
+    providers = ['CPUExecutionProvider']
+    
+    for options in option_sets:
+        options = dict(_DEFAULT_SESSION_OPTIONS, **options)
+        for name in model_files:
+            path = os.path.join(model_dir, name)
+            if MODEL_CACHE_DIR is not None:
+                cached_session(path, options, session_options, MODEL_CACHE_DIR, providers=providers)
+                path = cached_model_path(path, options, MODEL_CACHE_DIR, providers)
+            if path not in _shared_weights:
+                model = onnx.load(path)
+                _shared_weights[path] = {t.name: numpy_helper.to_array(t) for t in model.graph.initializer}
+    
+    return sum(a.nbytes for weights in _shared_weights.values() for a in weights.values())
+
+def _share_weights(so: 'ort.SessionOptions', path: str) -> None:
+    """Point a session at the preloaded weights of its model file, if any."""
+    weights = _shared_weights.get(path)
+    if not weights:
+        return
+    import onnxruntime as ort
+    
+    # Prepacking copies weights into kernel-specific layouts - private memory per worker
+    so.add_session_config_entry("session.disable_prepacking", "1")
+    for name, array in weights.items():
+        value = ort.OrtValue.ortvalue_from_numpy(array)
+        _shared_values.append(value)
+        so.add_initializer(name, value)
+
+@contextmanager
+def _configured_sessions():
+    """
+    Route InsightFace's session creation through the session options and model cache.
+    
+    InsightFace's model zoo neither forwards session options nor exposes a
+    hook, so its session class is swapped for the duration of the analyzer
+    load. Sessions are still created as the original class (picklable).
+    
+    Yields:
+        List collecting each session's cache source ("hit", "miss" or "off")
+    """
+    from insightface.model_zoo import model_zoo
+    
+    session_class = model_zoo.PickableInferenceSession
+    options = dict(_DEFAULT_SESSION_OPTIONS, **_session_config)
+    sources = []
+    
+    def create(model_path, providers=None, **kwargs):
+        session, source = cached_session(model_path, options, session_options, MODEL_CACHE_DIR,
+                                         providers=providers, session_class=session_class,
+                                         configure=_share_weights, **kwargs)
+        sources.append(source)
+        return session
+    
+    model_zoo.PickableInferenceSession = create
+    try:
+        yield sources
+    finally:
+        model_zoo.PickableInferenceSession = session_class
 
 def get_face_analyzer():
-    """Get or initialize the face analyzer (singleton)."""
+    """
+    Get or initialize the face analyzer (singleton).
+    
+    Thread-safe: the analyzer is shared by all threads. ONNX Runtime's
+    InferenceSession.run is safe to call concurrently and releases the GIL,
+    so parallel embedding threads don't need their own sessions.
+    """
     global _face_app
     
-    if _face_app is None:
+    if _face_app is not None:
+        return _face_app
+    
+    with _face_app_lock:
+        if _face_app is not None:
+            return _face_app
+        
         logger.info("Initializing InsightFace model (first run downloads ~100MB)...")
         
+        os.environ['INSIGHTFACE_LOG_LEVEL'] = '50'  # Suppress InsightFace download messages
+        from insightface.app import FaceAnalysis
+        
         os.makedirs(MODEL_DIR, exist_ok=True)
         
         # Use CPU to prevent OOM on Jetson Orin Nano (shared memory)
         # GPU works for lightweight YuNet detection, but InsightFace detection/recognition
         # is too heavy for the remaining memory budget.
-        _face_app = FaceAnalysis(
-            name=MODEL_NAME,
-            root=MODEL_DIR,
-            providers=['CPUExecutionProvider']
-        )
+        with _configured_sessions() as sources:
+            app = FaceAnalysis(
+                name=MODEL_NAME,
+                root=MODEL_DIR,
+                providers=['CPUExecutionProvider']
+            )
+        if _session_config:
+            logger.info(f"ORT session options: {_session_config}")
+        if MODEL_CACHE_DIR is not None:
+            logger.info(f"Optimized model cache: {sources.count('hit')}/{len(sources)} loaded from {MODEL_CACHE_DIR}")
         
         # det_size affects detection accuracy vs speed
         # ctx_id=-1 uses CPU
-        _face_app.prepare(ctx_id=-1, det_size=(640, 640))
+        app.prepare(ctx_id=-1, det_size=(640, 640))
+        _face_app = app  # Publish only once fully prepared
         
         logger.info(f"InsightFace model '{MODEL_NAME}' loaded")
     
@@ -72,7 +252,7 @@ def extract_embeddings(frame: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray,
     
     Returns:
         List of (embedding, bbox, det_score) tuples for each detected face
-        - embedding: 512-dim normalized vector
+        - embedding: 512-dim raw vector (not normalized; see embedding_norm)
         - bbox: [x1, y1, x2, y2] face bounding box
         - det_score: detection confidence
     """
@@ -92,6 +272,53 @@ def extract_embeddings(frame: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray,
     
     return results
 
+def embedding_norm(embedding: np.ndarray) -> float:
+    """
+    L2 norm of a raw ArcFace embedding.
+    
+    The magnitude before normalization grows with how recognizable the face
+    is (sharp, frontal, well lit), so it works as a learned quality score.
+    """
+    return float(np.linalg.norm(embedding))
+
+def get_recognition_model():
+    """ArcFace recognition model of the shared analyzer (for batched calls without detection)."""
+    return get_face_analyzer().models['recognition']
+
+def extract_aligned_embeddings(
+    frames: List[np.ndarray],
+    keypoints: List[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batched recognition on aligned face crops, skipping InsightFace detection.
+    
+    Each face is aligned with norm_crop from its 5 keypoints (right eye, left eye,
+    nose, right mouth, left mouth - the same order YuNet returns), and all crops
+    go through the recognition model in a single forward pass.
+    
+    Args:
+        frames: BGR images, one face per image
+        keypoints: (5, 2) landmarks for each frame, in that frame's pixel coordinates
+    
+    Returns:
+        (embeddings, norms)
+        - embeddings: (N, 512) raw embeddings (not normalized, like extract_embeddings)
+        - norms: (N,) L2 norm of each embedding - higher = more recognizable face
+    """
+    if not frames:
+        return np.zeros((0, 512), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    
+    from insightface.utils import face_align
+    
+    rec = get_recognition_model()
+    size = rec.input_size[0]
+    crops = [
+        face_align.norm_crop(frame, landmark=np.asarray(kps, dtype=np.float32), image_size=size)
+        for frame, kps in zip(frames, keypoints)
+    ]
+    embeddings = rec.get_feat(crops)
+    return embeddings, np.linalg.norm(embeddings, axis=1)
+
 def extract_single_embedding(frame: np.ndarray) -> Optional[Tuple[np.ndarray, float]]:
     """
     Extract embedding for the largest/most prominent face in frame.
@@ -108,6 +335,47 @@ def extract_single_embedding(frame: np.ndarray) -> Optional[Tuple[np.ndarray, fl
     best = max(results, key=lambda x: x[2])
     return (best[0], best[2])
 
+def warm_up_analyzer(frame_shape: Tuple[int, ...], batch_sizes: Tuple[int, ...] = (1,)) -> Dict[str, float]:
+    """
+    Run synthetic inputs through every analyzer model at the real input shapes.
+    
+    The first run of an ORT session selects kernels and grows its memory arena,
+    which would otherwise land on the first visitor. Noise contains no faces,
+    so the per-face models are run directly rather than through app.get.
+    
+    Args:
+        frame_shape: Shape of the (cropped hires) frames passed to extract_embeddings
+        batch_sizes: Recognition batch sizes to run (single face, fused batch)
+    
+    Returns:
+        Milliseconds spent per model (detection includes the analyzer's frame preprocessing)
+    """
+    from insightface.utils import face_align
+    
+    app = get_face_analyzer()
+    rng = np.random.default_rng(0)
+    timings = {}
+    
+    start = time.perf_counter()
+    app.get(rng.integers(0, 256, frame_shape, dtype=np.uint8))
+    timings['detection'] = (time.perf_counter() - start) * 1000
+    
+    for name, model in app.models.items():
+        if name == 'detection':
+            continue
+        start = time.perf_counter()
+        if name == 'recognition':
+            # Batched path: norm_crop alignment + one forward pass per batch size
+            crop = rng.integers(0, 256, (*model.input_size[::-1], 3), dtype=np.uint8)
+            for n in batch_sizes:
+                extract_aligned_embeddings([crop] * n, [face_align.arcface_dst] * n)
+        else:
+            w, h = model.input_size
+            model.session.run(None, {model.input_name: rng.random((1, 3, h, w), dtype=np.float32)})
+        timings[name] = (time.perf_counter() - start) * 1000
+    
+    return timings
+
 # =============================================================================
 # SIMILARITY MATCHING
 # =============================================================================
@@ -168,6 +436,8 @@ def test_on_image(image_path: str):
     """Test face recognition on a single image."""
     logger.info(f"Testing on: {image_path}")
     
+    import cv2
+    
     frame = cv2.imread(image_path)
     if frame is None:
         logger.error(f"Cannot read image: {image_path}")
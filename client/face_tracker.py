@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Face Tracking Module
+Associates YuNet detections across frames so each person gets a track ID.
+
+The visitor counter used a global cooldown after every capture: a shopper
+lingering in front of the camera was captured again once the cooldown ran
+out, and a second person arriving right behind the first was ignored until
+it did. With tracks, each person runs one capture -> fuse -> identify cycle;
+the cooldown only applies to retrying a track whose capture produced no
+identification (low quality, no valid frames, API error).
+
+Association is greedy: IoU between the track's (predicted) box and the
+detection first, then centroid distance relative to the track's box size
+for fast movers whose boxes no longer overlap. With kalman=True, track
+centroids follow a constant-velocity Kalman filter, so the association
+uses the predicted position after gaps (e.g. the capture burst, during
+which the detection loop does not see frames).
+
+With an entry line, a track only becomes eligible for capture once its
+centroid crosses the line in the entry direction. Staff walking past, people
+standing at the counter and faces at the edge of the ROI never cross it and
+never start a burst. A track first seen just past the line on the entry side
+(within inside_band of it) and clear of the frame edges is eligible too
+(capture_inside_start): the person came through the line while the detector
+missed them (face too small, turned away or occluded). Tracks that start
+deeper inside - staff, people at the counter whose track expired and
+restarted - or at the side of the view stay gated.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BBox = Tuple[int, int, int, int]  # x1, y1, x2, y2
+
+
+class _CentroidKalman:
+    """Constant-velocity Kalman filter on the box centroid (state cx, cy, vx, vy)."""
+
+    def __init__(self, cx: float, cy: float, process_noise: float = 50.0, measurement_noise: float = 4.0):
+        self.x = np.array([cx, cy, 0.0, 0.0])
+        self.P = np.diag([measurement_noise, measurement_noise, 1e3, 1e3])
+        self.q = process_noise
+        self.R = np.eye(2) * measurement_noise
+
+    def predict(self, dt: float) -> Tuple[float, float]:
+        """Centroid predicted dt seconds ahead (does not modify the state)."""
+        return self.x[0] + self.x[2] * dt, self.x[1] + self.x[3] * dt
+
+    def update(self, cx: float, cy: float, dt: float) -> Tuple[float, float]:
+        """Advance dt seconds, fold in a measured centroid, return the filtered centroid."""
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        # White-noise acceleration model
+        G = np.array([[0.5 * dt * dt, 0], [0, 0.5 * dt * dt], [dt, 0], [0, dt]])
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + G @ G.T * self.q
+
+        H = np.eye(2, 4)
+        y = np.array([cx, cy]) - H @ self.x
+        S = H @ self.P @ H.T + self.R
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(4) - K @ H) @ self.P
+        return self.x[0], self.x[1]
+
+
+@dataclass
+class Track:
+    """One tracked face."""
+    track_id: int
+    bbox: BBox
+    first_seen: float
+    last_seen: float
+    hits: int = 1
+    last_capture: Optional[float] = None  # Time the last capture burst of this track ended
+    visitor_id: Optional[int] = None  # Set once the track was identified
+    avoided_since: float = 0.0  # Reference time for counting avoided re-identifications
+    entered: bool = False  # Crossed the entry line in the entry direction
+    exited: bool = False  # Crossed the entry line against the entry direction
+    gated: bool = False  # Was held back by the entry line at least once
+    start_side: int = 0  # Side of the entry line it was first seen on (1 entry side, -1 outside, 0 unknown)
+    appeared_inside: bool = False  # First seen just past the entry line, away from the frame edges
+    _kalman: Optional[_CentroidKalman] = field(default=None, repr=False)
+
+    @property
+    def identified(self) -> bool:
+        return self.visitor_id is not None
+
+
+def bbox_iou(a: BBox, b: BBox) -> float:
+    """Intersection over union of two (x1, y1, x2, y2) boxes."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _centroid(bbox: BBox) -> Tuple[float, float]:
+    return (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+
+
+def _shift(bbox: BBox, cx: float, cy: float) -> BBox:
+    """bbox moved so that its centroid is (cx, cy)."""
+    w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    x1, y1 = int(round(cx - w / 2)), int(round(cy - h / 2))
+    return (x1, y1, x1 + w, y1 + h)
+
+
+class EntryLine:
+    """
+    Virtual line a track must cross in the entry direction before it is captured.
+
+    Configured per camera (cameras.yaml `entry_line`) in normalized coordinates
+    of the processed frame:
+
+        entry_line:
+          points: [[0.0, 0.6], [1.0, 0.6]]   # (x, y), 0-1, of the cropped/resized frame
+          direction: down                    # up, down, left, right or any
+          capture_inside_start: true         # Tracks first seen just past the line may be captured
+          inside_band: 0.1                   # ...within this distance past it
+          edge_margin: 0.05                  # ...unless their box is this close to the frame edge
+
+    The entry side is the half-plane the entry direction points into; with
+    direction "any", or a direction parallel to the line, there is none.
+    inside_band and edge_margin are fractions of the frame height (up/down)
+    or width (left/right).
+    """
+
+    DIRECTIONS = {"up": (0.0, -1.0), "down": (0.0, 1.0), "left": (-1.0, 0.0), "right": (1.0, 0.0), "any": None}
+
+    def __init__(
+        self,
+        a: Tuple[float, float],
+        b: Tuple[float, float],
+        direction: str = "any",
+        frame_size: Optional[Tuple[int, int]] = None,
+        capture_inside_start: bool = True,
+        inside_band: float = 0.1,
+        edge_margin: float = 0.05
+    ):
+        """
+        Args:
+            a, b: Line end points in pixels of the processed frame
+            direction: Entry direction (key of DIRECTIONS)
+            frame_size: (width, height) of the processed frame (None = no inside starts)
+            capture_inside_start: Tracks first seen on the entry side within
+                inside_band of the line, clear of the frame edges, count as
+                entered for capture
+            inside_band: Max centroid distance past the line for an inside start,
+                as a fraction of the frame size along the entry direction
+            edge_margin: Edge band, as a fraction of the frame size, in which a
+                first box counts as coming in from the side of the view
+        """
+        if direction not in self.DIRECTIONS:
+            raise ValueError(f"Invalid entry direction '{direction}' (expected one of {', '.join(self.DIRECTIONS)})")
+        if a == b:
+            raise ValueError("Entry line end points must differ")
+        if not 0.0 < inside_band <= 1.0:
+            raise ValueError(f"Invalid entry line inside_band {inside_band} (expected 0 to 1)")
+        if not 0.0 <= edge_margin < 0.5:
+            raise ValueError(f"Invalid entry line edge_margin {edge_margin} (expected 0 to 0.5)")
+        self.a = np.asarray(a, dtype=np.float64)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.direction = direction
+        self.frame_size = frame_size
+        self.capture_inside_start = capture_inside_start and frame_size is not None
+        self.inside_band = inside_band
+        self.edge_margin = edge_margin
+
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any], frame_size: Tuple[int, int]) -> "EntryLine":
+        """
+        Build from a cameras.yaml `entry_line` mapping.
+
+        Args:
+            settings: {'points': [[x1, y1], [x2, y2]], 'direction': str, 'capture_inside_start': bool,
+                'inside_band': float, 'edge_margin': float}, normalized coordinates
+            frame_size: (width, height) of the processed frame
+
+        Raises:
+            ValueError: If the mapping is malformed
+        """
+        try:
+            (x1, y1), (x2, y2) = settings['points']
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("entry_line.points must be two [x, y] pairs")
+        w, h = frame_size
+        return cls((float(x1) * w, float(y1) * h), (float(x2) * w, float(y2) * h),
+                   settings.get('direction', 'any'), frame_size=(w, h),
+                   capture_inside_start=bool(settings.get('capture_inside_start', True)),
+                   inside_band=float(settings.get('inside_band', 0.1)),
+                   edge_margin=float(settings.get('edge_margin', 0.05)))
+
+    def _side(self, point: Tuple[float, float]) -> float:
+        """Signed side of point relative to the line (cross product)."""
+        d = self.b - self.a
+        return d[0] * (point[1] - self.a[1]) - d[1] * (point[0] - self.a[0])
+
+    def side(self, point: Tuple[float, float]) -> int:
+        """1 if point is on the entry side, -1 on the other side, 0 on the line or without an entry side."""
+        wanted = self.DIRECTIONS[self.direction]
+        if wanted is None:
+            return 0
+        d = self.b - self.a
+        entry = d[0] * wanted[1] - d[1] * wanted[0]
+        return int(np.sign(self._side(point)) * np.sign(entry))
+
+    def just_inside(self, point: Tuple[float, float]) -> bool:
+        """Whether point is on the entry side within inside_band of the line."""
+        if self.side(point) <= 0:
+            return False
+        w, h = self.frame_size
+        band = self.inside_band * (h if self.direction in ("up", "down") else w)
+        return abs(self._side(point)) / np.hypot(*(self.b - self.a)) <= band
+
+    def near_edge(self, bbox: BBox) -> bool:
+        """Whether bbox reaches into the frame's edge band."""
+        w, h = self.frame_size
+        mx, my = w * self.edge_margin, h * self.edge_margin
+        return bbox[0] < mx or bbox[1] < my or bbox[2] > w - mx or bbox[3] > h - my
+
+    def crossed(self, before: Tuple[float, float], after: Tuple[float, float]) -> bool:
+        """Whether moving from before to after crosses the line segment in the entry direction."""
+        return self.crossing(before, after) > 0
+
+    def crossing(self, before: Tuple[float, float], after: Tuple[float, float]) -> int:
+        """
+        Classify the movement from before to after.
+
+        Returns:
+            1 for a crossing in the entry direction (any crossing with direction "any"),
+            -1 for a crossing against it (exit), 0 if the segment is not crossed
+        """
+        if self._side(before) * self._side(after) >= 0 and self._side(after) != 0:
+            return 0
+        # The movement must also straddle the line's own extent (segment, not infinite line)
+        p, r = np.asarray(before, dtype=np.float64), np.subtract(after, before)
+        q, s = self.a, self.b - self.a
+        denom = r[0] * s[1] - r[1] * s[0]
+        if denom == 0:
+            return 0
+        u = ((q[0] - p[0]) * r[1] - (q[1] - p[1]) * r[0]) / denom
+        if not 0.0 <= u <= 1.0:
+            return 0
+        wanted = self.DIRECTIONS[self.direction]
+        if wanted is None:
+            return 1
+        along = r[0] * wanted[0] + r[1] * wanted[1]
+        return 1 if along > 0 else -1 if along < 0 else 0
+
+
+class FaceTracker:
+    """
+    IoU/centroid tracker with per-track capture bookkeeping.
+
+    Usage:
+        tracker = FaceTracker(iou_threshold=0.3, max_age_sec=1.5)
+        track = tracker.update([bbox], time.time())[0]
+        if tracker.should_capture(track, now, cooldown_seconds):
+            ...capture...
+            tracker.record_capture(track, last_bbox, time.time())
+            tracker.mark_identified(track, visitor_id)
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_centroid_distance: float = 1.0,
+        max_age_sec: float = 1.5,
+        kalman: bool = False,
+        entry_line: Optional[EntryLine] = None
+    ):
+        """
+        Args:
+            iou_threshold: Minimum IoU to continue a track
+            max_centroid_distance: Otherwise, max centroid distance in track box diagonals
+            max_age_sec: Tracks not seen for this long are dropped
+            kalman: Smooth centroids with a constant-velocity Kalman filter
+            entry_line: Only capture tracks after they cross this line (None = any track)
+        """
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_age_sec = max_age_sec
+        self.kalman = kalman
+        self.entry_line = entry_line
+
+        self.tracks: List[Track] = []
+        self._next_id = 1
+
+        # Stats
+        self.tracks_created = 0
+        self.identifications_avoided = 0  # Re-identifications a global cooldown would have allowed
+        self.entries = 0  # Tracks that crossed the entry line
+        self.exits = 0  # Tracks that crossed it against the entry direction
+        self.inside_starts = 0  # Tracks first seen just past the line, eligible without crossing
+        self._suppressed_expired = 0
+
+    def _predicted_bbox(self, track: Track, timestamp: float) -> BBox:
+        if track._kalman is None:
+            return track.bbox
+        return _shift(track.bbox, *track._kalman.predict(timestamp - track.last_seen))
+
+    def update(self, detections: Sequence[BBox], timestamp: float) -> List[Track]:
+        """
+        Associate detections with tracks, start tracks for the rest, drop stale tracks.
+
+        Args:
+            detections: Face boxes in this frame (may be empty)
+            timestamp: Frame time in seconds (time.time())
+
+        Returns:
+            The track of each detection, in detection order
+        """
+        live = []
+        for track in self.tracks:
+            if timestamp - track.last_seen <= self.max_age_sec:
+                live.append(track)
+            elif track.gated and not self._past_line(track):
+                self._suppressed_expired += 1
+        self.tracks = live
+
+        # Candidate pairs: IoU matches first (highest IoU), then centroid matches (closest)
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            predicted = self._predicted_bbox(track, timestamp)
+            pcx, pcy = _centroid(predicted)
+            diag = np.hypot(predicted[2] - predicted[0], predicted[3] - predicted[1])
+            for di, det in enumerate(detections):
+                iou = bbox_iou(predicted, det)
+                if iou >= self.iou_threshold:
+                    pairs.append(((0, -iou), ti, di))
+                    continue
+                dcx, dcy = _centroid(det)
+                dist = np.hypot(dcx - pcx, dcy - pcy) / max(diag, 1.0)
+                if dist <= self.max_centroid_distance:
+                    pairs.append(((1, dist), ti, di))
+        pairs.sort(key=lambda p: p[0])
+
+        assigned: List[Optional[Track]] = [None] * len(detections)
+        used_tracks = set()
+        for _, ti, di in pairs:
+            if ti in used_tracks or assigned[di] is not None:
+                continue
+            used_tracks.add(ti)
+            assigned[di] = self._continue(self.tracks[ti], detections[di], timestamp)
+
+        for di, det in enumerate(detections):
+            if assigned[di] is None:
+                assigned[di] = self._start(det, timestamp)
+        return assigned
+
+    def _start(self, bbox: BBox, timestamp: float) -> Track:
+        track = Track(self._next_id, tuple(bbox), timestamp, timestamp)
+        if self.kalman:
+            track._kalman = _CentroidKalman(*_centroid(bbox))
+        self._next_id += 1
+        self.tracks_created += 1
+        self.tracks.append(track)
+        logger.debug(f"Track #{track.track_id} started at {track.bbox}")
+        line = self.entry_line
+        if line is not None:
+            track.start_side = line.side(_centroid(track.bbox))
+            if (line.capture_inside_start and line.just_inside(_centroid(track.bbox))
+                    and not line.near_edge(track.bbox)):
+                track.appeared_inside = True
+                self.inside_starts += 1
+                logger.debug(f"Track #{track.track_id} appeared just past the entry line")
+        return track
+
+    def _continue(self, track: Track, bbox: BBox, timestamp: float) -> Track:
+        bbox = tuple(int(v) for v in bbox)
+        if track._kalman is not None:
+            bbox = _shift(bbox, *track._kalman.update(*_centroid(bbox), timestamp - track.last_seen))
+        if self.entry_line is not None:
+            self._count_crossing(track, self.entry_line.crossing(_centroid(track.bbox), _centroid(bbox)))
+        track.bbox = bbox
+        track.last_seen = timestamp
+        track.hits += 1
+        return track
+
+    def _count_crossing(self, track: Track, crossing: int) -> None:
+        """Count each track at most once per direction (jitter on the line is not re-counted)."""
+        if crossing > 0 and not track.entered:
+            track.entered = True
+            self.entries += 1
+            logger.debug(f"Track #{track.track_id} crossed the entry line")
+        elif crossing < 0 and not track.exited:
+            track.exited = True
+            self.exits += 1
+            logger.debug(f"Track #{track.track_id} crossed the entry line outwards")
+
+    @property
+    def triggers_suppressed(self) -> int:
+        """Tracks held back by the entry line that never got past it (each would have started a burst)."""
+        return self._suppressed_expired + sum(1 for t in self.tracks if t.gated and not self._past_line(t))
+
+    @staticmethod
+    def _past_line(track: Track) -> bool:
+        """Whether a track is eligible under the entry line (crossed it, or appeared inside)."""
+        return track.entered or track.appeared_inside
+
+    def should_capture(self, track: Track, timestamp: float, cooldown: float) -> bool:
+        """
+        Whether a detected track should start a capture burst.
+
+        Identified tracks are never captured again. Tracks whose last capture
+        gave no identification are retried after the cooldown. With an entry
+        line, tracks that have not crossed it are not captured, unless they
+        were first seen just past it, clear of the frame edges.
+
+        Args:
+            track: Track returned by update()
+            timestamp: Current time (time.time())
+            cooldown: Per-track retry interval in seconds
+
+        Returns:
+            True to capture this track now
+        """
+        if track.identified:
+            # A global cooldown would have re-captured this person once per cooldown period
+            if timestamp - track.avoided_since >= cooldown:
+                self.identifications_avoided += 1
+                track.avoided_since = timestamp
+            return False
+        if self.entry_line is not None and not self._past_line(track):
+            track.gated = True
+            return False
+        return track.last_capture is None or timestamp - track.last_capture >= cooldown
+
+    def record_capture(self, track: Track, bbox: Optional[BBox], timestamp: float) -> None:
+        """
+        Note the end of a capture burst for a track.
+
+        The detection loop does not run during the burst, so the track is moved
+        to where the face was last seen in the burst to keep it associable.
+
+        Args:
+            track: Track that was captured
+            bbox: Last face box seen during the burst (None = keep the trigger box)
+            timestamp: Time the burst ended
+        """
+        if bbox is not None:
+            self._continue(track, bbox, timestamp)
+        else:
+            track.last_seen = timestamp
+        track.last_capture = timestamp
+        track.avoided_since = timestamp
+        if all(t is not track for t in self.tracks):
+            self.tracks.append(track)
+
+    def mark_identified(self, track: Track, visitor_id: int) -> None:
+        """Record the server's visitor ID; the track will not be captured again."""
+        track.visitor_id = visitor_id
+        logger.debug(f"Track #{track.track_id} identified as visitor #{visitor_id}")
@@ -12,10 +12,16 @@ Metrics:
 """
 
 import cv2
+import heapq
+import threading
 import numpy as np
-from typing import Tuple, Dict, Optional, List
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Dict, Optional, List, Iterator
 from dataclasses import dataclass
 
+from frame_store import FrameSource, FrameStore, as_store, lowres_frame
+
 
 @dataclass
 class QualityScore:
@@ -29,6 +35,8 @@ class QualityScore:
     yaw: float  # Left/right rotation in degrees
     pitch: float  # Up/down rotation in degrees
     bbox: Tuple[int, int, int, int]  # x1, y1, x2, y2
+    skipped: Tuple[str, ...] = ()  # Metrics not evaluated (reported as 1.0)
+    partial: bool = False  # True if scoring stopped early (total is an upper bound)
     
     def to_dict(self) -> Dict:
         return {
@@ -40,56 +48,407 @@ class QualityScore:
             'frontality': round(self.frontality, 3),
             'yaw': round(self.yaw, 1),
             'pitch': round(self.pitch, 1),
-            'bbox': self.bbox
+            'bbox': self.bbox,
+            'skipped': list(self.skipped),
+            'partial': self.partial
         }
 
 
+# =============================================================================
+# SESSION TABLE (columnar per-burst scores)
+# =============================================================================
+
+# Per-metric columns, in QualityScore field order
+_METRIC_FIELDS: Tuple[str, ...] = ('face_size', 'sharpness', 'brightness', 'contrast', 'frontality')
+
+# Bit for each metric in the 'skipped' column
+_SKIP_BITS: Dict[str, int] = {name: 1 << i for i, name in enumerate(_METRIC_FIELDS)}
+
+SESSION_DTYPE = np.dtype([
+    ('frame_idx', np.int32),
+    ('timestamp', np.float64),  # Seconds since capture start
+    ('total', np.float64),
+    ('face_size', np.float64),
+    ('sharpness', np.float64),
+    ('brightness', np.float64),
+    ('contrast', np.float64),
+    ('frontality', np.float64),
+    ('yaw', np.float64),
+    ('pitch', np.float64),
+    ('bbox', np.int32, (4,)),  # x1, y1, x2, y2
+    ('skipped', np.uint8),  # Bitmask of metrics not evaluated (see _SKIP_BITS)
+    ('partial', np.bool_),
+    ('slot', np.int32),  # Index into the FrameStore
+    ('det_score', np.float64),  # YuNet confidence (0 if not recorded)
+    ('embedding_norm', np.float64),  # Raw ArcFace embedding norm (0 if not computed)
+    ('crop_origin', np.int32, (2,)),  # Top-left of the stored (compact) lowres frame, in lowres coordinates
+    ('keypoints', np.float32, (5, 2)),  # YuNet landmarks in lowres coordinates (0 if not recorded)
+])
+
+
+class SessionTable:
+    """
+    Columnar score table for one capture burst.
+    
+    One row per scored frame in a NumPy structured array (SESSION_DTYPE);
+    pixel data stays in a FrameStore, referenced by the 'slot' column.
+    Sorting, top-N and gating are vectorized over the columns.
+    
+    If embeddings were computed while scoring (embedding_norm mode), they are
+    kept per slot and reused for fusion instead of running recognition again.
+    
+    The bbox column is always in full lowres-frame coordinates. If the store
+    holds compact face-region frames, 'crop_origin' locates them and
+    local_bbox() gives the bbox within the stored frame.
+    
+    For compatibility with code written against the old lists, iterating
+    (or indexing with an int) yields (frame_index, hires, lowres, QualityScore).
+    """
+    
+    def __init__(self, rows: np.ndarray, store: FrameStore, embeddings: Optional[np.ndarray] = None):
+        self.rows = rows
+        self.store = store
+        self.embeddings = embeddings  # (slots, dim) raw embeddings, or None
+    
+    @classmethod
+    def empty(cls) -> 'SessionTable':
+        return cls(np.zeros(0, dtype=SESSION_DTYPE), FrameStore())
+    
+    @staticmethod
+    def set_row(rows: np.ndarray, i: int, frame_idx: int, score: QualityScore,
+                slot: int, timestamp: float = 0.0, det_score: float = 0.0,
+                embedding_norm: float = 0.0, crop_origin: Tuple[int, int] = (0, 0),
+                keypoints: Optional[np.ndarray] = None) -> None:
+        """Fill row i of a SESSION_DTYPE array from a QualityScore."""
+        skipped = 0
+        for name in score.skipped:
+            skipped |= _SKIP_BITS[name]
+        rows[i] = (
+            frame_idx, timestamp, score.total,
+            score.face_size, score.sharpness, score.brightness, score.contrast, score.frontality,
+            score.yaw, score.pitch, score.bbox, skipped, score.partial, slot,
+            det_score, embedding_norm, crop_origin,
+            keypoints if keypoints is not None else np.zeros((5, 2), dtype=np.float32)
+        )
+    
+    @classmethod
+    def from_scored(
+        cls,
+        scored: List[Tuple[int, np.ndarray, np.ndarray, QualityScore]],
+        timestamps: Optional[List[float]] = None
+    ) -> 'SessionTable':
+        """Build a table from (frame_index, hires, lowres, score) tuples."""
+        store = FrameStore()
+        rows = np.zeros(len(scored), dtype=SESSION_DTYPE)
+        for i, (idx, frame_hires, frame_lowres, score) in enumerate(scored):
+            timestamp = timestamps[i] if timestamps is not None else 0.0
+            cls.set_row(rows, i, idx, score, store.add(frame_hires, frame_lowres), timestamp)
+        return cls(rows, store)
+    
+    def sort_by_total(self) -> 'SessionTable':
+        """Rows sorted by total score descending (ties keep their order)."""
+        order = np.argsort(-self.rows['total'], kind='stable')
+        return SessionTable(self.rows[order], self.store, self.embeddings)
+    
+    def passing(self, min_score: float) -> 'SessionTable':
+        """Rows with a complete score >= min_score, in current order."""
+        mask = (self.rows['total'] >= min_score) & ~self.rows['partial']
+        return SessionTable(self.rows[mask], self.store, self.embeddings)
+    
+    def top(self, n: int) -> 'SessionTable':
+        """First n rows."""
+        return SessionTable(self.rows[:n], self.store, self.embeddings)
+    
+    def diverse_order(self, diversity: float = 0.5, pose_scale_deg: float = 5.0,
+                      time_scale_sec: float = 0.5) -> 'SessionTable':
+        """
+        Rows reordered by greedy quality/diversity selection.
+    
+        The best row comes first; each next row maximizes
+        total × (1 - diversity × max similarity to the rows already picked),
+        where similarity = exp(-(Δpose / pose_scale)² - (Δt / time_scale)²)
+        and Δpose is the yaw/pitch distance in degrees. Frames close to a picked
+        one in both pose and time are pushed back, so the first N rows cover
+        more of the burst than the top N by score.
+    
+        Args:
+            diversity: Penalty weight, 0-1 (0 = same order as sort_by_total)
+            pose_scale_deg: Pose distance at which frames stop looking alike
+            time_scale_sec: Time distance at which frames stop looking alike
+    
+        Returns:
+            SessionTable with the same rows in selection order
+        """
+        n = len(self.rows)
+        if n <= 1 or diversity <= 0:
+            return self.sort_by_total()
+    
+        totals = self.rows['total'].astype(np.float64)
+        pose = np.stack([self.rows['yaw'], self.rows['pitch']], axis=1).astype(np.float64)
+        times = self.rows['timestamp'].astype(np.float64)
+    
+        order = [int(np.argmax(totals))]
+        max_sim = np.zeros(n)
+        remaining = np.ones(n, dtype=bool)
+        remaining[order[0]] = False
+        for _ in range(n - 1):
+            last = order[-1]
+            d_pose = np.sum((pose - pose[last]) ** 2, axis=1) / max(pose_scale_deg, 1e-6) ** 2
+            d_time = (times - times[last]) ** 2 / max(time_scale_sec, 1e-6) ** 2
+            max_sim = np.maximum(max_sim, np.exp(-(d_pose + d_time)))
+            gain = np.where(remaining, totals * (1.0 - diversity * max_sim), -np.inf)
+            pick = int(np.argmax(gain))
+            order.append(pick)
+            remaining[pick] = False
+    
+        return SessionTable(self.rows[np.array(order)], self.store, self.embeddings)
+    
+    def score(self, i: int) -> QualityScore:
+        """Rebuild the QualityScore for row i."""
+        row = self.rows[i]
+        mask = int(row['skipped'])
+        return QualityScore(
+            total=float(row['total']),
+            face_size=float(row['face_size']),
+            sharpness=float(row['sharpness']),
+            brightness=float(row['brightness']),
+            contrast=float(row['contrast']),
+            frontality=float(row['frontality']),
+            yaw=float(row['yaw']),
+            pitch=float(row['pitch']),
+            bbox=self.bbox(i),
+            skipped=tuple(name for name in METRIC_EVAL_ORDER if mask & _SKIP_BITS[name]),
+            partial=bool(row['partial'])
+        )
+    
+    def bbox(self, i: int) -> Tuple[int, int, int, int]:
+        x1, y1, x2, y2 = (int(v) for v in self.rows['bbox'][i])
+        return (x1, y1, x2, y2)
+    
+    def local_bbox(self, i: int) -> Tuple[int, int, int, int]:
+        """Bbox of row i relative to its stored lowres frame (differs from bbox() for compact frames)."""
+        x1, y1, x2, y2 = self.bbox(i)
+        ox, oy = (int(v) for v in self.rows['crop_origin'][i])
+        return (x1 - ox, y1 - oy, x2 - ox, y2 - oy)
+    
+    def hires_keypoints(self, i: int) -> Optional[np.ndarray]:
+        """(5, 2) landmarks of row i in its stored hires frame, or None if not recorded."""
+        kps = self.rows['keypoints'][i]
+        if not kps.any():
+            return None
+        frame_hires, frame_lowres = self.frame(i)
+        scale = np.array([frame_hires.shape[1] / frame_lowres.shape[1],
+                          frame_hires.shape[0] / frame_lowres.shape[0]], dtype=np.float32)
+        return (kps - self.rows['crop_origin'][i]) * scale
+    
+    def embedding(self, i: int) -> Optional[np.ndarray]:
+        """Raw embedding for row i, if computed during scoring."""
+        if self.embeddings is None:
+            return None
+        return self.embeddings[int(self.rows['slot'][i])]
+    
+    def frame(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(hires, lowres) for row i."""
+        return self.store.get(int(self.rows['slot'][i]))
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __getitem__(self, i: int) -> Tuple[int, np.ndarray, np.ndarray, QualityScore]:
+        if i < 0:
+            i += len(self.rows)
+        if not 0 <= i < len(self.rows):
+            raise IndexError(f"Row {i} out of range")
+        frame_hires, frame_lowres = self.frame(i)
+        return (int(self.rows['frame_idx'][i]), frame_hires, frame_lowres, self.score(i))
+    
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray, np.ndarray, QualityScore]]:
+        for i in range(len(self.rows)):
+            yield self[i]
+    
+    def to_records(self) -> List[Dict]:
+        """Rows as JSON-serializable dicts (for debug metadata)."""
+        records = []
+        for i, row in enumerate(self.rows):
+            mask = int(row['skipped'])
+            records.append({
+                "frame_idx": int(row['frame_idx']),
+                "timestamp_ms": round(float(row['timestamp']) * 1000, 1),
+                "quality_score": float(row['total']),
+                **{name: float(row[name]) for name in _METRIC_FIELDS},
+                "yaw": float(row['yaw']),
+                "pitch": float(row['pitch']),
+                "bbox": list(self.bbox(i)),
+                "skipped": [name for name in METRIC_EVAL_ORDER if mask & _SKIP_BITS[name]],
+                "partial": bool(row['partial']),
+                "det_score": float(row['det_score']),
+                "embedding_norm": float(row['embedding_norm']),
+                "crop_origin": [int(v) for v in row['crop_origin']],
+            })
+        return records
+    
+    def save_npz(self, path: str) -> None:
+        """Save the score columns (not the frames) to a .npz file."""
+        np.savez(path, **{name: self.rows[name] for name in SESSION_DTYPE.names})
+    
+    @classmethod
+    def load_npz(cls, path: str) -> 'SessionTable':
+        """Load score columns saved by save_npz (with an empty frame store)."""
+        data = np.load(path)
+        rows = np.zeros(len(data['frame_idx']), dtype=SESSION_DTYPE)
+        for name in SESSION_DTYPE.names:
+            if name in data.files:  # Columns added later are left at 0
+                rows[name] = data[name]
+        return cls(rows, FrameStore())
+
+
+# =============================================================================
+# FRAME PREFILTER (whole-frame statistics, before detection)
+# =============================================================================
+
+PREFILTER_REASONS: Tuple[str, ...] = ('dark', 'overexposed', 'low_contrast', 'blurred')
+
+
+def prefilter_frame(
+    frame: np.ndarray,
+    min_mean: float = 25.0,
+    max_mean: float = 235.0,
+    min_std: float = 8.0,
+    min_gradient: float = 0.0,
+    thumb_width: int = 64,
+    row_stride: int = 8
+) -> Optional[str]:
+    """
+    Cheap check whether a frame can yield a usable face at all.
+
+    Mean and std come from a tiny grayscale thumbnail. Gradient energy (mean
+    absolute horizontal difference) is measured on every row_stride-th row at
+    full resolution, since downscaling would hide defocus blur.
+
+    Args:
+        frame: BGR or grayscale frame (region of interest)
+        min_mean: Below = too dark (lights off, IR switch-over)
+        max_mean: Above = blown out
+        min_std: Below = no contrast (flat / washed-out image)
+        min_gradient: Below = blurred, e.g. while refocusing (0 = not checked)
+        thumb_width: Thumbnail width for mean/std
+        row_stride: Row sampling step for the gradient check
+
+    Returns:
+        One of PREFILTER_REASONS if the frame should be skipped, else None
+    """
+    # Point-sample down to ~4x the thumbnail first; area-averaging the full frame costs more than the checks
+    step = max(1, frame.shape[1] // (thumb_width * 4))
+    sampled = frame[::step, ::step]
+    h, w = sampled.shape[:2]
+    thumb = cv2.resize(sampled, (thumb_width, max(1, h * thumb_width // w)), interpolation=cv2.INTER_AREA)
+    if thumb.ndim == 3:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    mean, std = cv2.meanStdDev(thumb)
+    mean, std = mean[0, 0], std[0, 0]
+
+    if mean < min_mean:
+        return 'dark'
+    if mean > max_mean:
+        return 'overexposed'
+    if std < min_std:
+        return 'low_contrast'
+
+    if min_gradient > 0:
+        rows = frame[::row_stride]
+        if rows.ndim == 3:
+            rows = cv2.cvtColor(rows, cv2.COLOR_BGR2GRAY)
+        gradient = cv2.mean(cv2.absdiff(rows[:, 1:], rows[:, :-1]))[0]
+        if gradient < min_gradient:
+            return 'blurred'
+
+    return None
+
+
 # =============================================================================
 # FACE DETECTION (YuNet - modern, lightweight, accurate)
 # =============================================================================
 
-_yunet_detector = None
-_yunet_input_size = None
+_yunet_lock = threading.Lock()
+
+# Process-wide pool of idle detectors. cv2.FaceDetectorYN is not thread-safe,
+# so a detector is used by one thread at a time, but OpenCV DNN releases the
+# GIL, so several instances let scoring threads run in parallel. Detectors
+# outlive the threads that created them: burst scorer threads are started per
+# burst, and building (and first-running) a detector per thread per burst
+# would land on every identification.
+_yunet_free: List[Tuple[object, Tuple[int, int]]] = []  # (detector, input size)
+_yunet_model_path: Optional[str] = None  # Set once the model file is verified
+
+def _yunet_model() -> str:
+    """Path of the YuNet model, downloaded if missing or corrupt (verified once per process)."""
+    global _yunet_model_path
+    with _yunet_lock:
+        if _yunet_model_path is None:
+            import os
+            from model_cache import verified_model_file
+            model_dir = os.path.dirname(os.path.abspath(__file__))
+            model_path = os.path.join(model_dir, "models", "face_detection_yunet_2023mar.onnx")
+            url = "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx"
+            _yunet_model_path = verified_model_file(model_path, url)
+        return _yunet_model_path
 
-def get_yunet_detector(input_size: Tuple[int, int] = (640, 480)):
+@contextmanager
+def yunet_detector(input_size: Tuple[int, int] = (640, 480)) -> Iterator:
     """
-    Get or initialize YuNet face detector.
+    Borrow a YuNet face detector from the process-wide pool.
     
     YuNet is a modern lightweight face detector included in OpenCV 4.5+.
     Much more accurate than Haar Cascade while still being fast (~5-10ms).
+    A new detector is created only when every pooled one is in use.
     
     Args:
         input_size: (width, height) of input frames
+    
+    Yields:
+        cv2.FaceDetectorYN set to input_size, returned to the pool afterwards
     """
-    global _yunet_detector, _yunet_input_size
+    with _yunet_lock:
+        detector, size = _yunet_free.pop() if _yunet_free else (None, None)
     
-    # Reinitialize if input size changed
-    if _yunet_detector is None or _yunet_input_size != input_size:
-        # YuNet model path - download if not exists
-        import os
-        model_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(model_dir, "models", "face_detection_yunet_2023mar.onnx")
-        
-        # Download model if not exists
-        if not os.path.exists(model_path):
-            os.makedirs(os.path.dirname(model_path), exist_ok=True)
-            import urllib.request
-            url = "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx"
-            print(f"Downloading YuNet model to {model_path}...")
-            urllib.request.urlretrieve(url, model_path)
-            print("YuNet model downloaded.")
-        
-        _yunet_detector = cv2.FaceDetectorYN.create(
-            model_path,
+    if detector is None:
+        detector = cv2.FaceDetectorYN.create(
+            _yunet_model(),
             "",
             input_size,
             score_threshold=0.5,
             nms_threshold=0.3,
             top_k=5000
         )
-        _yunet_input_size = input_size
+    elif size != input_size:
+        # Same network for any input size - only resize its input (bbox-local windows vary per frame)
+        detector.setInputSize(input_size)
+    
+    try:
+        yield detector
+    finally:
+        with _yunet_lock:
+            _yunet_free.append((detector, input_size))
+
+
+def warm_up_detectors(frame_shape: Tuple[int, ...], count: int = 1) -> None:
+    """
+    Create and first-run count pooled YuNet detectors at a frame shape.
     
-    return _yunet_detector
+    Burst scoring borrows one detector per scoring thread; borrowing them all at
+    once here fills the pool with that many, so no scoring thread builds (or
+    first-runs) a detector during a burst.
+    
+    Args:
+        frame_shape: Shape of the frames detection will run on
+        count: Detectors used at the same time (scoring threads)
+    """
+    h, w = frame_shape[:2]
+    frame = np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+    with ExitStack() as stack:
+        detectors = [stack.enter_context(yunet_detector((w, h))) for _ in range(max(1, count))]
+        for detector in detectors:
+            detector.detect(frame)
 
 
 def detect_face(frame: np.ndarray, min_confidence: float = 0.0) -> Optional[Tuple[Tuple[int, int, int, int], float]]:
@@ -104,10 +463,9 @@ def detect_face(frame: np.ndarray, min_confidence: float = 0.0) -> Optional[Tupl
         ((x1, y1, x2, y2), confidence) or None if no face found above threshold
     """
     h, w = frame.shape[:2]
-    detector = get_yunet_detector((w, h))
-    
-    # YuNet expects BGR image
-    _, faces = detector.detect(frame)
+    with yunet_detector((w, h)) as detector:
+        # YuNet expects BGR image
+        _, faces = detector.detect(frame)
     
     if faces is None or len(faces) == 0:
         return None
@@ -126,50 +484,182 @@ def detect_face(frame: np.ndarray, min_confidence: float = 0.0) -> Optional[Tupl
     return ((x, y, x + fw, y + fh), confidence)
 
 
-def detect_face_with_landmarks(frame: np.ndarray, min_confidence: float = 0.0) -> Optional[Tuple[Tuple[int, int, int, int], dict]]:
+# Landmark order expected by InsightFace norm_crop (same as YuNet output)
+KEYPOINT_NAMES: Tuple[str, ...] = ('right_eye', 'left_eye', 'nose', 'right_mouth', 'left_mouth')
+
+
+def detect_faces(frame: np.ndarray, min_confidence: float = 0.0) -> List[Tuple[Tuple[int, int, int, int], dict]]:
     """
-    Detect face and return landmarks from YuNet.
+    Detect all faces and their landmarks with YuNet.
     
     Args:
         frame: BGR image
         min_confidence: Minimum detection confidence (0-1). Faces below this are ignored.
     
     Returns:
-        ((x1, y1, x2, y2), landmarks_dict) or None if no face found above threshold
+        List of ((x1, y1, x2, y2), landmarks_dict), largest face first
         landmarks_dict contains: right_eye, left_eye, nose, right_mouth, left_mouth, score
     """
     h, w = frame.shape[:2]
-    detector = get_yunet_detector((w, h))
-    
-    _, faces = detector.detect(frame)
+    with yunet_detector((w, h)) as detector:
+        _, faces = detector.detect(frame)
     
     if faces is None or len(faces) == 0:
-        return None
+        return []
     
-    # Filter by confidence first
-    confident_faces = [f for f in faces if f[14] >= min_confidence]
-    
-    if not confident_faces:
-        return None
-    
-    # Get largest face (among confident ones)
-    largest = max(confident_faces, key=lambda f: f[2] * f[3])
+    # Filter by confidence, largest first
+    confident_faces = sorted((f for f in faces if f[14] >= min_confidence),
+                             key=lambda f: f[2] * f[3], reverse=True)
     
     # Parse YuNet output
     # Format: [x, y, w, h, x_re, y_re, x_le, y_le, x_nt, y_nt, x_rcm, y_rcm, x_lcm, y_lcm, score]
-    x, y, fw, fh = int(largest[0]), int(largest[1]), int(largest[2]), int(largest[3])
-    bbox = (x, y, x + fw, y + fh)
+    results = []
+    for face in confident_faces:
+        x, y, fw, fh = int(face[0]), int(face[1]), int(face[2]), int(face[3])
+        landmarks = {
+            'right_eye': (float(face[4]), float(face[5])),
+            'left_eye': (float(face[6]), float(face[7])),
+            'nose': (float(face[8]), float(face[9])),
+            'right_mouth': (float(face[10]), float(face[11])),
+            'left_mouth': (float(face[12]), float(face[13])),
+            'score': float(face[14])
+        }
+        results.append(((x, y, x + fw, y + fh), landmarks))
+    return results
+
+
+def detect_face_with_landmarks(frame: np.ndarray, min_confidence: float = 0.0) -> Optional[Tuple[Tuple[int, int, int, int], dict]]:
+    """
+    Detect the largest face and return landmarks from YuNet.
     
-    landmarks = {
-        'right_eye': (float(largest[4]), float(largest[5])),
-        'left_eye': (float(largest[6]), float(largest[7])),
-        'nose': (float(largest[8]), float(largest[9])),
-        'right_mouth': (float(largest[10]), float(largest[11])),
-        'left_mouth': (float(largest[12]), float(largest[13])),
-        'score': float(largest[14])
-    }
+    Args:
+        frame: BGR image
+        min_confidence: Minimum detection confidence (0-1). Faces below this are ignored.
     
-    return (bbox, landmarks)
+    Returns:
+        ((x1, y1, x2, y2), landmarks_dict) or None if no face found above threshold
+        landmarks_dict contains: right_eye, left_eye, nose, right_mouth, left_mouth, score
+    """
+    faces = detect_faces(frame, min_confidence)
+    return faces[0] if faces else None
+
+
+def _offset_face(face: Tuple[Tuple[int, int, int, int], dict], dx: int, dy: int) -> Tuple[Tuple[int, int, int, int], dict]:
+    """Move a detection (bbox, landmarks) from window to frame coordinates."""
+    (x1, y1, x2, y2), landmarks = face
+    moved = {name: (value if name == 'score' else (value[0] + dx, value[1] + dy))
+             for name, value in landmarks.items()}
+    return (x1 + dx, y1 + dy, x2 + dx, y2 + dy), moved
+
+
+def _bbox_center(bbox) -> Tuple[float, float]:
+    return (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+
+
+def _nearest_face(faces: List[Tuple[Tuple[int, int, int, int], dict]], point: Tuple[float, float]):
+    """Detection whose bbox center is closest to point."""
+    return min(faces, key=lambda f: (_bbox_center(f[0])[0] - point[0]) ** 2
+                                    + (_bbox_center(f[0])[1] - point[1]) ** 2)
+
+
+class FaceLocator:
+    """
+    Bbox-local YuNet detection across the frames of one capture burst.
+    
+    Once the face is located, the next frame is searched only in a window
+    around the previous bbox, shifted by the estimated motion and padded by
+    `pad` face sizes on each side. If the window holds no face, the whole frame
+    is searched (the face nearest the prediction) and tracking restarts there.
+    Detection cost per burst frame drops to roughly the cost of the window.
+    
+    Safe to share between scoring threads: state is read and updated under a
+    lock, detection runs outside it.
+    """
+    
+    def __init__(
+        self,
+        bbox: Optional[Tuple[int, int, int, int]] = None,
+        pad: float = 1.0,
+        min_confidence: float = 0.0,
+        velocity_smoothing: float = 0.5
+    ):
+        """
+        Args:
+            bbox: Face bbox from the trigger detection (None = start with a full-frame search)
+            pad: Window margin on each side, in face widths/heights
+            min_confidence: Minimum YuNet confidence
+            velocity_smoothing: Weight of the previous velocity estimate (0 = last step only)
+        """
+        self.pad = pad
+        self.min_confidence = min_confidence
+        self.velocity_smoothing = velocity_smoothing
+        self._bbox = tuple(bbox) if bbox is not None else None
+        self._timestamp = 0.0
+        self._velocity = (0.0, 0.0)  # Centroid motion, pixels per second
+        self._lock = threading.Lock()
+        
+        # Stats
+        self.window_hits = 0  # Frames where the face was found in the window
+        self.full_searches = 0  # Frames that needed a full-frame detection
+    
+    def _predict(self, timestamp: float) -> Optional[Tuple[float, float, float, float]]:
+        with self._lock:
+            if self._bbox is None:
+                return None
+            dt = timestamp - self._timestamp
+            dx, dy = self._velocity[0] * dt, self._velocity[1] * dt
+            x1, y1, x2, y2 = self._bbox
+        return (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+    
+    def _update(self, bbox: Tuple[int, int, int, int], timestamp: float) -> None:
+        with self._lock:
+            dt = timestamp - self._timestamp
+            if self._bbox is not None and dt > 0:
+                (cx, cy), (px, py) = _bbox_center(bbox), _bbox_center(self._bbox)
+                s = self.velocity_smoothing
+                self._velocity = (s * self._velocity[0] + (1 - s) * (cx - px) / dt,
+                                  s * self._velocity[1] + (1 - s) * (cy - py) / dt)
+            if self._bbox is None or dt >= 0:
+                self._bbox = tuple(bbox)
+                self._timestamp = timestamp
+    
+    def detect(self, frame: np.ndarray, timestamp: float = 0.0) -> Optional[Tuple[Tuple[int, int, int, int], dict]]:
+        """
+        Locate the tracked face in the next burst frame.
+        
+        Args:
+            frame: BGR lowres frame
+            timestamp: Seconds since capture start (for motion prediction)
+        
+        Returns:
+            ((x1, y1, x2, y2), landmarks_dict) in frame coordinates, or None if no face
+        """
+        predicted = self._predict(timestamp)
+        face = None
+        if predicted is not None:
+            h, w = frame.shape[:2]
+            x1, y1, x2, y2 = predicted
+            mx, my = (x2 - x1) * self.pad, (y2 - y1) * self.pad
+            wx1, wy1 = max(0, int(x1 - mx)), max(0, int(y1 - my))
+            wx2, wy2 = min(w, int(x2 + mx)), min(h, int(y2 + my))
+            if wx2 - wx1 > 1 and wy2 - wy1 > 1:
+                window = np.ascontiguousarray(frame[wy1:wy2, wx1:wx2])
+                faces = detect_faces(window, min_confidence=self.min_confidence)
+                if faces:
+                    center = _bbox_center(predicted)
+                    face = _offset_face(_nearest_face(faces, (center[0] - wx1, center[1] - wy1)), wx1, wy1)
+        
+        if face is not None:
+            self.window_hits += 1
+        else:
+            self.full_searches += 1
+            faces = detect_faces(frame, min_confidence=self.min_confidence)
+            if not faces:
+                return None
+            face = faces[0] if predicted is None else _nearest_face(faces, _bbox_center(predicted))
+        
+        self._update(face[0], timestamp)
+        return face
 
 
 # =============================================================================
@@ -214,27 +704,96 @@ def score_face_size(bbox: Tuple[int, int, int, int], frame_shape: Tuple[int, int
         return ratio ** 2  # Quadratic: slow start, accelerates toward 1.0
 
 
-def score_sharpness(face_roi: np.ndarray) -> float:
+# Sharpness estimators (config.QUALITY_SHARPNESS_ESTIMATOR):
+# - laplacian:   Laplacian variance in float64 (original metric)
+# - laplacian32: Laplacian variance in float32 (same scale, ~2x faster)
+# - tenengrad:   Mean squared Sobel gradient magnitude
+# - fft:         High-frequency share of spectral energy on a 64x64 downsample
+SHARPNESS_ESTIMATORS: Tuple[str, ...] = ('laplacian', 'laplacian32', 'tenengrad', 'fft')
+
+# Threshold key in config.QUALITY_THRESHOLDS for each estimator, with fallbacks
+_SHARPNESS_THRESHOLD_KEYS: Dict[str, Tuple[str, float, float]] = {
+    'laplacian': ('sharpness', 50, 300),
+    'laplacian32': ('sharpness', 50, 300),
+    'tenengrad': ('sharpness_tenengrad', 1500, 6000),
+    'fft': ('sharpness_fft', 0.02, 0.10),
+}
+
+
+def normalize_face_roi(face_roi: np.ndarray, size: int) -> np.ndarray:
+    """
+    Resample a face ROI to a fixed size x size canonical resolution.
+    
+    Makes metric cost constant per frame (a 400px face costs the same as a
+    100px face) and makes variance-based thresholds scale-independent.
+    """
+    h, w = face_roi.shape[:2]
+    interpolation = cv2.INTER_AREA if h * w > size * size else cv2.INTER_LINEAR
+    return cv2.resize(face_roi, (size, size), interpolation=interpolation)
+
+
+def measure_sharpness(gray: np.ndarray, estimator: str = 'laplacian') -> float:
+    """
+    Raw sharpness value of a grayscale ROI using the selected estimator.
+    
+    Returns:
+        Estimator value (higher = sharper); scale depends on the estimator
+    """
+    if estimator == 'laplacian':
+        return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    
+    if estimator == 'laplacian32':
+        _, std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+        return float(std[0, 0] ** 2)
+    
+    if estimator == 'tenengrad':
+        gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+        gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+        return float(cv2.mean(gx * gx + gy * gy)[0])
+    
+    if estimator == 'fft':
+        small = gray if gray.shape[:2] == (64, 64) else cv2.resize(gray, (64, 64), interpolation=cv2.INTER_AREA)
+        spectrum = np.abs(np.fft.fftshift(np.fft.fft2(small.astype(np.float32)))) ** 2
+        spectrum[32, 32] = 0.0  # Drop DC (mean brightness)
+        total = spectrum.sum()
+        if total <= 0:
+            return 0.0
+        yy, xx = np.ogrid[-32:32, -32:32]
+        high = spectrum[(xx * xx + yy * yy) > 8 * 8].sum()
+        return float(high / total)
+    
+    raise ValueError(f"Unknown sharpness estimator '{estimator}' (expected one of {SHARPNESS_ESTIMATORS})")
+
+
+def score_sharpness(face_roi: np.ndarray, estimator: Optional[str] = None) -> float:
     """
-    Score based on image sharpness using Laplacian variance.
+    Score based on image sharpness (Laplacian variance by default).
     Uses aggressive penalty below critical threshold.
     
+    Args:
+        face_roi: BGR or grayscale face region
+        estimator: One of SHARPNESS_ESTIMATORS (default from config)
+    
     Returns:
         Score in [0, 1] range
     """
     gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY) if len(face_roi.shape) == 3 else face_roi
-    laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-    variance = laplacian.var()
     
-    # Load thresholds from config
+    # Load estimator and thresholds from config
     try:
         import config as cfg
-        thresholds = cfg.QUALITY_THRESHOLDS.get('sharpness', {})
-        CRITICAL = thresholds.get('critical', 50)
-        GOOD = thresholds.get('good', 300)
+        if estimator is None:
+            estimator = getattr(cfg, 'QUALITY_SHARPNESS_ESTIMATOR', 'laplacian')
+        key, CRITICAL, GOOD = _SHARPNESS_THRESHOLD_KEYS.get(estimator, _SHARPNESS_THRESHOLD_KEYS['laplacian'])
+        thresholds = cfg.QUALITY_THRESHOLDS.get(key, {})
+        CRITICAL = thresholds.get('critical', CRITICAL)
+        GOOD = thresholds.get('good', GOOD)
     except (ImportError, AttributeError):
-        CRITICAL = 50
-        GOOD = 300
+        if estimator is None:
+            estimator = 'laplacian'
+        _, CRITICAL, GOOD = _SHARPNESS_THRESHOLD_KEYS.get(estimator, _SHARPNESS_THRESHOLD_KEYS['laplacian'])
+    
+    variance = measure_sharpness(gray, estimator)
     
     if variance >= GOOD:
         return 1.0
@@ -484,6 +1043,23 @@ def score_frontality(yaw: float, pitch: float) -> float:
 # MULTIPLICATIVE SCORING SYSTEM
 # =============================================================================
 
+# Fallback importance values when config.py is unavailable
+DEFAULT_IMPORTANCE: Dict[str, float] = {
+    'frontality': 8,
+    'sharpness': 6,
+    'face_size': 5,
+    'brightness': 4,
+    'contrast': 3,
+}
+
+# Metrics in cheapest-first order for early-exit scoring:
+# face_size only needs the bbox, frontality reuses the YuNet landmarks,
+# brightness/contrast are one pass over the ROI, and the Laplacian is the
+# most expensive. Every factor is <= 1, so the running total is always an
+# upper bound on the final score.
+METRIC_EVAL_ORDER: Tuple[str, ...] = ('face_size', 'frontality', 'brightness', 'contrast', 'sharpness')
+
+
 def apply_penalty(score: float, factor_value: float, importance: float) -> float:
     """
     Apply multiplicative penalty based on factor quality.
@@ -514,12 +1090,51 @@ def apply_penalty(score: float, factor_value: float, importance: float) -> float
     return score * multiplier
 
 
+def _padded_face_roi(frame: np.ndarray, bbox: Tuple[int, int, int, int]) -> np.ndarray:
+    """Face ROI with 10% padding on each side, clipped to the frame (a view, not a copy)."""
+    x1, y1, x2, y2 = bbox
+    h, w = frame.shape[:2]
+    pad_x = int((x2 - x1) * 0.1)
+    pad_y = int((y2 - y1) * 0.1)
+    x1_pad = max(0, x1 - pad_x)
+    y1_pad = max(0, y1 - pad_y)
+    x2_pad = min(w, x2 + pad_x)
+    y2_pad = min(h, y2 + pad_y)
+    return frame[y1_pad:y2_pad, x1_pad:x2_pad]
+
+
+def _frontality_from_pose(
+    frame: np.ndarray,
+    bbox: Tuple[int, int, int, int],
+    landmarks: Optional[dict]
+) -> Tuple[float, float, float]:
+    """
+    Compute frontality score and head pose for a face.
+    
+    Uses cached YuNet landmarks when available, otherwise re-runs detection.
+    
+    Returns:
+        (frontality_score, yaw, pitch)
+    """
+    if landmarks is not None:
+        yaw, pitch = estimate_head_pose_from_landmarks(landmarks, bbox)
+        return (score_frontality(yaw, pitch), yaw, pitch)
+    
+    pose = estimate_head_pose(frame, bbox)
+    if pose is not None:
+        yaw, pitch = pose
+        return (score_frontality(yaw, pitch), yaw, pitch)
+    return (0.5, 0.0, 0.0)
+
+
 def compute_quality_score(
     frame: np.ndarray,
     bbox: Optional[Tuple[int, int, int, int]] = None,
     importance: Dict[str, float] = None,
     base_score: float = None,
-    min_det_conf: float = None
+    min_det_conf: float = None,
+    cutoff: Optional[float] = None,
+    landmarks: Optional[dict] = None
 ) -> Optional[QualityScore]:
     """
     Compute overall quality score for a frame using multiplicative penalties.
@@ -527,12 +1142,22 @@ def compute_quality_score(
     Each factor independently impacts the score:
     score = base_score × f1^(imp1/5) × f2^(imp2/5) × ...
     
+    Metrics are evaluated cheapest-first (see METRIC_EVAL_ORDER). Metrics with
+    importance 0 are never computed. If cutoff is given, scoring stops as soon
+    as the running total (an upper bound, since every factor is <= 1) drops
+    below it; the remaining metrics are listed in `skipped` and `partial` is set.
+    
+    Brightness, contrast and sharpness only need luminance: the face ROI is
+    converted to grayscale once, on first use, and shared by all three.
+    
     Args:
         frame: BGR image
         bbox: Optional face bounding box. If None, will detect face.
         importance: Importance values for each metric (0-10 scale)
         base_score: Starting score before penalties (default 1000)
         min_det_conf: Minimum YuNet detection confidence (default from config)
+        cutoff: Stop early once the score upper bound falls below this value
+        landmarks: YuNet landmarks for the given bbox (frontality without a second detection)
     
     Returns:
         QualityScore object or None if no face found above confidence threshold
@@ -546,81 +1171,91 @@ def compute_quality_score(
             base_score = cfg.QUALITY_BASE_SCORE
         if min_det_conf is None:
             min_det_conf = getattr(cfg, 'MIN_DET_CONF', 0.0)
+        roi_size = getattr(cfg, 'QUALITY_ROI_CANONICAL_SIZE', 0)
     except ImportError:
+        roi_size = 0
         if importance is None:
-            importance = {
-                'frontality': 8,
-                'sharpness': 6,
-                'face_size': 5,
-                'brightness': 4,
-                'contrast': 3,
-            }
+            importance = DEFAULT_IMPORTANCE
         if base_score is None:
             base_score = 1000.0
         if min_det_conf is None:
             min_det_conf = 0.0
     
     # Detect face with landmarks (single detection for both bbox and pose)
-    landmarks = None
     if bbox is None:
         result = detect_face_with_landmarks(frame, min_confidence=min_det_conf)
         if result is None:
             return None
         bbox, landmarks = result
     
-    x1, y1, x2, y2 = bbox
-    
-    # Add padding to face ROI (10% on each side)
-    h, w = frame.shape[:2]
-    pad_x = int((x2 - x1) * 0.1)
-    pad_y = int((y2 - y1) * 0.1)
-    x1_pad = max(0, x1 - pad_x)
-    y1_pad = max(0, y1 - pad_y)
-    x2_pad = min(w, x2 + pad_x)
-    y2_pad = min(h, y2 + pad_y)
-    
-    face_roi = frame[y1_pad:y2_pad, x1_pad:x2_pad]
+    face_roi = _padded_face_roi(frame, bbox)
     
     if face_roi.size == 0:
         return None
     
-    # Compute individual factor scores (all 0-1 range)
-    size_score = score_face_size(bbox, frame.shape[:2])
-    sharp_score = score_sharpness(face_roi)
-    bright_score = score_brightness(face_roi)
-    contrast_score = score_contrast(face_roi)
+    # Grayscale ROI for the luminance metrics, built on first use
+    # (at canonical size if set: constant metric cost, scale-independent thresholds)
+    gray_roi = None
+    
+    # Without landmarks, frontality needs a second detection pass - do it last
+    order = list(METRIC_EVAL_ORDER)
+    if landmarks is None:
+        order.remove('frontality')
+        order.append('frontality')
+    
+    # Factor scores (0-1 range). Unevaluated metrics stay at 1.0 (no penalty),
+    # so total is always base_score × Π(reported factors)
+    factors = {name: 1.0 for name in METRIC_EVAL_ORDER}
+    yaw, pitch = 0.0, 0.0
+    skipped = []
+    partial = False
+    total = base_score
     
-    # Compute head pose for frontality (use cached landmarks if available)
-    if landmarks is not None:
-        yaw, pitch = estimate_head_pose_from_landmarks(landmarks, bbox)
-        frontal_score = score_frontality(yaw, pitch)
-    else:
-        pose = estimate_head_pose(frame, bbox)
-        if pose is not None:
-            yaw, pitch = pose
-            frontal_score = score_frontality(yaw, pitch)
+    for name in order:
+        weight = importance.get(name, DEFAULT_IMPORTANCE[name])
+        if weight == 0 or partial:
+            skipped.append(name)
+            continue
+        
+        if name == 'face_size':
+            value = score_face_size(bbox, frame.shape[:2])
+        elif name == 'frontality':
+            value, yaw, pitch = _frontality_from_pose(frame, bbox, landmarks)
         else:
-            yaw, pitch = 0.0, 0.0
-            frontal_score = 0.5
+            if gray_roi is None:
+                gray_roi = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY) if len(face_roi.shape) == 3 else face_roi
+                if roi_size:
+                    gray_roi = normalize_face_roi(gray_roi, roi_size)
+            if name == 'brightness':
+                value = score_brightness(gray_roi)
+            elif name == 'contrast':
+                value = score_contrast(gray_roi)
+            else:
+                value = score_sharpness(gray_roi)
+        
+        factors[name] = value
+        total = apply_penalty(total, value, weight)
+        
+        # Remaining factors can only lower the score further
+        if cutoff is not None and total < cutoff:
+            partial = True
     
-    # Apply multiplicative penalties
-    total = base_score
-    total = apply_penalty(total, frontal_score, importance.get('frontality', 8))
-    total = apply_penalty(total, sharp_score, importance.get('sharpness', 6))
-    total = apply_penalty(total, size_score, importance.get('face_size', 5))
-    total = apply_penalty(total, bright_score, importance.get('brightness', 4))
-    total = apply_penalty(total, contrast_score, importance.get('contrast', 3))
+    # Pose is cheap with landmarks - keep yaw/pitch for logging even if skipped
+    if 'frontality' in skipped and landmarks is not None:
+        yaw, pitch = estimate_head_pose_from_landmarks(landmarks, bbox)
     
     return QualityScore(
         total=total,
-        face_size=size_score,
-        sharpness=sharp_score,
-        brightness=bright_score,
-        contrast=contrast_score,
-        frontality=frontal_score,
+        face_size=factors['face_size'],
+        sharpness=factors['sharpness'],
+        brightness=factors['brightness'],
+        contrast=factors['contrast'],
+        frontality=factors['frontality'],
         yaw=yaw,
         pitch=pitch,
-        bbox=bbox
+        bbox=bbox,
+        skipped=tuple(skipped),
+        partial=partial
     )
 
 
@@ -647,31 +1282,234 @@ def score_frames(frames: List[np.ndarray]) -> List[Tuple[int, np.ndarray, Qualit
     return results
 
 
-def score_frames_dual(frames: List[Tuple[np.ndarray, np.ndarray]]) -> List[Tuple[int, np.ndarray, np.ndarray, QualityScore]]:
+def score_frames_dual(
+    frames: FrameSource,
+    min_score: Optional[float] = None,
+    top_n: Optional[int] = None,
+    workers: int = 1,
+    timestamps: Optional[List[float]] = None,
+    locator: Optional[FaceLocator] = None
+) -> SessionTable:
     """
     Score multiple dual-resolution frames and return sorted by quality.
     
     This version handles frames stored as (hires, lowres) tuples.
     Scoring is done on lowres for speed, but hires is preserved for recognition.
     
+    Early exit: each frame stops scoring once its upper bound drops below
+    the running cutoff = max(min_score, N-th best complete score so far).
+    Such frames can never make the top N or pass the gate; they are still
+    returned with score.partial set and score.total as the upper bound.
+    
     Args:
-        frames: List of (cropped_hires, resized_lowres) tuples
+        frames: (cropped_hires, resized_lowres) tuples, or a FrameStore (only lowres is read)
+        min_score: Quality gate - frames that can't reach this are cut short
+        top_n: Only the top N frames matter - cut short frames that can't reach them
+        workers: Number of scoring threads (each uses its own YuNet instance)
+        timestamps: Capture time of each frame in seconds (stored in the table)
+        locator: Bbox-local detection seeded with the trigger face (None = full-frame YuNet)
     
     Returns:
-        List of (frame_index, hires, lowres, score) tuples, sorted by total score descending
-    """
-    results = []
+        SessionTable of frames with a face, sorted by total score descending
+        (frame_index = position in frames)
     
-    for i, (frame_hires, frame_lowres) in enumerate(frames):
+    With QUALITY_KERNEL_BACKEND set, the cheap metrics are scored for the whole
+    burst at once (see _score_frames_batch).
+    """
+    backend = _kernel_backend()
+    if backend is not None:
+        return _score_frames_batch(frames, min_score, top_n, workers, timestamps, backend, locator)
+    
+    top_totals = []  # Min-heap of the best top_n complete scores
+    lock = threading.Lock()
+    rows = np.zeros(len(frames), dtype=SESSION_DTYPE)
+    has_face = np.zeros(len(frames), dtype=bool)
+    
+    def score_one(i: int) -> None:
+        frame_lowres = lowres_frame(frames, i)
+        with lock:
+            cutoff = min_score
+            if top_n and len(top_totals) >= top_n:
+                cutoff = top_totals[0] if cutoff is None else max(cutoff, top_totals[0])
+        
         # Score using the lowres frame (faster, same quality assessment)
-        score = compute_quality_score(frame_lowres)
-        if score is not None:
-            results.append((i, frame_hires, frame_lowres, score))
+        if locator is not None:
+            face = locator.detect(frame_lowres, timestamps[i] if timestamps is not None else float(i))
+            score = None if face is None else compute_quality_score(
+                frame_lowres, bbox=face[0], landmarks=face[1], cutoff=cutoff)
+        else:
+            score = compute_quality_score(frame_lowres, cutoff=cutoff)
+        if score is None:
+            return
+        
+        if top_n and not score.partial:
+            with lock:
+                if len(top_totals) < top_n:
+                    heapq.heappush(top_totals, score.total)
+                elif score.total > top_totals[0]:
+                    heapq.heapreplace(top_totals, score.total)
+        
+        # Each worker writes its own row
+        timestamp = timestamps[i] if timestamps is not None else 0.0
+        SessionTable.set_row(rows, i, i, score, slot=i, timestamp=timestamp)
+        has_face[i] = True
+    
+    if workers > 1 and len(frames) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="score") as executor:
+            list(executor.map(score_one, range(len(frames))))
+    else:
+        for i in range(len(frames)):
+            score_one(i)
     
-    # Sort by total score descending
-    results.sort(key=lambda x: x[3].total, reverse=True)
+    return SessionTable(rows[has_face], as_store(frames)).sort_by_total()
+
+
+def _kernel_backend() -> Optional[str]:
+    """Batch kernel backend from config, or None for the per-frame reference path."""
+    try:
+        import config as cfg
+        backend = getattr(cfg, 'QUALITY_KERNEL_BACKEND', 'python')
+    except ImportError:
+        backend = 'python'
+    if backend == 'python':
+        return None
+    from quality_kernels import resolve_backend
+    return resolve_backend(backend)
+
+
+def _score_frames_batch(
+    frames: FrameSource,
+    min_score: Optional[float],
+    top_n: Optional[int],
+    workers: int,
+    timestamps: Optional[List[float]],
+    backend: str,
+    locator: Optional[FaceLocator] = None
+) -> SessionTable:
+    """
+    Batch variant of score_frames_dual using the fused kernels in quality_kernels.py.
     
-    return results
+    Detection still runs per frame. Face size, pose, frontality, brightness and
+    contrast are then scored for all faces in one kernel call, from the bboxes,
+    landmarks and ROI mean/std. Sharpness (if enabled) runs last, best upper
+    bound first, and is skipped once the bound falls below
+    max(min_score, N-th best complete score) - the same early exit as the
+    per-frame path, except the cheap metrics are always reported.
+    
+    Returns:
+        SessionTable of frames with a face, sorted by total score descending
+    """
+    from quality_kernels import KERNEL_METRICS, pack_importance, pack_thresholds, score_batch
+    
+    try:
+        import config as cfg
+        importance = cfg.QUALITY_IMPORTANCE
+        base_score = cfg.QUALITY_BASE_SCORE
+        min_det_conf = getattr(cfg, 'MIN_DET_CONF', 0.0)
+        roi_size = getattr(cfg, 'QUALITY_ROI_CANONICAL_SIZE', 0)
+        thresholds = cfg.QUALITY_THRESHOLDS
+    except (ImportError, AttributeError):
+        importance = DEFAULT_IMPORTANCE
+        base_score = 1000.0
+        min_det_conf = 0.0
+        roi_size = 0
+        thresholds = {}
+    
+    def detect(i: int):
+        if locator is not None:
+            return locator.detect(lowres_frame(frames, i), timestamps[i] if timestamps is not None else float(i))
+        return detect_face_with_landmarks(lowres_frame(frames, i), min_confidence=min_det_conf)
+    
+    if workers > 1 and len(frames) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="score") as executor:
+            detections = list(executor.map(detect, range(len(frames))))
+    else:
+        detections = [detect(i) for i in range(len(frames))]
+    
+    # Gather per-face inputs; empty ROIs are dropped like in compute_quality_score
+    need_roi = any(importance.get(name, DEFAULT_IMPORTANCE[name]) != 0
+                   for name in ('brightness', 'contrast', 'sharpness'))
+    indices, bboxes, landmarks, gray_rois = [], [], [], []
+    for i, detection in enumerate(detections):
+        if detection is None:
+            continue
+        bbox, marks = detection
+        face_roi = _padded_face_roi(lowres_frame(frames, i), bbox)
+        if face_roi.size == 0:
+            continue
+        indices.append(i)
+        bboxes.append(bbox)
+        landmarks.append((marks['right_eye'], marks['left_eye'], marks['nose']))
+        if need_roi:
+            gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY) if len(face_roi.shape) == 3 else face_roi
+            gray_rois.append(normalize_face_roi(gray, roi_size) if roi_size else gray)
+    
+    n = len(indices)
+    roi_mean = np.zeros(n)
+    roi_std = np.zeros(n)
+    for k, gray in enumerate(gray_rois):
+        mean, std = cv2.meanStdDev(gray)
+        roi_mean[k] = mean[0, 0]
+        roi_std[k] = std[0, 0]
+    
+    factors, yaw, pitch, totals = score_batch(
+        np.array(bboxes, dtype=np.float64).reshape(n, 4),
+        np.array(landmarks, dtype=np.float64).reshape(n, 3, 2),
+        roi_mean, roi_std,
+        pack_thresholds(thresholds),
+        pack_importance(importance, DEFAULT_IMPORTANCE),
+        base_score,
+        backend=backend
+    )
+    
+    # Sharpness last, best bound first; the cutoff only rises, so frames below it are final
+    sharp_weight = importance.get('sharpness', DEFAULT_IMPORTANCE['sharpness'])
+    sharpness = np.ones(n)
+    sharp_skipped = np.ones(n, dtype=bool) if sharp_weight == 0 else np.zeros(n, dtype=bool)
+    partial = np.zeros(n, dtype=bool)
+    top_totals = []  # Min-heap of the best top_n complete scores
+    for k in np.argsort(-totals, kind='stable'):
+        cutoff = min_score
+        if top_n and len(top_totals) >= top_n:
+            cutoff = top_totals[0] if cutoff is None else max(cutoff, top_totals[0])
+        
+        if cutoff is not None and totals[k] < cutoff:
+            partial[k] = True
+            sharp_skipped[k] = True
+            continue
+        
+        if sharp_weight != 0:
+            sharpness[k] = score_sharpness(gray_rois[k])
+            totals[k] = apply_penalty(totals[k], sharpness[k], sharp_weight)
+            if cutoff is not None and totals[k] < cutoff:
+                partial[k] = True
+                continue
+        
+        if top_n:
+            if len(top_totals) < top_n:
+                heapq.heappush(top_totals, totals[k])
+            elif totals[k] > top_totals[0]:
+                heapq.heapreplace(top_totals, totals[k])
+    
+    # Fill the table columns directly
+    rows = np.zeros(n, dtype=SESSION_DTYPE)
+    rows['frame_idx'] = indices
+    rows['slot'] = indices
+    if timestamps is not None:
+        rows['timestamp'] = [timestamps[i] for i in indices]
+    rows['total'] = totals
+    for m, name in enumerate(KERNEL_METRICS):
+        rows[name] = factors[:, m]
+        if importance.get(name, DEFAULT_IMPORTANCE[name]) == 0:
+            rows['skipped'] |= _SKIP_BITS[name]
+    rows['sharpness'] = sharpness
+    rows['skipped'][sharp_skipped] |= _SKIP_BITS['sharpness']
+    rows['yaw'] = yaw
+    rows['pitch'] = pitch
+    rows['bbox'] = np.array(bboxes, dtype=np.int32).reshape(n, 4)
+    rows['partial'] = partial
+    
+    return SessionTable(rows, as_store(frames)).sort_by_total()
 
 
 def get_best_frame(frames: List[np.ndarray]) -> Optional[Tuple[np.ndarray, QualityScore]]:
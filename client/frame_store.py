@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Frame Store Module
+Holds the (cropped_hires, resized_lowres) frames of a capture burst.
+
+Scored frames are described by rows of a SessionTable (frame_quality.py);
+each row points into the store by slot number, so score data and pixel data
+travel separately. Selection and sorting only touch the table, and frames
+that are no longer needed can be released without rebuilding it.
+
+Frames can be stored compact (compact_frame): only a padded face region of
+both resolutions, as owned arrays, plus a small context thumbnail. A cropped
+hires frame is otherwise a view that keeps the whole 4K decode buffer alive.
+
+For bursts that must be kept in full, JpegFrameStore holds the hires frames
+JPEG-encoded (encoded in the background on arrival) and decodes them only when
+they are read. Stores can be used in place of a list of (hires, lowres)
+tuples: len(), iteration, indexing and slicing work the same.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+Frame = Tuple[np.ndarray, np.ndarray]  # (cropped_hires, resized_lowres)
+
+
+class FrameStore:
+    """
+    Slot-addressed storage for burst frames.
+
+    Usage:
+        store = FrameStore()
+        slot = store.add(hires, lowres)
+        hires, lowres = store.get(slot)
+        store.release(slot)  # Drop pixel data, slot numbers stay valid
+    """
+
+    def __init__(self, frames: Optional[List[Frame]] = None):
+        """
+        Args:
+            frames: Initial (hires, lowres) tuples, stored in slots 0..N-1
+        """
+        self._frames: List[Optional[Frame]] = list(frames) if frames is not None else []
+        self._thumbnails: Dict[int, np.ndarray] = {}
+
+    def add(self, frame_hires: np.ndarray, frame_lowres: np.ndarray,
+            thumbnail: Optional[np.ndarray] = None) -> int:
+        """Store a frame (and optional context thumbnail) and return its slot number."""
+        self._frames.append((frame_hires, frame_lowres))
+        slot = len(self._frames) - 1
+        if thumbnail is not None:
+            self._thumbnails[slot] = thumbnail
+        return slot
+
+    def get(self, slot: int) -> Frame:
+        """
+        Get a stored frame.
+
+        Raises:
+            KeyError: If the slot is out of range or was released
+        """
+        if slot < 0 or slot >= len(self._frames) or self._frames[slot] is None:
+            raise KeyError(f"Frame slot {slot} not in store")
+        return self._frames[slot]
+
+    def lowres(self, slot: int) -> np.ndarray:
+        """Lowres frame only (no hires access, e.g. no JPEG decode)."""
+        return self.get(slot)[1]
+
+    def thumbnail(self, slot: int) -> Optional[np.ndarray]:
+        """Context thumbnail for a slot, if one was stored."""
+        return self._thumbnails.get(slot)
+
+    def release(self, slot: int) -> None:
+        """Drop the pixel data for a slot."""
+        if 0 <= slot < len(self._frames):
+            self._frames[slot] = None
+        self._thumbnails.pop(slot, None)
+
+    def nbytes(self) -> int:
+        """Pixel bytes held by the store (views count their own extent only)."""
+        total = sum(a.nbytes for frame in self._frames if frame is not None for a in frame)
+        return total + sum(t.nbytes for t in self._thumbnails.values())
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __getitem__(self, key):
+        """Frame for an int slot; a store over the slots for a slice (list-compatible)."""
+        if isinstance(key, slice):
+            return self._view(key)
+        return self.get(key if key >= 0 else len(self._frames) + key)
+
+    def __iter__(self):
+        for slot in range(len(self._frames)):
+            yield self.get(slot)
+
+    def _view(self, key: slice) -> 'FrameStore':
+        return FrameStore(self._frames[key])
+
+
+FrameSource = Union[Sequence[Frame], FrameStore]
+
+
+def as_store(frames: FrameSource) -> FrameStore:
+    """Wrap a list of (hires, lowres) tuples in a FrameStore (stores are returned as-is)."""
+    return frames if isinstance(frames, FrameStore) else FrameStore(list(frames))
+
+
+def lowres_frame(frames: FrameSource, i: int) -> np.ndarray:
+    """Lowres frame i of a list or store, without touching the hires frame."""
+    return frames.lowres(i) if isinstance(frames, FrameStore) else frames[i][1]
+
+
+# =============================================================================
+# JPEG-COMPRESSED STORE
+# =============================================================================
+
+@dataclass
+class JpegStoreStats:
+    """Memory and CPU counters for JpegFrameStore (may be shared by several stores)."""
+    frames: int = 0
+    raw_bytes: int = 0      # Hires bytes before encoding
+    encoded_bytes: int = 0  # Hires bytes after encoding
+    encode_ms: float = 0.0  # Total, summed over encoder threads
+    decoded: int = 0
+    decode_ms: float = 0.0
+
+    def summary(self) -> str:
+        if not self.frames:
+            return "no frames"
+        ratio = self.raw_bytes / self.encoded_bytes if self.encoded_bytes else 0.0
+        text = (f"{self.frames} frames, {self.raw_bytes / 1e6:.0f} MB -> {self.encoded_bytes / 1e6:.1f} MB "
+                f"({ratio:.0f}x), encode {self.encode_ms / self.frames:.1f} ms/frame")
+        if self.decoded:
+            text += f", decoded {self.decoded} ({self.decode_ms / self.decoded:.1f} ms/frame)"
+        return text
+
+
+_encoder_pool: Optional[ThreadPoolExecutor] = None
+_encoder_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()  # Guards JpegStoreStats (shared between stores and threads)
+
+
+def _get_encoder_pool(workers: int) -> ThreadPoolExecutor:
+    """Encoder threads shared by all JPEG stores (sized by the first caller)."""
+    global _encoder_pool
+    with _encoder_pool_lock:
+        if _encoder_pool is None:
+            _encoder_pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jpeg")
+        return _encoder_pool
+
+
+class JpegFrameStore(FrameStore):
+    """
+    FrameStore that keeps hires frames JPEG-encoded in memory.
+
+    add() queues the hires frame for encoding on a background thread and
+    returns immediately; the raw frame is released once encoded. Lowres frames
+    (used for scoring) stay raw. get() decodes the hires frame on demand, so
+    only frames that survive scoring and are needed for embedding or debug
+    output pay for a decode.
+
+    Usage:
+        store = JpegFrameStore(quality=95)
+        slot = store.add(hires, lowres)
+        lowres = store.lowres(slot)       # No decode
+        hires, lowres = store.get(slot)   # Decodes hires
+        jpeg = store.encoded(slot)        # Encoded bytes (e.g. to write to disk)
+    """
+
+    def __init__(self, quality: int = 95, workers: int = 1, stats: Optional[JpegStoreStats] = None):
+        """
+        Args:
+            quality: JPEG quality (0-100)
+            workers: Encoder threads (shared pool, sized on first use)
+            stats: Counters to update (pass one instance to aggregate over stores)
+        """
+        super().__init__()
+        self.quality = quality
+        self.workers = workers
+        self.stats = stats if stats is not None else JpegStoreStats()
+
+    def _encode(self, frame_hires: np.ndarray) -> np.ndarray:
+        t0 = time.perf_counter()
+        ok, buffer = cv2.imencode('.jpg', frame_hires, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        elapsed = (time.perf_counter() - t0) * 1000
+        with _stats_lock:
+            self.stats.encoded_bytes += buffer.nbytes
+            self.stats.encode_ms += elapsed
+        return buffer
+
+    def add(self, frame_hires: np.ndarray, frame_lowres: np.ndarray,
+            thumbnail: Optional[np.ndarray] = None) -> int:
+        """Queue the hires frame for encoding and return its slot number."""
+        with _stats_lock:
+            self.stats.frames += 1
+            self.stats.raw_bytes += frame_hires.nbytes
+        future = _get_encoder_pool(self.workers).submit(self._encode, frame_hires)
+        self._frames.append((future, frame_lowres))
+        slot = len(self._frames) - 1
+        if thumbnail is not None:
+            self._thumbnails[slot] = thumbnail
+        return slot
+
+    def _entry(self, slot: int) -> Tuple[Future, np.ndarray]:
+        if slot < 0 or slot >= len(self._frames) or self._frames[slot] is None:
+            raise KeyError(f"Frame slot {slot} not in store")
+        return self._frames[slot]
+
+    def encoded(self, slot: int) -> np.ndarray:
+        """JPEG bytes of the hires frame (waits for the encoder if needed)."""
+        return self._entry(slot)[0].result()
+
+    def lowres(self, slot: int) -> np.ndarray:
+        return self._entry(slot)[1]
+
+    def get(self, slot: int) -> Frame:
+        """
+        Get a stored frame, decoding the hires part.
+
+        Raises:
+            KeyError: If the slot is out of range or was released
+        """
+        future, frame_lowres = self._entry(slot)
+        buffer = future.result()
+        t0 = time.perf_counter()
+        frame_hires = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        elapsed = (time.perf_counter() - t0) * 1000
+        with _stats_lock:
+            self.stats.decoded += 1
+            self.stats.decode_ms += elapsed
+        return frame_hires, frame_lowres
+
+    def nbytes(self) -> int:
+        """Encoded hires bytes (frames still being encoded count as 0) plus raw lowres bytes."""
+        total = 0
+        for entry in self._frames:
+            if entry is None:
+                continue
+            future, frame_lowres = entry
+            if future.done() and future.exception() is None:
+                total += future.result().nbytes
+            total += frame_lowres.nbytes
+        return total + sum(t.nbytes for t in self._thumbnails.values())
+
+    def _view(self, key: slice) -> 'JpegFrameStore':
+        view = JpegFrameStore(self.quality, self.workers, self.stats)
+        view._frames = self._frames[key]
+        return view
+
+
+def compact_frame(
+    frame_hires: np.ndarray,
+    frame_lowres: np.ndarray,
+    bbox: Tuple[int, int, int, int],
+    scale: float = 2.5,
+    thumb_width: int = 320
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray], Tuple[int, int]]:
+    """
+    Reduce a burst frame to its face region.
+
+    The region is scale × the bbox size, centred on the face and clipped to the
+    frame; the hires region is the same area scaled to hires coordinates.
+
+    Args:
+        frame_hires: Cropped hires frame
+        frame_lowres: Resized frame the bbox refers to
+        bbox: Face (x1, y1, x2, y2) in lowres coordinates
+        scale: Region size relative to the bbox
+        thumb_width: Width of the downscaled full lowres frame (0 = no thumbnail)
+
+    Returns:
+        (hires_crop, lowres_crop, thumbnail, origin) - owned copies of the face
+        region, the context thumbnail (or None), and the region's top-left
+        corner in lowres coordinates
+    """
+    lh, lw = frame_lowres.shape[:2]
+    hh, hw = frame_hires.shape[:2]
+    x1, y1, x2, y2 = bbox
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    half_w, half_h = (x2 - x1) * scale / 2, (y2 - y1) * scale / 2
+    rx1, ry1 = max(0, int(cx - half_w)), max(0, int(cy - half_h))
+    rx2, ry2 = min(lw, int(cx + half_w)), min(lh, int(cy + half_h))
+
+    sx, sy = hw / lw, hh / lh
+    lowres_crop = frame_lowres[ry1:ry2, rx1:rx2].copy()
+    hires_crop = frame_hires[int(ry1 * sy):int(ry2 * sy), int(rx1 * sx):int(rx2 * sx)].copy()
+
+    thumbnail = None
+    if thumb_width > 0 and lw > thumb_width:
+        thumbnail = cv2.resize(frame_lowres, (thumb_width, int(lh * thumb_width / lw)),
+                               interpolation=cv2.INTER_AREA)
+    elif thumb_width > 0:
+        thumbnail = frame_lowres.copy()
+
+    return hires_crop, lowres_crop, thumbnail, (rx1, ry1)
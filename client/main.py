@@ -3,23 +3,26 @@
 Main Entry Point - Multi-Camera System
 
 Loads camera configuration and spawns workers for each enabled camera.
-Each use case (face_recognition, live_stream) runs in its own process.
+Each use case (face_recognition, live_stream, people_count) runs in its own process.
 
 Usage:
     python main.py                    # Run all enabled cameras
     python main.py --camera cam_entrance  # Run specific camera
     python main.py --validate         # Validate config only
     python main.py --list             # List configured cameras
+    python main.py --preload          # Load models once, share them with forked workers
 """
 
 import os
+import gc
 import sys
 import argparse
 import logging
 import signal
 import time
+import multiprocessing
 from multiprocessing import Process, Event
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from camera_manager import (
     load_config,
@@ -49,12 +52,14 @@ def run_face_recognition_worker(
     api_key: str,
     location_id: int,
     shutdown_event: Event,
-    debug_mode: bool = False
+    debug_mode: bool = False,
+    ready_event: Optional[Event] = None
 ) -> None:
     """
     Run face recognition worker for a camera.
     
-    This function runs in a separate process.
+    This function runs in a separate process. ready_event is set once the
+    models are loaded and warmed up.
     """
     from visitor_counter import run_visitor_counter
     
@@ -66,7 +71,41 @@ def run_face_recognition_worker(
             api_base_url=api_base_url,
             api_key=api_key,
             location_id=location_id,
-            debug_mode=debug_mode
+            debug_mode=debug_mode,
+            on_ready=ready_event.set if ready_event is not None else None
+        )
+    except Exception as e:
+        logger.error(f"Worker {camera.id} crashed: {e}")
+        raise
+
+
+def run_people_count_worker(
+    camera: CameraConfig,
+    api_base_url: str,
+    api_key: str,
+    location_id: int,
+    shutdown_event: Event,
+    debug_mode: bool = False,
+    ready_event: Optional[Event] = None
+) -> None:
+    """
+    Run anonymous people counting worker for a camera.
+    
+    This function runs in a separate process (no InsightFace is loaded).
+    ready_event is set once the camera is connected.
+    """
+    from people_counter import run_people_counter
+    
+    logger.info(f"Starting people_count worker for: {camera.name}")
+    
+    try:
+        run_people_counter(
+            camera_config=camera,
+            api_base_url=api_base_url,
+            api_key=api_key,
+            location_id=location_id,
+            debug_mode=debug_mode,
+            on_ready=ready_event.set if ready_event is not None else None
         )
     except Exception as e:
         logger.error(f"Worker {camera.id} crashed: {e}")
@@ -77,14 +116,86 @@ def run_face_recognition_worker(
 # PROCESS MANAGEMENT
 # =============================================================================
 
+def memory_usage(pid: int) -> Optional[Dict[str, float]]:
+    """
+    Memory of a process in MB, from /proc/<pid>/smaps_rollup (Linux only).
+    
+    Returns:
+        {'rss', 'pss', 'private'} or None if unavailable. RSS counts shared pages
+        in full; PSS splits them between the processes sharing them; private is
+        memory no other process shares.
+    """
+    fields = {'Rss:': 'rss', 'Pss:': 'pss', 'Private_Clean:': 'private', 'Private_Dirty:': 'private'}
+    usage = {'rss': 0.0, 'pss': 0.0, 'private': 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    usage[fields[parts[0]]] += int(parts[1]) / 1024
+    except OSError:
+        return None
+    return usage
+
+
+def format_memory(usage: Optional[Dict[str, float]]) -> str:
+    if usage is None:
+        return "memory n/a"
+    return f"RSS {usage['rss']:.0f}MB, PSS {usage['pss']:.0f}MB, private {usage['private']:.0f}MB"
+
+
 class WorkerManager:
-    """Manages worker processes for all cameras."""
+    """
+    Manages worker processes for all cameras.
     
-    def __init__(self, config: SystemConfig, debug_mode: bool = False):
+    With preload, the InsightFace modules and model weights are loaded once in
+    this process and workers are forked from it, so the weights are shared
+    copy-on-write instead of loaded per camera. ORT sessions are still created
+    in each worker after the fork (they are not fork-safe), on the shared weights.
+    """
+    
+    def __init__(self, config: SystemConfig, debug_mode: bool = False, preload: bool = False):
         self.config = config
         self.debug_mode = debug_mode
+        self.preload = preload
+        self.context = multiprocessing.get_context("fork" if preload else None)
         self.processes: Dict[str, Process] = {}
-        self.shutdown_event = Event()
+        self.shutdown_event = self.context.Event()
+        self.started: Dict[str, float] = {}  # Start time per worker
+        self.ready: Dict[str, Event] = {}  # Readiness per worker, until reported
+    
+    def preload_models(self, cameras: List[CameraConfig]) -> None:
+        """Import the inference modules and load model weights for workers to inherit."""
+        cameras = [c for c in cameras if c.use_case == "face_recognition"]
+        if not cameras:
+            return
+        
+        start = time.perf_counter()
+        # Imported once here, before the fork, instead of in every worker
+        import visitor_counter  # noqa: F401 - worker modules (cv2, numpy)
+        import insightface  # noqa: F401 - inference backends (imported lazily by the workers otherwise)
+        import onnxruntime  # noqa: F401
+        from face_recognition import preload_weights
+        
+        option_sets = []
+        for camera in cameras:
+            settings = camera.get_face_recognition_settings()
+            option_sets.append(dict(
+                intra_op_threads=settings.ort_intra_op_threads,
+                inter_op_threads=settings.ort_inter_op_threads,
+                execution_mode=settings.ort_execution_mode,
+                graph_optimization=settings.ort_graph_optimization,
+                memory_arena=settings.ort_memory_arena,
+                spin_wait=settings.ort_spin_wait
+            ))
+        weight_bytes = preload_weights(option_sets)
+        
+        # Objects allocated so far are never collected - otherwise the collector's
+        # refcount/flag writes in each worker would copy the shared pages
+        gc.freeze()
+        
+        logger.info(f"Preloaded {weight_bytes / 1e6:.0f}MB of model weights in "
+                    f"{time.perf_counter() - start:.1f}s ({format_memory(memory_usage(os.getpid()))})")
     
     def start_worker(self, camera: CameraConfig) -> None:
         """Start a worker process for a camera."""
@@ -97,11 +208,14 @@ class WorkerManager:
             target = run_face_recognition_worker
         elif camera.use_case == "live_stream":
             target = run_live_stream_worker
+        elif camera.use_case == "people_count":
+            target = run_people_count_worker
         else:
             logger.error(f"Unknown use case: {camera.use_case}")
             return
         
-        process = Process(
+        ready = self.context.Event()
+        process = self.context.Process(
             target=target,
             args=(
                 camera,
@@ -109,12 +223,15 @@ class WorkerManager:
                 self.config.api.key,
                 self.config.location.id,
                 self.shutdown_event,
-                self.debug_mode
+                self.debug_mode,
+                ready
             ),
             name=f"worker-{camera.id}"
         )
+        self.started[camera.id] = time.time()
         process.start()
         self.processes[camera.id] = process
+        self.ready[camera.id] = ready
         logger.info(f"Started worker: {camera.id} (PID: {process.pid})")
     
     def start_all(self, camera_ids: List[str] = None) -> None:
@@ -128,6 +245,9 @@ class WorkerManager:
             logger.error("No cameras to start")
             return
         
+        if self.preload:
+            self.preload_models(cameras)
+        
         logger.info(f"Starting {len(cameras)} camera worker(s)...")
         for camera in cameras:
             self.start_worker(camera)
@@ -148,11 +268,22 @@ class WorkerManager:
                     process.kill()
         
         self.processes.clear()
+        self.ready.clear()
         logger.info("All workers stopped")
     
+    def report_ready(self) -> None:
+        """Log startup time and memory of workers that became ready."""
+        for camera_id, ready in list(self.ready.items()):
+            if ready.is_set():
+                startup = time.time() - self.started[camera_id]
+                usage = memory_usage(self.processes[camera_id].pid)
+                logger.info(f"Worker {camera_id} ready in {startup:.1f}s ({format_memory(usage)})")
+                del self.ready[camera_id]
+    
     def monitor(self) -> None:
         """Monitor workers and restart if they crash."""
         while not self.shutdown_event.is_set():
+            self.report_ready()
             for camera_id, process in list(self.processes.items()):
                 if not process.is_alive():
                     exit_code = process.exitcode
@@ -160,6 +291,7 @@ class WorkerManager:
                         logger.warning(f"Worker {camera_id} exited with code {exit_code}")
                         # Could implement auto-restart here
                     del self.processes[camera_id]
+                    self.ready.pop(camera_id, None)
             
             time.sleep(1)
     
@@ -206,6 +338,7 @@ Examples:
   python main.py --list               # List configured cameras
   python main.py --validate           # Validate configuration
   python main.py --debug              # Enable debug mode
+  python main.py --preload            # Share model weights between workers (fork)
         """
     )
     parser.add_argument("--config", type=str, help="Path to cameras.yaml")
@@ -214,6 +347,8 @@ Examples:
     parser.add_argument("--list", action="store_true", help="List configured cameras")
     parser.add_argument("--validate", action="store_true", help="Validate config and exit")
     parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument("--preload", action="store_true",
+                        help="Load models once and fork workers sharing the weights (Linux)")
     
     args = parser.parse_args()
     
@@ -246,8 +381,12 @@ Examples:
         list_cameras(config)
         sys.exit(0)
     
+    if args.preload and "fork" not in multiprocessing.get_all_start_methods():
+        logger.error("--preload requires the fork start method (not available on this platform)")
+        sys.exit(1)
+    
     # Start workers
-    manager = WorkerManager(config, debug_mode=args.debug)
+    manager = WorkerManager(config, debug_mode=args.debug, preload=args.preload)
     
     # Setup signal handlers
     def signal_handler(signum, frame):
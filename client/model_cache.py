@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Model Cache Module
+Optimized ONNX Runtime models serialized once, loaded directly afterwards.
+
+Creating an InferenceSession parses the ONNX file and runs ORT's graph
+optimizations (constant folding, operator fusion, layout transforms) on every
+worker start. With a cache, the first start writes the optimized graph
+(SessionOptions.optimized_model_filepath) and later starts load it with
+optimizations disabled.
+
+Cache entries are keyed by a hash of the source model bytes, the ORT version,
+the CPU architecture, the execution providers and the session options, so a
+model update or a settings change never picks up a stale graph. Each entry has
+a sha256 sidecar written after the model is complete; an entry whose content
+does not match its sidecar (partial write, disk corruption) is discarded and
+rebuilt. Entries are written to a temporary file and renamed into place, so
+several workers starting at once cannot read a half-written model.
+
+The same download-then-verify approach protects the YuNet model
+(verified_model_file): it is fetched to a temporary file, renamed into place,
+and checked against its sidecar on every load.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import platform
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    """Hex sha256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sidecar(path: str) -> str:
+    return path + ".sha256"
+
+
+def _write_verified(path: str, write: Callable[[str], None]) -> None:
+    """Produce path through write(tmp_path), rename it into place, then record its sha256."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        digest = file_sha256(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    with open(f"{_sidecar(path)}.{os.getpid()}.tmp", 'w') as f:
+        f.write(digest)
+    os.replace(f"{_sidecar(path)}.{os.getpid()}.tmp", _sidecar(path))
+
+
+def is_intact(path: str) -> bool:
+    """Whether path exists and matches its sha256 sidecar."""
+    try:
+        with open(_sidecar(path)) as f:
+            expected = f.read().strip()
+        return os.path.exists(path) and file_sha256(path) == expected
+    except OSError:
+        return False
+
+
+def _discard(path: str) -> None:
+    for p in (path, _sidecar(path)):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def cache_key(model_path: str, options: Dict[str, Any], providers: List[str]) -> str:
+    """Hash identifying the optimized graph of a model under given settings."""
+    import onnxruntime as ort
+    meta = json.dumps({
+        "model": file_sha256(model_path),
+        "ort": ort.__version__,
+        "machine": platform.machine(),
+        "providers": list(providers),
+        "options": options,
+    }, sort_keys=True)
+    return hashlib.sha256(meta.encode()).hexdigest()[:16]
+
+
+def cached_model_path(model_path: str, options: Dict[str, Any], cache_dir: str,
+                      providers: Optional[List[str]] = None) -> str:
+    """Path of the cache entry for a model under given settings (may not exist yet)."""
+    providers = providers or ['CPUExecutionProvider']
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(cache_dir, f"{stem}.{cache_key(model_path, options, providers)}.onnx")
+
+
+def cached_session(
+    model_path: str,
+    options: Dict[str, Any],
+    make_options: Callable[..., Any],
+    cache_dir: Optional[str],
+    providers: Optional[List[str]] = None,
+    session_class: Optional[type] = None,
+    configure: Optional[Callable[[Any, str], None]] = None,
+    **session_kwargs
+) -> Tuple[Any, str]:
+    """
+    Create an inference session, going through the optimized-model cache.
+
+    Args:
+        model_path: Source ONNX model
+        options: Keyword arguments for make_options (the session's ORT options)
+        make_options: Builds ort.SessionOptions from options
+        cache_dir: Cache directory (None = no cache, plain session)
+        providers: Execution providers
+        session_class: InferenceSession (sub)class to instantiate (default ort.InferenceSession)
+        configure: Called as configure(sess_options, path) before each session is
+            created from path (the source model or its cache entry)
+        **session_kwargs: Further session constructor arguments (e.g. provider_options)
+
+    Returns:
+        (session, source) - source is "hit", "miss" (optimized and cached) or "off"
+    """
+    if session_class is None:
+        import onnxruntime as ort
+        session_class = ort.InferenceSession
+    providers = providers or ['CPUExecutionProvider']
+
+    def options_for(path: str, **overrides):
+        so = make_options(**dict(options, **overrides))
+        if configure is not None:
+            configure(so, path)
+        return so
+
+    def plain_session():
+        return session_class(model_path, sess_options=options_for(model_path), providers=providers, **session_kwargs)
+
+    if cache_dir is None:
+        return plain_session(), "off"
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = cached_model_path(model_path, options, cache_dir, providers)
+
+    if is_intact(cached):
+        # Already optimized - skip ORT's graph transformations at load
+        so = options_for(cached, graph_optimization="disabled")
+        try:
+            return session_class(cached, sess_options=so, providers=providers, **session_kwargs), "hit"
+        except Exception as e:
+            logger.warning(f"Cached model {cached} failed to load ({e}), rebuilding")
+    elif os.path.exists(cached):
+        logger.warning(f"Cached model {cached} failed its integrity check, rebuilding")
+    _discard(cached)
+
+    session = None
+
+    def optimize(tmp_path: str) -> None:
+        nonlocal session
+        so = options_for(model_path)
+        so.optimized_model_filepath = tmp_path
+        session = session_class(model_path, sess_options=so, providers=providers, **session_kwargs)
+
+    try:
+        _write_verified(cached, optimize)
+        logger.debug(f"Cached optimized model: {cached}")
+        return session, "miss"
+    except Exception as e:
+        # Read-only or full disk: serve an uncached session rather than failing the worker
+        logger.warning(f"Could not cache optimized model for {model_path}: {e}")
+        if session is None:
+            session = plain_session()
+        return session, "off"
+
+
+def verified_model_file(path: str, url: str) -> str:
+    """
+    Ensure a downloadable model file is present and intact.
+
+    Downloads to a temporary file and renames it into place, so an interrupted
+    download never leaves a truncated model. A file that no longer matches its
+    sha256 sidecar is downloaded again; a file without a sidecar (copied in by
+    hand, or from before the sidecar existed) is adopted as-is.
+
+    Args:
+        path: Local model path
+        url: Download URL
+
+    Returns:
+        path
+    """
+    import urllib.request
+
+    if os.path.exists(path) and not os.path.exists(_sidecar(path)):
+        with open(_sidecar(path), 'w') as f:
+            f.write(file_sha256(path))
+        return path
+    if is_intact(path):
+        return path
+    if os.path.exists(path):
+        logger.warning(f"{path} failed its integrity check, downloading again")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    print(f"Downloading {os.path.basename(path)} to {path}...")
+    _write_verified(path, lambda tmp: urllib.request.urlretrieve(url, tmp))
+    print(f"{os.path.basename(path)} downloaded.")
+    return path
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+People Counter - Anonymous Footfall Worker
+
+Counts people crossing a virtual line (exit doors, aisles) without
+recognizing them: no InsightFace, no embeddings, no images leave the device.
+
+Flow:
+1. Motion gate: skip detection while a small grayscale thumbnail is unchanged
+2. Detect faces (YuNet, low resolution)
+3. Track faces and count entry-line crossings (entries and exits)
+4. Report counts per period to the server in batches
+
+Runs at a fraction of the CPU of a face recognition worker (smaller frames,
+no capture bursts, detection skipped on static scenes), so several cameras
+can be counted per device.
+
+Can be run standalone or as a worker spawned by main.py.
+"""
+
+import cv2
+import time
+import argparse
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+import config as cfg
+from frame_quality import detect_faces
+from face_tracker import EntryLine, FaceTracker
+from api_client import ClientBridgeAPI
+from camera_manager import CameraConfig, load_config
+
+# =============================================================================
+# LOGGING SETUP
+# =============================================================================
+
+logging.basicConfig(
+    level=cfg.LOG_LEVEL,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+MOTION_THUMB_WIDTH = 160  # Width of the motion gate thumbnail
+MOTION_PIXEL_DELTA = 15  # Gray-level change for a thumbnail pixel to count as moving
+MAX_PENDING_PERIODS = 1440  # Undelivered periods kept for resending (1 day at 60s)
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def motion_thumbnail(frame: np.ndarray) -> np.ndarray:
+    """Small blurred grayscale thumbnail for the motion gate."""
+    h, w = frame.shape[:2]
+    thumb = cv2.resize(frame, (MOTION_THUMB_WIDTH, max(1, h * MOTION_THUMB_WIDTH // w)),
+                       interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY), (3, 3), 0)
+
+
+def motion_score(reference: Optional[np.ndarray], thumb: np.ndarray) -> float:
+    """
+    Percentage of thumbnail pixels that changed since the reference (inf without reference).
+
+    A changed-pixel fraction is not diluted by the static background the way a
+    mean difference is, so a single small face walking by still passes the gate.
+    """
+    if reference is None:
+        return float('inf')
+    return np.count_nonzero(cv2.absdiff(reference, thumb) > MOTION_PIXEL_DELTA) * 100.0 / thumb.size
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+# =============================================================================
+# MAIN LOOP
+# =============================================================================
+
+def run_people_counter(
+    camera_config: CameraConfig,
+    api_base_url: str,
+    api_key: str,
+    location_id: int,
+    debug_mode: bool = False,
+    on_ready: Optional[Callable[[], None]] = None
+) -> None:
+    """
+    Main people counting loop.
+
+    Args:
+        camera_config: people_count camera from cameras.yaml (entry_line required)
+        api_base_url: API base URL
+        api_key: API key
+        location_id: Location ID
+        debug_mode: Enable debug output
+        on_ready: Called once the camera is connected, before the first frame is processed
+    """
+    if debug_mode:
+        logger.setLevel(logging.DEBUG)
+
+    settings = camera_config.get_people_count_settings()
+    camera_source = camera_config.rtsp_url
+    camera_display = camera_source.split('@')[-1]
+
+    logger.info("=" * 70)
+    logger.info(f"PEOPLE COUNT WORKER: {camera_config.name} ({camera_config.id})")
+    logger.info("=" * 70)
+    logger.info(f"Camera: {camera_display}")
+    logger.info(f"Location ID: {location_id}")
+    logger.info(f"Processing: {settings.target_width}px, every {settings.process_every_n_frames} frame")
+    logger.info(f"Motion gate: {settings.motion_threshold if settings.motion_threshold > 0 else 'off'}")
+    logger.info(f"Entry line: {settings.entry_line.get('points')}, "
+                f"direction={settings.entry_line.get('direction', 'any')}")
+    logger.info(f"Report interval: {settings.report_interval_sec}s")
+    logger.info("=" * 70)
+
+    api = ClientBridgeAPI(base_url=api_base_url, api_key=api_key, location_id=location_id)
+
+    # Connect to camera
+    if camera_source.startswith("rtsp://"):
+        import os
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
+    elif camera_source.isdigit():
+        camera_source = int(camera_source)
+    cap = cv2.VideoCapture(camera_source)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    ret, frame = cap.read() if cap.isOpened() else (False, None)
+    if not ret:
+        logger.error(f"Cannot read from camera: {camera_display}")
+        return
+
+    h, w = frame.shape[:2]
+    width = settings.target_width
+    size = (width, int(h * width / w))
+    logger.info(f"Processing resolution: {size[0]}x{size[1]}")
+
+    # Entry line is normalized to the resized (uncropped) frame
+    tracker = FaceTracker(
+        iou_threshold=cfg.TRACKER_IOU_THRESHOLD,
+        max_centroid_distance=cfg.TRACKER_MAX_CENTROID_DISTANCE,
+        max_age_sec=cfg.TRACKER_MAX_AGE_SEC,
+        kalman=cfg.TRACKER_KALMAN,
+        entry_line=EntryLine.from_config(settings.entry_line, size)
+    )
+
+    # Count reports go out on a background thread; undelivered periods are resent
+    reporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="counts")
+    pending: List[Dict[str, Any]] = []
+    in_flight: Optional[Future] = None
+    in_flight_count = 0
+    period_start = time.time()
+    reported = {'entries': 0, 'exits': 0}
+
+    stats = {
+        'frames_processed': 0,
+        'motion_skipped': 0,
+        'detection_ms': [],
+        'reports_sent': 0,
+        'reports_failed': 0,
+        'start_time': time.time()
+    }
+    reference = None
+    frame_count = 0
+
+    if on_ready is not None:
+        on_ready()
+    logger.info("\nPeople counting started...")
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                logger.warning("Lost connection. Reconnecting...")
+                cap.release()
+                time.sleep(2)
+                cap = cv2.VideoCapture(camera_source)
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                continue
+
+            frame_count += 1
+            current_time = time.time()
+
+            # Close the period and hand pending periods to the reporter
+            if current_time - period_start >= settings.report_interval_sec:
+                pending.append({
+                    "start": _iso(period_start),
+                    "end": _iso(current_time),
+                    "entries": tracker.entries - reported['entries'],
+                    "exits": tracker.exits - reported['exits']
+                })
+                if in_flight is None:
+                    del pending[:-MAX_PENDING_PERIODS]
+                reported = {'entries': tracker.entries, 'exits': tracker.exits}
+                period_start = current_time
+            if in_flight is not None and in_flight.done():
+                response = in_flight.result()
+                if response.success:
+                    del pending[:in_flight_count]
+                    stats['reports_sent'] += 1
+                else:
+                    stats['reports_failed'] += 1
+                    logger.warning(f"Count report failed ({len(pending)} periods pending): {response.message}")
+                in_flight = None
+            if in_flight is None and pending:
+                in_flight_count = len(pending)
+                in_flight = reporter.submit(api.report_counts, camera_config.id, list(pending))
+
+            if frame_count % settings.process_every_n_frames != 0:
+                continue
+
+            frame_resized = cv2.resize(frame, size)
+            stats['frames_processed'] += 1
+
+            # Motion gate: nobody crosses the line in a static scene. The reference is the
+            # last detected frame, so slow movement accumulates until it passes the gate.
+            thumb = motion_thumbnail(frame_resized)
+            if settings.motion_threshold > 0 and motion_score(reference, thumb) < settings.motion_threshold:
+                stats['motion_skipped'] += 1
+                continue
+            reference = thumb
+
+            t0 = time.perf_counter()
+            faces = detect_faces(frame_resized, min_confidence=cfg.MIN_DET_CONF)
+            stats['detection_ms'].append((time.perf_counter() - t0) * 1000)
+
+            entries, exits = tracker.entries, tracker.exits
+            tracker.update([bbox for bbox, _ in faces], current_time)
+            if tracker.entries != entries or tracker.exits != exits:
+                logger.info(f"Crossing: {tracker.entries} in, {tracker.exits} out")
+
+    except KeyboardInterrupt:
+        logger.info("\nShutting down...")
+
+    finally:
+        cap.release()
+
+        # Flush the open period (and anything undelivered) before exiting
+        if in_flight is not None and in_flight.result().success:
+            del pending[:in_flight_count]
+        pending.append({
+            "start": _iso(period_start),
+            "end": _iso(time.time()),
+            "entries": tracker.entries - reported['entries'],
+            "exits": tracker.exits - reported['exits']
+        })
+        if api.report_counts(camera_config.id, pending).success:
+            stats['reports_sent'] += 1
+            pending.clear()
+        else:
+            stats['reports_failed'] += 1
+        reporter.shutdown(wait=False)
+
+        elapsed_min = (time.time() - stats['start_time']) / 60
+        processed = stats['frames_processed']
+        logger.info("\n" + "=" * 70)
+        logger.info(f"SESSION SUMMARY - {camera_config.name}")
+        logger.info("=" * 70)
+        logger.info(f"Entries: {tracker.entries}, exits: {tracker.exits}, tracks: {tracker.tracks_created}")
+        if processed:
+            logger.info(f"Frames processed: {processed}, motion-skipped: {stats['motion_skipped']} "
+                        f"({stats['motion_skipped'] / processed * 100:.0f}%)")
+        if stats['detection_ms']:
+            logger.info(f"Detection: {np.mean(stats['detection_ms']):.1f}ms avg")
+        logger.info(f"Reports: {stats['reports_sent']} sent, {stats['reports_failed']} failed, "
+                    f"{len(pending)} periods undelivered")
+        if elapsed_min > 0:
+            logger.info(f"Throughput: {(tracker.entries + tracker.exits) / elapsed_min:.2f} crossings/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="People Counter (anonymous footfall)")
+    parser.add_argument("--config", type=str, help="Path to cameras.yaml")
+    parser.add_argument("--camera", type=str, required=True, help="people_count camera ID")
+    parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    camera = config.get_camera_by_id(args.camera)
+    if camera is None or camera.use_case != "people_count":
+        parser.error(f"No people_count camera '{args.camera}' in configuration")
+
+    run_people_counter(
+        camera_config=camera,
+        api_base_url=config.api.base_url,
+        api_key=config.api.key,
+        location_id=config.location.id,
+        debug_mode=args.debug
+    )
+
+
+if __name__ == "__main__":
+    main()
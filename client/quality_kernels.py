@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Quality Kernels Module
+Batch versions of the cheap per-frame quality curves in frame_quality.py.
+
+compute_quality_score evaluates face size, head pose, frontality, brightness,
+contrast and the multiplicative penalty as branchy scalar Python, re-reading
+config for every frame. For a whole burst the same math runs here as one fused
+kernel over arrays: bboxes, landmarks and ROI mean/std in, factor scores,
+yaw/pitch and running totals out. Sharpness stays in OpenCV.
+
+Backends:
+- numba: JIT-compiled loop (only if numba is importable)
+- numpy: vectorized fallback
+
+The scalar functions in frame_quality.py remain the reference implementation;
+test/quality_kernels_parity.py checks both backends against them.
+"""
+
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+
+# Metrics computed by the kernel, in the same order as METRIC_EVAL_ORDER
+KERNEL_METRICS: Tuple[str, ...] = ('face_size', 'frontality', 'brightness', 'contrast')
+
+KERNEL_BACKENDS: Tuple[str, ...] = ('numba', 'numpy')
+
+# Packed threshold layout: (QUALITY_THRESHOLDS section, key, fallback)
+# Fallbacks match the scalar functions in frame_quality.py
+_THRESHOLD_LAYOUT: Tuple[Tuple[str, str, float], ...] = (
+    ('face_size', 'zero_px', 60),
+    ('face_size', 'critical_px', 105),
+    ('brightness', 'critical_low', 30),
+    ('brightness', 'good_low', 80),
+    ('brightness', 'good_high', 180),
+    ('brightness', 'critical_high', 230),
+    ('contrast', 'critical', 15),
+    ('contrast', 'good', 50),
+    ('frontality', 'critical_yaw', 35),
+    ('frontality', 'good_yaw', 15),
+    ('frontality', 'critical_pitch', 30),
+    ('frontality', 'good_pitch', 10),
+)
+
+
+def pack_thresholds(thresholds: Dict[str, Dict[str, float]]) -> np.ndarray:
+    """
+    Flatten QUALITY_THRESHOLDS into the array layout used by the kernels.
+
+    Args:
+        thresholds: Dict shaped like config.QUALITY_THRESHOLDS
+
+    Returns:
+        float64 array (see _THRESHOLD_LAYOUT)
+    """
+    return np.array([thresholds.get(section, {}).get(key, fallback)
+                     for section, key, fallback in _THRESHOLD_LAYOUT], dtype=np.float64)
+
+
+def pack_importance(importance: Dict[str, float], defaults: Dict[str, float]) -> np.ndarray:
+    """Importance values for KERNEL_METRICS as a float64 array."""
+    return np.array([importance.get(name, defaults[name]) for name in KERNEL_METRICS], dtype=np.float64)
+
+
+def resolve_backend(backend: str) -> str:
+    """
+    Map a configured backend name to one that is usable here.
+
+    Args:
+        backend: "auto", "numba" or "numpy"
+
+    Returns:
+        "numba" if requested (or auto) and importable, otherwise "numpy"
+    """
+    if backend in ('auto', 'numba') and NUMBA_AVAILABLE:
+        return 'numba'
+    if backend == 'numba':
+        logger.warning("numba not installed - using numpy quality kernels")
+    return 'numpy'
+
+
+# =============================================================================
+# NUMPY BACKEND
+# =============================================================================
+
+def _frontality_component(abs_angle: np.ndarray, good: float, critical: float) -> np.ndarray:
+    """Vectorized yaw/pitch component of score_frontality."""
+    linear = 0.3 + 0.7 * ((critical - abs_angle) / (critical - good))
+    overshoot = np.minimum((abs_angle - critical) / (90 - critical), 1.0)
+    beyond = 0.3 * ((1 - overshoot) ** 2)
+    return np.where(abs_angle <= good, 1.0, np.where(abs_angle <= critical, linear, beyond))
+
+
+def _score_batch_numpy(
+    bboxes: np.ndarray,
+    landmarks: np.ndarray,
+    roi_mean: np.ndarray,
+    roi_std: np.ndarray,
+    thresholds: np.ndarray,
+    importance: np.ndarray,
+    base_score: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    (zero_px, critical_px, b_crit_low, b_good_low, b_good_high, b_crit_high,
+     c_crit, c_good, crit_yaw, good_yaw, crit_pitch, good_pitch) = thresholds
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x1, y1, x2, y2 = (bboxes[:, k].astype(np.float64) for k in range(4))
+        face_w = x2 - x1
+        face_h = y2 - y1
+
+        # Face size (score_face_size)
+        ratio = (face_w - zero_px) / (critical_px - zero_px)
+        face_size = np.where(face_w >= critical_px, 1.0, np.where(face_w <= zero_px, 0.0, ratio ** 2))
+
+        # Head pose (estimate_head_pose_from_landmarks)
+        re_x, re_y = landmarks[:, 0, 0], landmarks[:, 0, 1]
+        le_x, le_y = landmarks[:, 1, 0], landmarks[:, 1, 1]
+        nose_y = landmarks[:, 2, 1]
+        eye_center_x = (le_x + re_x) / 2
+        eye_center_y = (le_y + re_y) / 2
+        face_center_x = (x1 + x2) / 2
+        yaw = ((eye_center_x - face_center_x) / face_w) * 60
+        pitch = (((nose_y - eye_center_y) - face_h * 0.25) / face_h) * 40
+        eye_slope = (re_y - le_y) / np.maximum(np.abs(re_x - le_x), 1)
+        pitch = pitch + (np.abs(eye_slope) * 15) * 0.3
+
+        # Frontality (score_frontality)
+        frontality = (0.6 * _frontality_component(np.abs(yaw), good_yaw, crit_yaw)
+                      + 0.4 * _frontality_component(np.abs(pitch), good_pitch, crit_pitch))
+
+        # Brightness (score_brightness)
+        low_linear = 0.4 + 0.6 * ((roi_mean - b_crit_low) / (b_good_low - b_crit_low))
+        low_beyond = 0.4 * ((roi_mean / b_crit_low) ** 2)
+        high_linear = 0.4 + 0.6 * ((b_crit_high - roi_mean) / (b_crit_high - b_good_high))
+        high_beyond = 0.4 * ((1 - (roi_mean - b_crit_high) / (255 - b_crit_high)) ** 2)
+        brightness = np.where(
+            (roi_mean >= b_good_low) & (roi_mean <= b_good_high), 1.0,
+            np.where(roi_mean < b_good_low,
+                     np.where(roi_mean >= b_crit_low, low_linear, low_beyond),
+                     np.where(roi_mean <= b_crit_high, high_linear, high_beyond)))
+
+        # Contrast (score_contrast)
+        contrast = np.where(roi_std >= c_good, 1.0,
+                            np.where(roi_std >= c_crit,
+                                     0.3 + 0.7 * ((roi_std - c_crit) / (c_good - c_crit)),
+                                     0.3 * ((roi_std / c_crit) ** 2)))
+
+    factors = np.stack([face_size, frontality, brightness, contrast], axis=1)
+
+    # Multiplicative penalty (apply_penalty), in KERNEL_METRICS order
+    totals = np.full(len(bboxes), float(base_score))
+    for m in range(len(KERNEL_METRICS)):
+        if importance[m] == 0:
+            factors[:, m] = 1.0
+            continue
+        totals = totals * (np.clip(factors[:, m], 0.001, 1.0) ** (importance[m] / 5.0))
+
+    return factors, yaw, pitch, totals
+
+
+# =============================================================================
+# NUMBA BACKEND
+# =============================================================================
+
+def _score_batch_loop(bboxes, landmarks, roi_mean, roi_std, thresholds, importance, base_score):
+    """Fused per-frame loop; compiled with numba.njit when available."""
+    n = bboxes.shape[0]
+    factors = np.ones((n, 4))
+    yaw_out = np.empty(n)
+    pitch_out = np.empty(n)
+    totals = np.empty(n)
+
+    zero_px = thresholds[0]
+    critical_px = thresholds[1]
+    b_crit_low = thresholds[2]
+    b_good_low = thresholds[3]
+    b_good_high = thresholds[4]
+    b_crit_high = thresholds[5]
+    c_crit = thresholds[6]
+    c_good = thresholds[7]
+    crit_yaw = thresholds[8]
+    good_yaw = thresholds[9]
+    crit_pitch = thresholds[10]
+    good_pitch = thresholds[11]
+
+    for i in range(n):
+        x1 = float(bboxes[i, 0])
+        y1 = float(bboxes[i, 1])
+        x2 = float(bboxes[i, 2])
+        y2 = float(bboxes[i, 3])
+        face_w = x2 - x1
+        face_h = y2 - y1
+
+        # Face size
+        if face_w >= critical_px:
+            face_size = 1.0
+        elif face_w <= zero_px:
+            face_size = 0.0
+        else:
+            ratio = (face_w - zero_px) / (critical_px - zero_px)
+            face_size = ratio ** 2
+
+        # Head pose
+        re_x = landmarks[i, 0, 0]
+        re_y = landmarks[i, 0, 1]
+        le_x = landmarks[i, 1, 0]
+        le_y = landmarks[i, 1, 1]
+        nose_y = landmarks[i, 2, 1]
+        eye_center_x = (le_x + re_x) / 2
+        eye_center_y = (le_y + re_y) / 2
+        face_center_x = (x1 + x2) / 2
+        yaw = ((eye_center_x - face_center_x) / face_w) * 60
+        pitch = (((nose_y - eye_center_y) - face_h * 0.25) / face_h) * 40
+        eye_slope = (re_y - le_y) / max(abs(re_x - le_x), 1.0)
+        pitch = pitch + (abs(eye_slope) * 15) * 0.3
+
+        # Frontality
+        abs_yaw = abs(yaw)
+        if abs_yaw <= good_yaw:
+            yaw_score = 1.0
+        elif abs_yaw <= crit_yaw:
+            yaw_score = 0.3 + 0.7 * ((crit_yaw - abs_yaw) / (crit_yaw - good_yaw))
+        else:
+            overshoot = min((abs_yaw - crit_yaw) / (90 - crit_yaw), 1.0)
+            yaw_score = 0.3 * ((1 - overshoot) ** 2)
+        abs_pitch = abs(pitch)
+        if abs_pitch <= good_pitch:
+            pitch_score = 1.0
+        elif abs_pitch <= crit_pitch:
+            pitch_score = 0.3 + 0.7 * ((crit_pitch - abs_pitch) / (crit_pitch - good_pitch))
+        else:
+            overshoot = min((abs_pitch - crit_pitch) / (90 - crit_pitch), 1.0)
+            pitch_score = 0.3 * ((1 - overshoot) ** 2)
+        frontality = 0.6 * yaw_score + 0.4 * pitch_score
+
+        # Brightness
+        mean = roi_mean[i]
+        if b_good_low <= mean <= b_good_high:
+            brightness = 1.0
+        elif mean < b_good_low:
+            if mean >= b_crit_low:
+                brightness = 0.4 + 0.6 * ((mean - b_crit_low) / (b_good_low - b_crit_low))
+            else:
+                brightness = 0.4 * ((mean / b_crit_low) ** 2)
+        else:
+            if mean <= b_crit_high:
+                brightness = 0.4 + 0.6 * ((b_crit_high - mean) / (b_crit_high - b_good_high))
+            else:
+                overshoot = (mean - b_crit_high) / (255 - b_crit_high)
+                brightness = 0.4 * ((1 - overshoot) ** 2)
+
+        # Contrast
+        std = roi_std[i]
+        if std >= c_good:
+            contrast = 1.0
+        elif std >= c_crit:
+            contrast = 0.3 + 0.7 * ((std - c_crit) / (c_good - c_crit))
+        else:
+            contrast = 0.3 * ((std / c_crit) ** 2)
+
+        # Multiplicative penalty, in KERNEL_METRICS order
+        values = (face_size, frontality, brightness, contrast)
+        total = base_score
+        for m in range(4):
+            if importance[m] == 0:
+                continue
+            value = max(0.001, min(1.0, values[m]))
+            factors[i, m] = values[m]
+            total = total * value ** (importance[m] / 5.0)
+
+        yaw_out[i] = yaw
+        pitch_out[i] = pitch
+        totals[i] = total
+
+    return factors, yaw_out, pitch_out, totals
+
+
+if NUMBA_AVAILABLE:
+    _score_batch_numba = numba.njit(cache=True, error_model="numpy")(_score_batch_loop)
+else:
+    _score_batch_numba = None
+
+
+# =============================================================================
+# PUBLIC API
+# =============================================================================
+
+def score_batch(
+    bboxes: np.ndarray,
+    landmarks: np.ndarray,
+    roi_mean: np.ndarray,
+    roi_std: np.ndarray,
+    thresholds: np.ndarray,
+    importance: np.ndarray,
+    base_score: float,
+    backend: str = 'numpy'
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score the cheap quality metrics for a batch of faces.
+
+    Args:
+        bboxes: (N, 4) face boxes (x1, y1, x2, y2)
+        landmarks: (N, 3, 2) right eye, left eye, nose (YuNet order)
+        roi_mean: (N,) grayscale mean of the padded face ROI
+        roi_std: (N,) grayscale std of the padded face ROI
+        thresholds: Output of pack_thresholds()
+        importance: Output of pack_importance()
+        base_score: Score before penalties
+        backend: "numba" or "numpy" (see resolve_backend)
+
+    Returns:
+        (factors, yaw, pitch, totals)
+        - factors: (N, 4) scores in KERNEL_METRICS order (1.0 where importance is 0)
+        - yaw, pitch: (N,) head pose in degrees
+        - totals: (N,) base_score × Π factor^(importance/5), before sharpness
+    """
+    args = (
+        np.ascontiguousarray(bboxes, dtype=np.float64),
+        np.ascontiguousarray(landmarks, dtype=np.float64),
+        np.ascontiguousarray(roi_mean, dtype=np.float64),
+        np.ascontiguousarray(roi_std, dtype=np.float64),
+        np.ascontiguousarray(thresholds, dtype=np.float64),
+        np.ascontiguousarray(importance, dtype=np.float64),
+        float(base_score),
+    )
+    if backend == 'numba' and _score_batch_numba is not None:
+        return _score_batch_numba(*args)
+    return _score_batch_numpy(*args)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Speculative Identification Module
+Sends an early identify request while the capture burst is still running.
+
+The first burst frame whose complete quality score passes the gate is
+embedded and sent to the server on a background thread. The face is aligned
+on the scorer's own YuNet keypoints (extract_aligned_embeddings), so with
+several people in the frame the embedding and the uploaded bbox belong to the
+same person; without keypoints, the InsightFace face overlapping the scored
+bbox is used. Time-to-identify then no longer includes the rest of the
+burst, scoring and fusion:
+
+    - A confident result (returning, similarity >= threshold + margin) is
+      final: the burst is stopped and no fused embedding is computed.
+    - Otherwise the burst completes as usual. If the fused embedding is nearly
+      identical to the speculative one, the server would decide the same way
+      and the speculative result stands (early hit).
+    - Else the fused embedding is sent with `supersedes` set to the speculative
+      result; the server reverts it (removes the visitor it created, or takes
+      back the visit it counted) before matching the refined embedding.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from api_client import APIResponse, ClientBridgeAPI
+from face_recognition import cosine_similarity, extract_aligned_embeddings, extract_embeddings
+from face_tracker import bbox_iou
+from frame_quality import QualityScore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeculativeResult:
+    """Outcome of a speculative identify request."""
+    frame_idx: int
+    embedding: np.ndarray  # Unit-length embedding that was sent
+    det_score: float
+    response: APIResponse
+    latency_ms: float  # Trigger -> server response
+    confident: bool  # Final without refinement
+
+
+class SpeculativeIdentifier:
+    """
+    Early identify from the first frame that passes the quality gate.
+
+    Usage (one instance per camera worker, reused across bursts):
+        spec = SpeculativeIdentifier(api, min_detection_score=0.7, confident_similarity=0.55)
+        spec.start(trigger_time, on_confident=scorer.request_stop)
+        scorer = OnlineBurstScorer(..., on_pass=spec.submit)
+        ...capture...
+        result = spec.result()   # None if nothing was sent
+        if result and not result.confident and spec.needs_refinement(result, fused):
+            api.identify(fused, frame, bbox, supersedes=result.response)
+    """
+
+    def __init__(
+        self,
+        api: ClientBridgeAPI,
+        min_detection_score: float,
+        confident_similarity: float,
+        confirm_similarity: float = 0.95
+    ):
+        """
+        Args:
+            api: API client used for the speculative request
+            min_detection_score: InsightFace confidence gate (same as fusion)
+            confident_similarity: Returning similarity at which the result is final
+            confirm_similarity: cos(fused, speculative) at or above which no refinement is sent
+        """
+        self.api = api
+        self.min_detection_score = min_detection_score
+        self.confident_similarity = confident_similarity
+        self.confirm_similarity = confirm_similarity
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative")
+        self._lock = threading.Lock()
+        self._future: Optional[Future] = None
+        self._trigger_time = 0.0
+        self._on_confident: Optional[Callable[[str], None]] = None
+
+    def start(self, trigger_time: float, on_confident: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Reset for a new burst.
+
+        Args:
+            trigger_time: time.perf_counter() at face detection (latency reference)
+            on_confident: Called with "identified" once a confident result arrives
+        """
+        with self._lock:
+            self._future = None
+            self._trigger_time = trigger_time
+            self._on_confident = on_confident
+
+    def submit(self, idx: int, frame_hires: np.ndarray, frame_lowres: np.ndarray,
+               score: QualityScore, keypoints: Optional[np.ndarray] = None,
+               det_score: float = 0.0) -> None:
+        """
+        Send the first passing frame of the burst (later calls are ignored).
+
+        Args:
+            idx: Frame index within the burst
+            frame_hires: Cropped hires frame
+            frame_lowres: Resized frame the score was computed on
+            score: Passing quality score (its bbox is the face sent)
+            keypoints: (5, 2) YuNet landmarks of that face in lowres coordinates
+            det_score: YuNet confidence of that face
+        """
+        with self._lock:
+            if self._future is not None:
+                return
+            self._future = self._executor.submit(self._identify, idx, frame_hires, frame_lowres,
+                                                 score, keypoints, det_score,
+                                                 self._trigger_time, self._on_confident)
+
+    def _embed(self, frame_hires: np.ndarray, frame_lowres: np.ndarray, score: QualityScore,
+               keypoints: Optional[np.ndarray], det_score: float) -> Optional[Tuple[np.ndarray, float]]:
+        """Raw embedding and detection score of the scored face, or None if it fails the gate."""
+        scale = np.array([frame_hires.shape[1] / frame_lowres.shape[1],
+                          frame_hires.shape[0] / frame_lowres.shape[0]], dtype=np.float32)
+        if keypoints is not None:
+            if det_score < self.min_detection_score:
+                return None
+            embeddings, _ = extract_aligned_embeddings([frame_hires], [keypoints * scale])
+            return embeddings[0], det_score
+
+        # Scored by full-frame YuNet: take the InsightFace face at the scored bbox
+        bbox = tuple(np.asarray(score.bbox, dtype=np.float32) * np.tile(scale, 2))
+        faces = [(bbox_iou(bbox, tuple(face_bbox)), embedding, face_det_score)
+                 for embedding, face_bbox, face_det_score in extract_embeddings(frame_hires)]
+        if not faces:
+            return None
+        iou, embedding, face_det_score = max(faces, key=lambda f: f[0])
+        if iou <= 0 or face_det_score < self.min_detection_score:
+            return None
+        return embedding, float(face_det_score)
+
+    def _identify(self, idx: int, frame_hires: np.ndarray, frame_lowres: np.ndarray,
+                  score: QualityScore, keypoints: Optional[np.ndarray], det_score: float,
+                  trigger_time: float,
+                  on_confident: Optional[Callable[[str], None]]) -> Optional[SpeculativeResult]:
+        face = self._embed(frame_hires, frame_lowres, score, keypoints, det_score)
+        if face is None:
+            return None
+        embedding, det_score = face
+        embedding = embedding / np.linalg.norm(embedding)
+
+        response = self.api.identify(embedding, frame_lowres, score.bbox)
+        latency_ms = (time.perf_counter() - trigger_time) * 1000
+        confident = (response.success and response.status == "returning"
+                     and response.similarity is not None
+                     and response.similarity >= self.confident_similarity)
+        logger.debug(f"Speculative identify (frame {idx}): {response.status} "
+                     f"#{response.customer_id} after {latency_ms:.0f}ms, confident={confident}")
+        if confident and on_confident is not None:
+            on_confident("identified")
+        return SpeculativeResult(idx, embedding, float(det_score), response, latency_ms, confident)
+
+    def result(self, timeout: Optional[float] = None) -> Optional[SpeculativeResult]:
+        """
+        Wait for the speculative request of the current burst.
+
+        Returns:
+            SpeculativeResult, or None if nothing was sent, the frame failed the
+            detection gate, the request failed, or it did not finish in time
+        """
+        with self._lock:
+            future = self._future
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Speculative identify failed: {e}")
+            return None
+        if result is None or not result.response.success:
+            return None
+        return result
+
+    def needs_refinement(self, result: SpeculativeResult, fused_embedding: np.ndarray) -> bool:
+        """Whether the fused embedding could change the server's decision."""
+        if result.confident:
+            return False
+        return cosine_similarity(result.embedding, fused_embedding) < self.confirm_similarity
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
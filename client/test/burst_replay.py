@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Burst Replay Helpers
+
+Loads capture bursts from disk so benchmarks can replay them through the
+scoring/recognition pipeline without a live camera.
+
+Supported sources:
+    - Debug frame stream root (DEBUG_FRAMES_OUTPUT_DIR): every session
+      subfolder (frame_*.jpg + metadata.json) is one burst
+    - A single session folder: one burst
+    - A video file: split into consecutive bursts of `burst_len` frames,
+      cropped the same way as the live pipeline
+
+Each burst is returned as a list of (cropped_hires, resized_lowres) tuples,
+the same format as PersonCapture.frames.
+"""
+
+import os
+import sys
+import glob
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from visitor_counter import crop_frame, resize_frame
+
+
+Burst = List[Tuple[np.ndarray, np.ndarray]]
+
+
+def _load_session_dir(session_dir: str, target_width: int) -> Burst:
+    """Load one debug session folder (hires frames saved by save_debug_frame_stream)."""
+    burst = []
+    for path in sorted(glob.glob(os.path.join(session_dir, "frame_*.jpg"))):
+        hires = cv2.imread(path)
+        if hires is None:
+            continue
+        burst.append((hires, resize_frame(hires, target_width)))
+    return burst
+
+
+def _load_video(video_path: str, target_width: int, burst_len: int, max_frames: int) -> List[Burst]:
+    """Split a video into bursts, applying the live pipeline's crop."""
+    cap = cv2.VideoCapture(video_path)
+    bursts = []
+    current = []
+    count = 0
+
+    while max_frames <= 0 or count < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        count += 1
+
+        frame_cropped = crop_frame(frame, crop_left=0.35, crop_right=0.35,
+                                   crop_top=0.10, crop_bottom=0.40)
+        current.append((frame_cropped.copy(), resize_frame(frame_cropped, target_width)))
+
+        if len(current) >= burst_len:
+            bursts.append(current)
+            current = []
+
+    cap.release()
+    if current:
+        bursts.append(current)
+    return bursts
+
+
+def session_label(session_dir: str) -> Optional[str]:
+    """
+    Visitor ID from a debug session folder name ({session_id}_{result}_{visitor_id}).
+
+    Returns:
+        The visitor ID as a string, or None if the session has no identified visitor
+    """
+    visitor_id = os.path.basename(os.path.normpath(session_dir)).rsplit("_", 1)[-1]
+    if not visitor_id.isdigit() or int(visitor_id) <= 0:
+        return None
+    return visitor_id
+
+
+def load_labeled_bursts(root: str, target_width: int = 1280) -> List[Tuple[Optional[str], Burst]]:
+    """
+    Load every debug session under root together with its visitor ID.
+
+    Labels are the server's decisions at capture time, not ground truth.
+
+    Returns:
+        List of (visitor_id or None, burst)
+    """
+    bursts = []
+    for session_dir in sorted(glob.glob(os.path.join(root, "*"))):
+        if os.path.isdir(session_dir):
+            burst = _load_session_dir(session_dir, target_width)
+            if burst:
+                bursts.append((session_label(session_dir), burst))
+    return bursts
+
+
+def load_bursts(
+    source: str,
+    target_width: int = 1280,
+    burst_len: int = 25,
+    max_frames: int = 0
+) -> List[Burst]:
+    """
+    Load capture bursts from a debug frame directory or a video file.
+
+    Args:
+        source: Debug frames root, single session folder, or video file
+        target_width: Lowres width used for scoring
+        burst_len: Frames per burst when splitting a video
+        max_frames: Stop after this many video frames (0 = all)
+
+    Returns:
+        List of bursts, each a list of (hires, lowres) tuples
+    """
+    if os.path.isfile(source):
+        return _load_video(source, target_width, burst_len, max_frames)
+
+    if glob.glob(os.path.join(source, "frame_*.jpg")):
+        return [_load_session_dir(source, target_width)]
+
+    bursts = []
+    for session_dir in sorted(glob.glob(os.path.join(source, "*"))):
+        if os.path.isdir(session_dir):
+            burst = _load_session_dir(session_dir, target_width)
+            if burst:
+                bursts.append(burst)
+    return bursts
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cold Start Benchmark
+
+Measures how long a fresh camera worker takes from process start to its first
+detection and first embedding, with and without the optimized ONNX Runtime
+model cache (config.MODEL_CACHE_DIR). Every run is a new Python process, as a
+worker spawned by main.py would be.
+
+Conditions:
+    no cache    - sessions built from the source models (graph optimization at every start)
+    cold cache  - empty cache directory: optimize, then write the cache
+    warm cache  - cache written by the previous condition: load the optimized models
+
+Reported per condition (median over runs): module import, InsightFace analyzer
+load, first YuNet detection, first embedding, and total to first embedding.
+
+Usage:
+    python test/cold_start_benchmark.py
+    python test/cold_start_benchmark.py --runs 5
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ("import_ms", "analyzer_ms", "first_detection_ms", "first_embedding_ms", "total_ms")
+
+
+def child(cache_dir: str):
+    """One worker start: print stage timings as JSON."""
+    start = time.perf_counter()
+    import face_recognition
+    from frame_quality import detect_faces
+    timings = {"import_ms": (time.perf_counter() - start) * 1000}
+
+    face_recognition.MODEL_CACHE_DIR = cache_dir or None
+    t0 = time.perf_counter()
+    face_recognition.get_face_analyzer()
+    timings["analyzer_ms"] = (time.perf_counter() - t0) * 1000
+
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    t0 = time.perf_counter()
+    detect_faces(frame)
+    timings["first_detection_ms"] = (time.perf_counter() - t0) * 1000
+
+    crop = np.random.randint(0, 255, (1, 112, 112, 3), dtype=np.uint8)
+    t0 = time.perf_counter()
+    face_recognition.get_recognition_model().get_feat(list(crop))
+    timings["first_embedding_ms"] = (time.perf_counter() - t0) * 1000
+
+    timings["total_ms"] = (time.perf_counter() - start) * 1000
+    print(json.dumps(timings))
+
+
+def run_child(cache_dir: str):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--cache-dir", cache_dir],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold start benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="Process starts per condition")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.cache_dir)
+        return
+
+    print("=" * 70)
+    print("Cold Start Benchmark")
+    print("=" * 70)
+    print(f"{args.runs} process starts per condition (median)")
+    print()
+
+    # Model files downloaded once up front so no condition pays for the download
+    run_child("")
+
+    cache_dir = tempfile.mkdtemp(prefix="ort_cache_")
+    results = {}
+    try:
+        results["no cache"] = [run_child("") for _ in range(args.runs)]
+        cold = []
+        for _ in range(args.runs):
+            shutil.rmtree(cache_dir)
+            cold.append(run_child(cache_dir))
+        results["cold cache"] = cold
+        results["warm cache"] = [run_child(cache_dir) for _ in range(args.runs)]
+        cache_mb = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir)) / 1e6
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"  {'Condition':<12}" + "".join(f"{s[:-3]:>20}" for s in STAGES))
+    print("-" * (12 + 20 * len(STAGES) + 2))
+    medians = {}
+    for name, runs in results.items():
+        medians[name] = {s: float(np.median([r[s] for r in runs])) for s in STAGES}
+        print(f"  {name:<12}" + "".join(f"{medians[name][s]:>18.0f}ms" for s in STAGES))
+
+    base, warm = medians["no cache"], medians["warm cache"]
+    print()
+    print(f"Cache size: {cache_mb:.1f} MB")
+    print(f"Analyzer load: {base['analyzer_ms']:.0f}ms -> {warm['analyzer_ms']:.0f}ms "
+          f"({base['analyzer_ms'] / warm['analyzer_ms']:.2f}x)")
+    print(f"Start to first embedding: {base['total_ms']:.0f}ms -> {warm['total_ms']:.0f}ms "
+          f"({base['total_ms'] - warm['total_ms']:.0f}ms saved per worker start)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Early-Exit Quality Scoring Benchmark
+
+Replays capture bursts through score_frames_dual twice:
+    1. Full scoring (every metric on every frame, as before early exit)
+    2. Branch-and-bound scoring (cheapest-first, stop below gate / top-N cutoff)
+
+Reports how many Laplacians (sharpness) were avoided, scoring time, and
+whether the selected top-N frames are identical.
+
+Usage:
+    python test/early_exit_benchmark.py /home/mafiq/zmisc/debug_frames
+    python test/early_exit_benchmark.py entrance.mp4 --burst-len 25
+    python test/early_exit_benchmark.py entrance.mp4 --sharpness-importance 6
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+from frame_quality import score_frames_dual
+from burst_replay import load_bursts
+
+
+def run_bursts(bursts, min_score, top_n):
+    """Score all bursts, returning (elapsed_ms, frames_with_face, laplacians, top_n indices per burst)."""
+    elapsed = 0.0
+    faces = 0
+    laplacians = 0
+    selections = []
+
+    for burst in bursts:
+        t0 = time.perf_counter()
+        scored = score_frames_dual(burst, min_score=min_score, top_n=top_n)
+        elapsed += (time.perf_counter() - t0) * 1000
+
+        faces += len(scored)
+        laplacians += sum(1 for _, _, _, s in scored if 'sharpness' not in s.skipped)
+        complete = [(idx, s) for idx, _, _, s in scored if not s.partial]
+        selections.append([idx for idx, s in complete if min_score is None or s.total >= min_score][:cfg.EMBEDDING_FUSION_TOP_N])
+
+    return elapsed, faces, laplacians, selections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Early-exit quality scoring benchmark")
+    parser.add_argument("source", help="Debug frames dir, session dir, or video file")
+    parser.add_argument("--burst-len", type=int, default=25, help="Frames per burst for video input")
+    parser.add_argument("--max-frames", type=int, default=0, help="Max video frames to read (0 = all)")
+    parser.add_argument("--min-quality", type=float, default=cfg.MIN_QUALITY_SCORE, help="Quality gate")
+    parser.add_argument("--sharpness-importance", type=float, default=None,
+                        help="Override sharpness importance (config default is 0 = never computed)")
+    args = parser.parse_args()
+
+    if args.sharpness_importance is not None:
+        cfg.QUALITY_IMPORTANCE = dict(cfg.QUALITY_IMPORTANCE, sharpness=args.sharpness_importance)
+
+    print("=" * 70)
+    print("Early-Exit Quality Scoring Benchmark")
+    print("=" * 70)
+    print(f"Importance: {cfg.QUALITY_IMPORTANCE}")
+    print(f"Gate: {args.min_quality:.0f}, top N: {cfg.EMBEDDING_FUSION_TOP_N}")
+
+    bursts = load_bursts(args.source, burst_len=args.burst_len, max_frames=args.max_frames)
+    total_frames = sum(len(b) for b in bursts)
+    print(f"Loaded {len(bursts)} bursts ({total_frames} frames)")
+    print()
+
+    # Baseline: all five metrics on every frame (what compute_quality_score did before)
+    saved_importance = cfg.QUALITY_IMPORTANCE
+    cfg.QUALITY_IMPORTANCE = {k: (v if v > 0 else 1e-9) for k, v in saved_importance.items()}
+    base_ms, base_faces, base_lap, _ = run_bursts(bursts, None, None)
+    cfg.QUALITY_IMPORTANCE = saved_importance
+
+    # Same importance, no early exit (isolates the cost of zero-importance metrics)
+    full_ms, _, full_lap, full_sel = run_bursts(bursts, None, None)
+
+    # Branch-and-bound
+    bb_ms, _, bb_lap, bb_sel = run_bursts(bursts, args.min_quality, cfg.EMBEDDING_FUSION_TOP_N)
+
+    agree = sum(1 for a, b in zip(full_sel, bb_sel) if a == b)
+
+    print(f"{'Mode':<28} {'Time (ms)':<12} {'ms/frame':<10} {'Laplacians':<12}")
+    print("-" * 62)
+    for name, ms, lap in [
+        ("All metrics (baseline)", base_ms, base_lap),
+        ("Skip zero-importance", full_ms, full_lap),
+        ("Branch-and-bound", bb_ms, bb_lap),
+    ]:
+        per_frame = ms / total_frames if total_frames else 0.0
+        print(f"{name:<28} {ms:<12.1f} {per_frame:<10.2f} {lap:<12}")
+
+    print()
+    print(f"Frames with faces:    {base_faces}")
+    print(f"Laplacians avoided:   {base_lap - bb_lap} of {base_lap}")
+    print(f"Top-N selection identical in {agree}/{len(bursts)} bursts")
+
+
+if __name__ == "__main__":
+    main()
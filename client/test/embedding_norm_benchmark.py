@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Embedding-Norm Scoring Benchmark
+
+Replays debug capture sessions through select_best_frame + compute_fused_embedding
+with both scoring modes:
+    1. metrics:        frame_quality score, then InsightFace on the top-N hires frames
+    2. embedding_norm: YuNet + one batched recognition pass on aligned crops,
+                       ranked by raw embedding norm (embeddings reused for fusion)
+
+Reports total milliseconds per burst, and selection quality measured on the
+fused embeddings: sessions are grouped by the visitor ID in their folder name,
+and the benchmark compares same-visitor (genuine) vs different-visitor
+(impostor) cosine similarity and match rates at SIMILARITY_THRESHOLD.
+Visitor IDs are the server's decisions at capture time, not ground truth.
+
+Also prints the embedding-norm distribution to calibrate EMBEDDING_NORM_REFERENCE,
+and the per-burst rank correlation between the two scores.
+
+Usage:
+    python test/embedding_norm_benchmark.py /home/mafiq/zmisc/debug_frames
+    python test/embedding_norm_benchmark.py /home/mafiq/zmisc/debug_frames --norm-reference 22
+"""
+
+import os
+import sys
+import time
+import argparse
+from itertools import combinations
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+from face_recognition import cosine_similarity, get_face_analyzer
+from frame_quality import score_frames_dual
+from visitor_counter import (
+    PersonCapture,
+    compute_fused_embedding,
+    score_frames_by_embedding_norm,
+    select_best_frame,
+)
+from burst_replay import load_labeled_bursts
+from sharpness_estimator_benchmark import spearman
+
+
+def fuse_burst(burst, mode: str):
+    """Run selection + fusion for one burst. Returns (fused_embedding or None, elapsed_ms)."""
+    capture = PersonCapture(session_id="replay", frames=burst, start_time=0.0,
+                            trigger_frame=burst[0], frame_count=len(burst))
+    t0 = time.perf_counter()
+    _, _, _, scored = select_best_frame(
+        capture,
+        skip_start=cfg.FRAMES_SKIP_START,
+        skip_end=cfg.FRAMES_SKIP_END,
+        min_quality_score=cfg.MIN_QUALITY_SCORE if cfg.QUALITY_EARLY_EXIT else None,
+        top_n=cfg.EMBEDDING_FUSION_TOP_N if cfg.QUALITY_EARLY_EXIT else None,
+        scoring_mode=mode
+    )
+    fused, _, _, _ = compute_fused_embedding(
+        scored_frames=scored,
+        min_quality_score=cfg.MIN_QUALITY_SCORE,
+        min_detection_score=cfg.MIN_DETECTION_SCORE,
+        top_n=cfg.EMBEDDING_FUSION_TOP_N,
+        weight_power=cfg.EMBEDDING_FUSION_WEIGHT_POWER
+    )
+    return fused, (time.perf_counter() - t0) * 1000
+
+
+def pair_stats(labels, embeddings, threshold):
+    """Genuine/impostor similarity summary over all pairs of fused embeddings."""
+    genuine, impostor = [], []
+    for (la, ea), (lb, eb) in combinations(zip(labels, embeddings), 2):
+        if la is None or lb is None or ea is None or eb is None:
+            continue
+        sim = cosine_similarity(ea, eb)
+        (genuine if la == lb else impostor).append(sim)
+
+    def rate(values):
+        return sum(1 for v in values if v >= threshold) / len(values) if values else float('nan')
+
+    return {
+        'genuine_mean': float(np.mean(genuine)) if genuine else float('nan'),
+        'impostor_mean': float(np.mean(impostor)) if impostor else float('nan'),
+        'match_rate': rate(genuine),  # Same visitor matched (higher = better)
+        'false_match_rate': rate(impostor),  # Different visitors matched (lower = better)
+        'pairs': (len(genuine), len(impostor)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding-norm vs metric scoring benchmark")
+    parser.add_argument("frames_dir", help="Debug frames root (DEBUG_FRAMES_OUTPUT_DIR)")
+    parser.add_argument("--norm-reference", type=float, default=None,
+                        help="Override EMBEDDING_NORM_REFERENCE")
+    args = parser.parse_args()
+
+    if args.norm_reference is not None:
+        cfg.EMBEDDING_NORM_REFERENCE = args.norm_reference
+
+    print("=" * 70)
+    print("Embedding-Norm Scoring Benchmark")
+    print("=" * 70)
+
+    sessions = load_labeled_bursts(args.frames_dir)
+    labels = [label for label, _ in sessions]
+    n_visitors = len({label for label in labels if label is not None})
+    print(f"Loaded {len(sessions)} sessions ({n_visitors} distinct visitors, "
+          f"{sum(1 for label in labels if label is None)} unlabeled)")
+    print(f"Gate: {cfg.MIN_QUALITY_SCORE:.0f}, top N: {cfg.EMBEDDING_FUSION_TOP_N}, "
+          f"norm reference: {cfg.EMBEDDING_NORM_REFERENCE}")
+
+    # Load models outside the timed region
+    get_face_analyzer()
+    print()
+
+    results = {}
+    for mode in ("metrics", "embedding_norm"):
+        embeddings, times = [], []
+        for _, burst in sessions:
+            fused, ms = fuse_burst(burst, mode)
+            embeddings.append(fused)
+            times.append(ms)
+        results[mode] = (embeddings, times, pair_stats(labels, embeddings, cfg.SIMILARITY_THRESHOLD))
+
+    print(f"{'Mode':<16} {'ms/burst':<10} {'Fused':<8} {'Genuine':<9} {'Impostor':<9} "
+          f"{'Match':<8} {'False match':<11}")
+    print("-" * 75)
+    for mode, (embeddings, times, stats) in results.items():
+        fused = sum(1 for e in embeddings if e is not None)
+        print(f"{mode:<16} {np.mean(times):<10.1f} {fused:>3}/{len(sessions):<4} "
+              f"{stats['genuine_mean']:<9.3f} {stats['impostor_mean']:<9.3f} "
+              f"{stats['match_rate']:<8.1%} {stats['false_match_rate']:<11.1%}")
+    pairs = results['metrics'][2]['pairs']
+    print(f"(match rates at SIMILARITY_THRESHOLD={cfg.SIMILARITY_THRESHOLD}, "
+          f"{pairs[0]} genuine / {pairs[1]} impostor pairs)")
+
+    # Norm distribution and agreement between the two rankings
+    norms, rhos = [], []
+    for _, burst in sessions:
+        by_norm = score_frames_by_embedding_norm(burst)
+        by_metrics = score_frames_dual(burst)
+        norms.extend(by_norm.rows['embedding_norm'].tolist())
+        metric_total = dict(zip(by_metrics.rows['frame_idx'].tolist(), by_metrics.rows['total'].tolist()))
+        common = [(metric_total[idx], norm) for idx, norm in
+                  zip(by_norm.rows['frame_idx'].tolist(), by_norm.rows['embedding_norm'].tolist())
+                  if idx in metric_total]
+        if len(common) > 1:
+            rho = spearman([c[0] for c in common], [c[1] for c in common])
+            if not np.isnan(rho):
+                rhos.append(rho)
+
+    print()
+    if norms:
+        p = np.percentile(norms, [5, 25, 50, 75, 95])
+        print(f"Embedding norm percentiles (5/25/50/75/95): {' / '.join(f'{v:.1f}' for v in p)}")
+    if rhos:
+        print(f"Rank correlation, metric score vs norm (mean per burst): {np.mean(rhos):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Fusion Frame Selection Benchmark
+
+Replays debug capture sessions through select_best_frame + compute_fused_embedding
+with both fusion selection modes and several fusion sizes:
+    1. top:     the N highest quality scores (usually consecutive, same pose)
+    2. diverse: greedy quality/diversity selection across yaw/pitch and time
+
+For each (mode, N) it reports recognition milliseconds per burst, the pose
+spread of the fused frames, and fused-embedding quality: sessions are grouped
+by the visitor ID in their folder name and same-visitor (genuine) vs
+different-visitor (impostor) cosine similarity and match rates at
+SIMILARITY_THRESHOLD are compared. The question is whether diverse selection
+with a small N matches top selection with a larger N.
+
+Usage:
+    python test/fusion_selection_benchmark.py /home/mafiq/zmisc/debug_frames
+    python test/fusion_selection_benchmark.py /home/mafiq/zmisc/debug_frames --sizes 2 3 5 --diversity 0.7
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+from face_recognition import get_face_analyzer
+from visitor_counter import PersonCapture, compute_fused_embedding, select_best_frame
+from burst_replay import load_labeled_bursts
+from embedding_norm_benchmark import pair_stats
+
+
+def score_burst(burst, pool: int):
+    """Score one burst once; early exit keeps `pool` frames fully scored."""
+    capture = PersonCapture(session_id="replay", frames=burst, start_time=0.0,
+                            trigger_frame=burst[0], frame_count=len(burst))
+    _, _, _, scored = select_best_frame(
+        capture,
+        skip_start=cfg.FRAMES_SKIP_START,
+        skip_end=cfg.FRAMES_SKIP_END,
+        min_quality_score=cfg.MIN_QUALITY_SCORE if cfg.QUALITY_EARLY_EXIT else None,
+        top_n=pool if cfg.QUALITY_EARLY_EXIT else None,
+        scoring_mode=cfg.QUALITY_SCORING_MODE
+    )
+    return scored
+
+
+def pose_spread(scored, selection: str, n: int) -> float:
+    """Mean pairwise yaw/pitch distance (degrees) of the first n fusion candidates."""
+    candidates = scored.passing(cfg.MIN_QUALITY_SCORE)
+    if selection == "diverse":
+        candidates = candidates.diverse_order(cfg.EMBEDDING_FUSION_DIVERSITY,
+                                              cfg.EMBEDDING_FUSION_POSE_SCALE_DEG,
+                                              cfg.EMBEDDING_FUSION_TIME_SCALE_SEC)
+    rows = candidates.rows[:n]
+    if len(rows) < 2:
+        return float('nan')
+    pose = np.stack([rows['yaw'], rows['pitch']], axis=1)
+    dists = np.linalg.norm(pose[:, None, :] - pose[None, :, :], axis=2)
+    return float(dists[np.triu_indices(len(rows), 1)].mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fusion frame selection benchmark")
+    parser.add_argument("frames_dir", help="Debug frames root (DEBUG_FRAMES_OUTPUT_DIR)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 3, 5], help="Fusion sizes (N) to test")
+    parser.add_argument("--diversity", type=float, default=None, help="Override EMBEDDING_FUSION_DIVERSITY")
+    args = parser.parse_args()
+
+    if args.diversity is not None:
+        cfg.EMBEDDING_FUSION_DIVERSITY = args.diversity
+
+    print("=" * 70)
+    print("Fusion Frame Selection Benchmark")
+    print("=" * 70)
+
+    sessions = load_labeled_bursts(args.frames_dir)
+    labels = [label for label, _ in sessions]
+    print(f"Loaded {len(sessions)} sessions ({len({l for l in labels if l is not None})} distinct visitors)")
+    print(f"Diversity: {cfg.EMBEDDING_FUSION_DIVERSITY}, pose scale: {cfg.EMBEDDING_FUSION_POSE_SCALE_DEG}°, "
+          f"time scale: {cfg.EMBEDDING_FUSION_TIME_SCALE_SEC}s")
+
+    # Load models outside the timed region; score every burst once for all runs
+    get_face_analyzer()
+    pool = max(max(args.sizes), cfg.EMBEDDING_FUSION_CANDIDATES)
+    scored_bursts = [score_burst(burst, pool) for _, burst in sessions]
+    print()
+
+    print(f"{'Selection':<10} {'N':<3} {'ms/burst':<10} {'Spread°':<9} {'Genuine':<9} {'Impostor':<9} "
+          f"{'Match':<8} {'False match':<11}")
+    print("-" * 78)
+    for selection in ("top", "diverse"):
+        for n in args.sizes:
+            embeddings, times, spreads = [], [], []
+            for scored in scored_bursts:
+                t0 = time.perf_counter()
+                fused, _, _, _ = compute_fused_embedding(
+                    scored_frames=scored,
+                    min_quality_score=cfg.MIN_QUALITY_SCORE,
+                    min_detection_score=cfg.MIN_DETECTION_SCORE,
+                    top_n=n,
+                    weight_power=cfg.EMBEDDING_FUSION_WEIGHT_POWER,
+                    selection=selection
+                )
+                times.append((time.perf_counter() - t0) * 1000)
+                embeddings.append(fused)
+                spreads.append(pose_spread(scored, selection, n))
+            stats = pair_stats(labels, embeddings, cfg.SIMILARITY_THRESHOLD)
+            print(f"{selection:<10} {n:<3} {np.mean(times):<10.1f} {np.nanmean(spreads):<9.2f} "
+                  f"{stats['genuine_mean']:<9.3f} {stats['impostor_mean']:<9.3f} "
+                  f"{stats['match_rate']:<8.1%} {stats['false_match_rate']:<11.1%}")
+
+    print()
+    print(f"(match rates at SIMILARITY_THRESHOLD={cfg.SIMILARITY_THRESHOLD}; "
+          f"visitor IDs are the server's decisions at capture time, not ground truth)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Import Time Budget Test
+
+Checks that the supervisor and CLI paths stay lightweight: each module is
+imported in a fresh interpreter and must (a) finish within its time budget and
+(b) not pull in dependencies it only needs lazily - InsightFace, ONNX Runtime
+and requests are imported by the functions that use them, so only a running
+inference worker pays for them.
+
+Also times the CLI commands end to end (interpreter start included).
+
+Exits with status 1 if any budget is exceeded or a lazy dependency is imported.
+
+Usage:
+    python test/import_time_test.py
+    python test/import_time_test.py --scale 3    # Slower device (e.g. Jetson): 3x the budgets
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Never imported by the supervisor / CLI (main.py --list/--validate, camera_manager)
+SUPERVISOR_FORBIDDEN = ("cv2", "numpy", "insightface", "onnxruntime", "onnx", "requests")
+# Imported on first use by the workers
+WORKER_FORBIDDEN = ("insightface", "onnxruntime", "onnx", "requests")
+
+# module: (budget ms, modules that must not be loaded by importing it)
+MODULE_BUDGETS = {
+    "config": (100, SUPERVISOR_FORBIDDEN),
+    "camera_manager": (250, SUPERVISOR_FORBIDDEN),
+    "main": (300, SUPERVISOR_FORBIDDEN),
+    "model_cache": (150, WORKER_FORBIDDEN),
+    "face_recognition": (500, WORKER_FORBIDDEN),
+    "api_client": (600, WORKER_FORBIDDEN),
+    "frame_quality": (600, WORKER_FORBIDDEN),
+    "visitor_counter": (800, WORKER_FORBIDDEN),
+    "people_counter": (800, WORKER_FORBIDDEN),
+}
+
+# CLI command: budget ms (wall time, interpreter start included)
+CLI_BUDGETS = {
+    ("main.py", "--list"): 500,
+    ("main.py", "--validate"): 500,
+    ("camera_manager.py",): 500,
+}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {watch!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(module: str, watch) -> dict:
+    """Import time and watched modules loaded, in a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, watch=tuple(watch))],
+                         cwd=CLIENT_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"ms": float("inf"), "loaded": [], "error": out.stderr.strip().splitlines()[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def time_command(args) -> float:
+    """Wall time of a CLI command in ms (inf if it fails)."""
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, *args], cwd=CLIENT_DIR, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed if out.returncode == 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time budget test")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per measurement (best is kept)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Budget multiplier for slower devices")
+    args = parser.parse_args()
+
+    failures = []
+
+    print("=" * 70)
+    print("Import Time Budget Test")
+    print("=" * 70)
+    print(f"  {'Module':<20} {'Import ms':>10} {'Budget ms':>10}  Lazy dependencies loaded")
+    print("-" * 70)
+    for module, (budget, forbidden) in MODULE_BUDGETS.items():
+        results = [time_import(module, forbidden) for _ in range(args.runs)]
+        best = min(results, key=lambda r: r["ms"])
+        budget *= args.scale
+        loaded = sorted({m for r in results for m in r["loaded"]})
+        status = "ok" if best["ms"] <= budget and not loaded else "FAIL"
+        print(f"  {module:<20} {best['ms']:>10.0f} {budget:>10.0f}  {', '.join(loaded) or '-'}  {status}")
+        if "error" in best:
+            print(f"      {best['error']}")
+        if status == "FAIL":
+            failures.append(module)
+
+    print()
+    print(f"  {'Command':<30} {'Wall ms':>10} {'Budget ms':>10}")
+    print("-" * 70)
+    for command, budget in CLI_BUDGETS.items():
+        best = min(time_command(command) for _ in range(args.runs))
+        budget *= args.scale
+        status = "ok" if best <= budget else "FAIL"
+        print(f"  {' '.join(command):<30} {best:>10.0f} {budget:>10.0f}  {status}")
+        if status == "FAIL":
+            failures.append(" ".join(command))
+
+    print()
+    if failures:
+        print(f"FAILED: {', '.join(failures)}")
+        sys.exit(1)
+    print("All imports within budget")
+
+
+if __name__ == "__main__":
+    main()
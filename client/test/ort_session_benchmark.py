@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime Session Tuning Benchmark
+
+Finds the ORT session options (cameras.yaml `ort_*` settings) that give the
+lowest InsightFace latency when N camera workers share the CPU. Each camera is
+simulated by its own process running the buffalo detection model (640x640)
+and a batched recognition pass (fusion-sized batch of 112x112 crops) in a loop,
+all processes at once - the same contention as N face_recognition workers.
+
+Search (coordinate descent, to keep the run short):
+    1. intra-op threads x spin-wait
+    2. on the best of those: execution mode, memory arena, graph optimization
+
+Reported per configuration: mean / p95 latency per iteration (detection +
+recognition), and CPU milliseconds per iteration (spin-waiting threads burn CPU
+that other cameras could use).
+
+Usage:
+    python test/ort_session_benchmark.py
+    python test/ort_session_benchmark.py --cameras 3 --cores 6 --iterations 30
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+
+DEFAULTS = dict(intra_op_threads=0, inter_op_threads=0, execution_mode="sequential",
+                graph_optimization="all", memory_arena=True, spin_wait=True)
+
+
+def find_models(models_dir: str):
+    """(detection, recognition) ONNX paths of the InsightFace model pack."""
+    files = sorted(f for f in os.listdir(models_dir) if f.endswith(".onnx"))
+    det = next((f for f in files if f.startswith("det_")), None)
+    rec = next((f for f in files if f.startswith("w600k") or "arcface" in f or f.startswith("glint")), None)
+    if det is None or rec is None:
+        raise FileNotFoundError(f"Detection/recognition models not found in {models_dir}: {files}")
+    return os.path.join(models_dir, det), os.path.join(models_dir, rec)
+
+
+def camera_worker(args):
+    """One simulated camera: returns (latencies_ms, cpu_ms) for the timed iterations."""
+    det_path, rec_path, options, batch, warmup, iterations, start_event = args
+    import onnxruntime as ort
+    from face_recognition import session_options
+
+    so = session_options(**options)
+    det = ort.InferenceSession(det_path, sess_options=so, providers=['CPUExecutionProvider'])
+    rec = ort.InferenceSession(rec_path, sess_options=so, providers=['CPUExecutionProvider'])
+    det_input = {det.get_inputs()[0].name: np.random.rand(1, 3, 640, 640).astype(np.float32)}
+    rec_input = {rec.get_inputs()[0].name: np.random.rand(batch, 3, 112, 112).astype(np.float32)}
+
+    for _ in range(warmup):
+        det.run(None, det_input)
+        rec.run(None, rec_input)
+
+    start_event.wait()  # All cameras start timing together
+    latencies = []
+    cpu0 = time.process_time()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        det.run(None, det_input)
+        rec.run(None, rec_input)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    cpu_ms = (time.process_time() - cpu0) * 1000 / iterations
+    return latencies, cpu_ms
+
+
+def run_config(det_path, rec_path, options, cameras, batch, warmup, iterations):
+    """Run all simulated cameras concurrently with the given options."""
+    manager = mp.Manager()
+    start_event = manager.Event()
+    with mp.get_context("spawn").Pool(cameras) as pool:
+        result = pool.map_async(camera_worker, [(det_path, rec_path, options, batch, warmup,
+                                                 iterations, start_event)] * cameras)
+        time.sleep(0.5)
+        start_event.set()
+        results = result.get()
+    manager.shutdown()
+    latencies = np.concatenate([r[0] for r in results])
+    return {
+        "mean_ms": float(np.mean(latencies)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "cpu_ms": float(np.mean([r[1] for r in results])),
+    }
+
+
+def describe(options):
+    changed = {k: v for k, v in options.items() if DEFAULTS[k] != v}
+    return ", ".join(f"{k}={v}" for k, v in changed.items()) or "ORT defaults"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX Runtime session tuning benchmark")
+    parser.add_argument("--models-dir", default=os.path.join(cfg.MODEL_DIR, "models", cfg.INSIGHTFACE_MODEL),
+                        help="InsightFace model pack directory")
+    parser.add_argument("--cameras", type=int, default=1, help="Concurrent camera workers to simulate")
+    parser.add_argument("--cores", type=int, default=os.cpu_count(), help="Cores available to the workers")
+    parser.add_argument("--batch", type=int, default=cfg.EMBEDDING_FUSION_TOP_N, help="Recognition batch size")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed iterations per camera")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed iterations per camera")
+    args = parser.parse_args()
+
+    det_path, rec_path = find_models(args.models_dir)
+
+    print("=" * 70)
+    print("ONNX Runtime Session Tuning Benchmark")
+    print("=" * 70)
+    print(f"Models: {os.path.basename(det_path)}, {os.path.basename(rec_path)} (batch {args.batch})")
+    print(f"Cameras: {args.cameras}, cores: {args.cores}, {args.iterations} iterations per camera")
+    print()
+
+    results = []
+
+    def measure(options):
+        stats = run_config(det_path, rec_path, options, args.cameras, args.batch, args.warmup, args.iterations)
+        results.append((options, stats))
+        print(f"  {describe(options):<60} {stats['mean_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['cpu_ms']:>8.1f}")
+        return stats
+
+    print(f"  {'Options':<60} {'Mean ms':>8} {'P95 ms':>8} {'CPU ms':>8}")
+    print("-" * 90)
+
+    # Stage 1: thread count x spin-wait (per-camera share of the cores and below)
+    share = max(1, args.cores // args.cameras)
+    thread_counts = sorted({0, 1, share} | {t for t in (2, 4, 8) if t < share})
+    for threads in thread_counts:
+        for spin in (True, False):
+            measure(dict(DEFAULTS, intra_op_threads=threads, spin_wait=spin))
+    best = min(results, key=lambda r: r[1]["mean_ms"])[0]
+
+    # Stage 2: one option at a time on the best so far
+    variants = [
+        dict(execution_mode="parallel", inter_op_threads=2),
+        dict(memory_arena=False),
+        dict(graph_optimization="extended"),
+    ]
+    for variant in variants:
+        options = dict(best, **variant)
+        if options != best:
+            measure(options)
+            best = min(results, key=lambda r: r[1]["mean_ms"])[0]
+
+    best_stats = next(stats for options, stats in results if options == best)
+    default_stats = next((stats for options, stats in results if options == DEFAULTS), None)
+
+    print()
+    print("=" * 70)
+    print(f"Best for {args.cameras} camera(s) on {args.cores} cores: {describe(best)}")
+    print(f"  {best_stats['mean_ms']:.1f} ms mean, {best_stats['p95_ms']:.1f} ms p95, "
+          f"{best_stats['cpu_ms']:.1f} CPU ms per iteration")
+    if default_stats is not None:
+        print(f"  vs ORT defaults: {default_stats['mean_ms']:.1f} ms mean "
+              f"({default_stats['mean_ms'] / best_stats['mean_ms']:.2f}x)")
+    print()
+    print("cameras.yaml settings:")
+    for key, value in best.items():
+        if isinstance(value, bool):
+            value = str(value).lower()
+        print(f"      ort_{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
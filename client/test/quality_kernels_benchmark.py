@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Quality Kernels Micro-Benchmark
+
+Measures the per-frame cost of the cheap quality metrics (face size, pose,
+frontality, brightness, contrast and the multiplicative penalty), excluding
+detection and sharpness:
+    - Scalar reference: frame_quality functions, one call chain per frame
+    - Batch kernels: ROI mean/std via cv2.meanStdDev + one score_batch call
+      per burst (numpy, and numba if installed)
+
+Synthetic faces are used so the numbers isolate the Python overhead that the
+kernels remove; detection cost is unchanged by them.
+
+Usage:
+    python test/quality_kernels_benchmark.py
+    python test/quality_kernels_benchmark.py --burst-len 25 --roi 160 --repeat 200
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+from frame_quality import DEFAULT_IMPORTANCE
+from quality_kernels import NUMBA_AVAILABLE, pack_importance, pack_thresholds, score_batch
+from quality_kernels_parity import make_cases, scalar_reference
+
+
+def time_per_frame(fn, n_frames: int, repeat: int) -> float:
+    """Median time per frame in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6 / n_frames)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quality kernels micro-benchmark")
+    parser.add_argument("--burst-len", type=int, default=25, help="Faces per burst")
+    parser.add_argument("--roi", type=int, default=120, help="Face ROI size in pixels")
+    parser.add_argument("--repeat", type=int, default=100, help="Timing repetitions")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Quality Kernels Micro-Benchmark")
+    print("=" * 70)
+
+    bboxes, landmarks, _ = make_cases(args.burst_len)
+    bboxes, landmarks = bboxes[:args.burst_len], landmarks[:args.burst_len]
+    rng = np.random.default_rng(1)
+    rois = [rng.integers(0, 256, size=(args.roi, args.roi), dtype=np.uint8) for _ in range(args.burst_len)]
+    thresholds = pack_thresholds(cfg.QUALITY_THRESHOLDS)
+
+    backends = ['numpy'] + (['numba'] if NUMBA_AVAILABLE else [])
+
+    if NUMBA_AVAILABLE:
+        t0 = time.perf_counter()
+        score_batch(bboxes, landmarks, np.zeros(len(bboxes)), np.zeros(len(bboxes)), thresholds,
+                    pack_importance(DEFAULT_IMPORTANCE, DEFAULT_IMPORTANCE), 1000.0, backend='numba')
+        print(f"numba first call (compile or cache load): {(time.perf_counter() - t0) * 1000:.0f} ms")
+    else:
+        print("numba not installed - numpy backend only")
+    print(f"Burst: {args.burst_len} faces, ROI {args.roi}x{args.roi}")
+    print()
+
+    print(f"{'Importance':<14} {'Path':<10} {'us/frame':<10} {'Speedup':<8}")
+    print("-" * 44)
+
+    for case, importance in [('config', cfg.QUALITY_IMPORTANCE), ('all_metrics', DEFAULT_IMPORTANCE)]:
+        packed = pack_importance(importance, DEFAULT_IMPORTANCE)
+        need_roi = any(importance.get(name, DEFAULT_IMPORTANCE[name]) != 0 for name in ('brightness', 'contrast'))
+
+        def scalar():
+            scalar_reference(bboxes, landmarks, rois, importance, cfg.QUALITY_BASE_SCORE)
+
+        def batch(backend):
+            roi_mean = np.zeros(len(rois))
+            roi_std = np.zeros(len(rois))
+            if need_roi:
+                for k, roi in enumerate(rois):
+                    mean, std = cv2.meanStdDev(roi)
+                    roi_mean[k] = mean[0, 0]
+                    roi_std[k] = std[0, 0]
+            score_batch(bboxes, landmarks, roi_mean, roi_std, thresholds, packed,
+                        cfg.QUALITY_BASE_SCORE, backend=backend)
+
+        base_us = time_per_frame(scalar, args.burst_len, args.repeat)
+        print(f"{case:<14} {'scalar':<10} {base_us:<10.2f} {'1.0x':<8}")
+        for backend in backends:
+            us = time_per_frame(lambda: batch(backend), args.burst_len, args.repeat)
+            print(f"{case:<14} {backend:<10} {us:<10.2f} {base_us / us:.1f}x")
+
+    print()
+    print("Excludes YuNet detection (~ms per frame) and sharpness, which the kernels do not change.")
+
+
+if __name__ == "__main__":
+    main()
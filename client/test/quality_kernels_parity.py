@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Quality Kernels Parity Check
+
+Verifies that the batch kernels in quality_kernels.py (numpy and, if
+installed, numba) give the same scores as the scalar reference functions in
+frame_quality.py:
+    1. Synthetic faces: random bboxes, landmarks and ROIs, plus values exactly
+       on every threshold boundary, under several importance settings
+    2. Optional replay: score_frames_dual on real bursts with
+       QUALITY_KERNEL_BACKEND = python vs each kernel backend (full scores,
+       then top-N selection with early exit)
+
+Exits with status 1 on any mismatch.
+
+Usage:
+    python test/quality_kernels_parity.py
+    python test/quality_kernels_parity.py --frames /home/mafiq/zmisc/debug_frames
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+from frame_quality import (
+    apply_penalty,
+    estimate_head_pose_from_landmarks,
+    score_brightness,
+    score_contrast,
+    score_face_size,
+    score_frontality,
+    DEFAULT_IMPORTANCE,
+)
+from quality_kernels import (
+    KERNEL_METRICS,
+    NUMBA_AVAILABLE,
+    pack_importance,
+    pack_thresholds,
+    score_batch,
+)
+
+RTOL = 1e-9
+ATOL = 1e-9
+
+IMPORTANCE_CASES = {
+    'config': None,  # cfg.QUALITY_IMPORTANCE
+    'all_metrics': DEFAULT_IMPORTANCE,
+    'brightness_contrast_only': {'face_size': 0, 'frontality': 0, 'brightness': 7, 'contrast': 10, 'sharpness': 0},
+}
+
+
+def make_cases(n: int, seed: int = 0):
+    """
+    Random faces plus threshold-boundary cases.
+
+    Returns:
+        (bboxes, landmarks, rois) - bboxes (N, 4) int, landmarks (N, 3, 2), list of uint8 ROIs
+    """
+    rng = np.random.default_rng(seed)
+    t = cfg.QUALITY_THRESHOLDS
+    bboxes, landmarks, rois = [], [], []
+
+    def add(x1, y1, w, h, marks, roi):
+        bboxes.append((x1, y1, x1 + w, y1 + h))
+        landmarks.append(marks)
+        rois.append(roi)
+
+    for _ in range(n):
+        x1, y1 = rng.integers(0, 600, size=2)
+        w = int(rng.integers(20, 250))
+        h = int(w * rng.uniform(1.0, 1.4))
+        cx = x1 + w / 2 + rng.normal(0, w * 0.15)
+        eye_y = y1 + h * 0.4 + rng.normal(0, h * 0.05)
+        half = w * 0.18
+        marks = ((cx - half, eye_y + rng.normal(0, 3)),
+                 (cx + half, eye_y + rng.normal(0, 3)),
+                 (cx + rng.normal(0, 5), eye_y + h * 0.25 + rng.normal(0, h * 0.08)))
+        mean, std = rng.uniform(0, 255), rng.uniform(0, 80)
+        roi = np.clip(rng.normal(mean, std, size=(24, 24)), 0, 255).astype(np.uint8)
+        add(int(x1), int(y1), w, h, marks, roi)
+
+    # Face widths exactly on the face-size thresholds
+    fs = t.get('face_size', {})
+    for w in (fs.get('zero_px', 60), fs.get('critical_px', 105)):
+        add(100, 100, int(w), int(w), ((130, 140), (150, 140), (140, 160)), np.full((8, 8), 128, np.uint8))
+
+    # ROI means exactly on the brightness thresholds (std = 0)
+    for value in t.get('brightness', {}).values():
+        add(100, 100, 120, 140, ((130, 150), (190, 150), (160, 185)), np.full((8, 8), int(value), np.uint8))
+
+    # Frontal faces with yaw/pitch exactly 0 and a degenerate eye layout
+    add(0, 0, 100, 100, ((30, 40), (70, 40), (50, 65)), np.full((8, 8), 0, np.uint8))
+    add(0, 0, 100, 100, ((50, 40), (50, 44), (50, 65)), np.full((8, 8), 255, np.uint8))
+
+    return np.array(bboxes), np.array(landmarks, dtype=np.float64), rois
+
+
+def scalar_reference(bboxes, landmarks, rois, importance, base_score):
+    """Per-face scores from the scalar functions (same order as compute_quality_score)."""
+    n = len(bboxes)
+    factors = np.ones((n, len(KERNEL_METRICS)))
+    yaw = np.empty(n)
+    pitch = np.empty(n)
+    totals = np.empty(n)
+
+    for i in range(n):
+        bbox = tuple(int(v) for v in bboxes[i])
+        marks = {'right_eye': tuple(landmarks[i, 0]), 'left_eye': tuple(landmarks[i, 1]),
+                 'nose': tuple(landmarks[i, 2])}
+        yaw[i], pitch[i] = estimate_head_pose_from_landmarks(marks, bbox)
+        total = base_score
+        for m, name in enumerate(KERNEL_METRICS):
+            weight = importance.get(name, DEFAULT_IMPORTANCE[name])
+            if weight == 0:
+                continue
+            if name == 'face_size':
+                value = score_face_size(bbox, (1080, 1920))
+            elif name == 'frontality':
+                value = score_frontality(yaw[i], pitch[i])
+            elif name == 'brightness':
+                value = score_brightness(rois[i])
+            else:
+                value = score_contrast(rois[i])
+            factors[i, m] = value
+            total = apply_penalty(total, value, weight)
+        totals[i] = total
+
+    return factors, yaw, pitch, totals
+
+
+def max_mismatch(a: np.ndarray, b: np.ndarray) -> float:
+    """Largest absolute difference, or inf if any element is outside tolerance."""
+    if not np.allclose(a, b, rtol=RTOL, atol=ATOL, equal_nan=True):
+        return float('inf')
+    return float(np.max(np.abs(a - b))) if a.size else 0.0
+
+
+def check_synthetic(backends, n_cases: int) -> bool:
+    """Compare kernel backends against the scalar reference on synthetic faces."""
+    bboxes, landmarks, rois = make_cases(n_cases)
+    roi_mean = np.array([np.mean(r) for r in rois])
+    roi_std = np.array([np.std(r) for r in rois])
+    thresholds = pack_thresholds(cfg.QUALITY_THRESHOLDS)
+    ok = True
+
+    print(f"Synthetic faces: {len(bboxes)} ({n_cases} random + boundary cases)")
+    print(f"{'Importance':<26} {'Backend':<8} {'factors':<12} {'yaw/pitch':<12} {'totals':<12} {'Result':<6}")
+    print("-" * 80)
+
+    for case, importance in IMPORTANCE_CASES.items():
+        importance = importance if importance is not None else cfg.QUALITY_IMPORTANCE
+        ref = scalar_reference(bboxes, landmarks, rois, importance, cfg.QUALITY_BASE_SCORE)
+        for backend in backends:
+            out = score_batch(bboxes, landmarks, roi_mean, roi_std, thresholds,
+                              pack_importance(importance, DEFAULT_IMPORTANCE),
+                              cfg.QUALITY_BASE_SCORE, backend=backend)
+            diffs = (
+                max_mismatch(out[0], ref[0]),
+                max(max_mismatch(out[1], ref[1]), max_mismatch(out[2], ref[2])),
+                max_mismatch(out[3], ref[3]),
+            )
+            passed = all(np.isfinite(d) for d in diffs)
+            ok &= passed
+            print(f"{case:<26} {backend:<8} {diffs[0]:<12.2e} {diffs[1]:<12.2e} {diffs[2]:<12.2e} "
+                  f"{'PASS' if passed else 'FAIL':<6}")
+
+    return ok
+
+
+def check_replay(backends, source: str) -> bool:
+    """Compare score_frames_dual on real bursts, reference path vs kernel backends."""
+    from frame_quality import score_frames_dual
+    from burst_replay import load_bursts
+
+    bursts = load_bursts(source)
+    print(f"\nReplay: {len(bursts)} bursts from {source}")
+    ok = True
+
+    def run(backend, min_score, top_n):
+        cfg.QUALITY_KERNEL_BACKEND = backend
+        return [score_frames_dual(b, min_score=min_score, top_n=top_n) for b in bursts]
+
+    reference_full = run('python', None, None)
+    reference_top = run('python', cfg.MIN_QUALITY_SCORE, cfg.EMBEDDING_FUSION_TOP_N)
+
+    for backend in backends:
+        full = run(backend, None, None)
+        top = run(backend, cfg.MIN_QUALITY_SCORE, cfg.EMBEDDING_FUSION_TOP_N)
+
+        worst = 0.0
+        for ref, out in zip(reference_full, full):
+            ref_rows = ref.rows[np.argsort(ref.rows['frame_idx'])]
+            out_rows = out.rows[np.argsort(out.rows['frame_idx'])]
+            if not np.array_equal(ref_rows['frame_idx'], out_rows['frame_idx']):
+                worst = float('inf')
+                break
+            for name in ('total',) + KERNEL_METRICS + ('sharpness', 'yaw', 'pitch'):
+                worst = max(worst, max_mismatch(out_rows[name], ref_rows[name]))
+
+        def selected(table):
+            return list(table.passing(cfg.MIN_QUALITY_SCORE).rows['frame_idx'][:cfg.EMBEDDING_FUSION_TOP_N])
+
+        agree = sum(1 for ref, out in zip(reference_top, top) if selected(ref) == selected(out))
+        passed = np.isfinite(worst) and agree == len(bursts)
+        ok &= passed
+        print(f"{backend:<8} max score diff {worst:.2e}, top-N identical in {agree}/{len(bursts)} bursts "
+              f"{'PASS' if passed else 'FAIL'}")
+
+    cfg.QUALITY_KERNEL_BACKEND = 'python'
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quality kernels parity check")
+    parser.add_argument("--cases", type=int, default=5000, help="Random synthetic faces")
+    parser.add_argument("--frames", default=None, help="Debug frames dir, session dir, or video for replay")
+    args = parser.parse_args()
+
+    backends = ['numpy'] + (['numba'] if NUMBA_AVAILABLE else [])
+
+    print("=" * 70)
+    print("Quality Kernels Parity Check")
+    print("=" * 70)
+    if not NUMBA_AVAILABLE:
+        print("numba not installed - checking numpy backend only")
+    print()
+
+    ok = check_synthetic(backends, args.cases)
+    if args.frames:
+        ok &= check_replay(backends, args.frames)
+
+    print()
+    print("ALL PASS" if ok else "MISMATCH FOUND")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
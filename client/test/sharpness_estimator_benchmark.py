@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Sharpness Estimator Benchmark
+
+Compares sharpness estimators on real face ROIs, at native resolution and
+resampled to a canonical size:
+    - Speed per ROI (and how it scales with face size)
+    - Ranking agreement with the reference (float64 Laplacian, native ROI):
+      Spearman rank correlation within each burst and top-1 agreement
+
+Faces are detected with YuNet on the lowres frames, and ROIs are padded
+10% like compute_quality_score.
+
+Usage:
+    python test/sharpness_estimator_benchmark.py /home/mafiq/zmisc/debug_frames
+    python test/sharpness_estimator_benchmark.py entrance.mp4 --canonical-size 112
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_quality import (
+    detect_face,
+    measure_sharpness,
+    normalize_face_roi,
+    SHARPNESS_ESTIMATORS,
+)
+from burst_replay import load_bursts
+
+
+def extract_face_rois(burst):
+    """Detect the face in each lowres frame and return padded grayscale ROIs."""
+    rois = []
+    for _, lowres in burst:
+        result = detect_face(lowres)
+        if result is None:
+            continue
+        (x1, y1, x2, y2), _ = result
+        h, w = lowres.shape[:2]
+        pad_x = int((x2 - x1) * 0.1)
+        pad_y = int((y2 - y1) * 0.1)
+        roi = lowres[max(0, y1 - pad_y):min(h, y2 + pad_y), max(0, x1 - pad_x):min(w, x2 + pad_x)]
+        if roi.size:
+            rois.append(cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY))
+    return rois
+
+
+def rank(values):
+    """Ranks of values (0 = smallest)."""
+    order = np.argsort(values)
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    return ranks
+
+
+def spearman(a, b):
+    """Spearman rank correlation (no tie correction)."""
+    if len(a) < 2:
+        return float('nan')
+    ra, rb = rank(np.asarray(a)), rank(np.asarray(b))
+    if ra.std() == 0 or rb.std() == 0:
+        return float('nan')
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharpness estimator benchmark")
+    parser.add_argument("source", help="Debug frames dir, session dir, or video file")
+    parser.add_argument("--burst-len", type=int, default=25, help="Frames per burst for video input")
+    parser.add_argument("--max-frames", type=int, default=0, help="Max video frames to read (0 = all)")
+    parser.add_argument("--canonical-size", type=int, default=112, help="Canonical ROI size")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Sharpness Estimator Benchmark")
+    print("=" * 70)
+
+    bursts = load_bursts(args.source, burst_len=args.burst_len, max_frames=args.max_frames)
+    burst_rois = [extract_face_rois(b) for b in bursts]
+    burst_rois = [r for r in burst_rois if r]
+    n_rois = sum(len(r) for r in burst_rois)
+    widths = [roi.shape[1] for rois in burst_rois for roi in rois]
+    print(f"Loaded {len(bursts)} bursts, {n_rois} face ROIs")
+    if not n_rois:
+        return
+    print(f"ROI width: min {min(widths)}px, median {int(np.median(widths))}px, max {max(widths)}px")
+    print()
+
+    # Reference values: float64 Laplacian on native ROIs
+    reference = [[measure_sharpness(roi, 'laplacian') for roi in rois] for rois in burst_rois]
+
+    modes = [(est, 0) for est in SHARPNESS_ESTIMATORS] + \
+            [(est, args.canonical_size) for est in SHARPNESS_ESTIMATORS]
+
+    print(f"{'Estimator':<14} {'ROI':<10} {'us/ROI':<10} {'us/ROI small':<14} {'us/ROI large':<14} "
+          f"{'Spearman':<10} {'Top-1':<8}")
+    print("-" * 82)
+
+    median_w = np.median(widths)
+    for estimator, size in modes:
+        times = []
+        values = []
+        for rois in burst_rois:
+            burst_values = []
+            for roi in rois:
+                t0 = time.perf_counter()
+                src = normalize_face_roi(roi, size) if size else roi
+                burst_values.append(measure_sharpness(src, estimator))
+                times.append(((time.perf_counter() - t0) * 1e6, roi.shape[1]))
+            values.append(burst_values)
+
+        all_us = [t for t, _ in times]
+        small_us = [t for t, w in times if w <= median_w] or [float('nan')]
+        large_us = [t for t, w in times if w > median_w] or [float('nan')]
+
+        rhos = [spearman(v, r) for v, r in zip(values, reference)]
+        rhos = [r for r in rhos if not np.isnan(r)]
+        top1 = sum(1 for v, r in zip(values, reference) if int(np.argmax(v)) == int(np.argmax(r)))
+
+        roi_label = f"{size}px" if size else "native"
+        rho_str = f"{np.mean(rhos):.3f}" if rhos else "N/A"
+        print(f"{estimator:<14} {roi_label:<10} {np.mean(all_us):<10.1f} {np.mean(small_us):<14.1f} "
+              f"{np.mean(large_us):<14.1f} {rho_str:<10} {top1}/{len(burst_rois)}")
+
+    print()
+    print("Spearman/Top-1 are measured per burst against the float64 Laplacian on native ROIs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,15 +24,19 @@ import sys
 import argparse
 import logging
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List, Tuple
-from dataclasses import dataclass
+from typing import Callable, Optional, List, Tuple, Union
+from dataclasses import dataclass, field, replace
 import numpy as np
 
 import config as cfg
 from face_recognition import (
+    configure_sessions,
+    extract_aligned_embeddings,
     extract_embeddings,
     get_face_analyzer,
+    warm_up_analyzer,
 )
 from frame_quality import (
     compute_quality_score,
@@ -40,10 +44,28 @@ from frame_quality import (
     score_frames_dual,
     get_best_frame,
     detect_face,
-    QualityScore
+    detect_face_with_landmarks,
+    detect_faces,
+    FaceLocator,
+    KEYPOINT_NAMES,
+    estimate_head_pose_from_landmarks,
+    prefilter_frame,
+    PREFILTER_REASONS,
+    QualityScore,
+    SessionTable,
+    SHARPNESS_ESTIMATORS,
+    SESSION_DTYPE,
+    METRIC_EVAL_ORDER,
+    warm_up_detectors
 )
+from frame_store import FrameSource, FrameStore, JpegFrameStore, JpegStoreStats, as_store, lowres_frame
+from burst_scorer import MultiFaceBurstScorer, OnlineBurstScorer
+from speculative_identify import SpeculativeIdentifier
+from face_tracker import EntryLine, FaceTracker, bbox_iou
 from api_client import ClientBridgeAPI, init_api, get_api
-from camera_manager import CameraConfig, FaceRecognitionSettings, load_config, get_config
+from camera_manager import (
+    CameraConfig, FaceRecognitionSettings, FUSION_SELECTIONS, SCORING_MODES, load_config, get_config
+)
 
 # =============================================================================
 # LOGGING SETUP
@@ -64,9 +86,14 @@ logger = logging.getLogger(__name__)
 class PersonCapture:
     """Container for frames captured for a single person."""
     session_id: str
-    frames: List[Tuple[np.ndarray, np.ndarray]]  # (cropped_hires, resized_lowres)
+    frames: FrameSource  # (cropped_hires, resized_lowres) list, or a FrameStore (e.g. JPEG)
     start_time: float
     trigger_frame: Tuple[np.ndarray, np.ndarray]  # (cropped_hires, resized_lowres)
+    frame_count: int = 0  # Frames in the burst (frames may be empty with online scoring)
+    scorer: Optional[OnlineBurstScorer] = None  # Set if frames were scored during capture (this person's lane)
+    stop_reason: str = "duration"  # "duration", "quality", "face_lost" or "identified"
+    timestamps: List[float] = field(default_factory=list)  # Seconds since capture start, per burst frame
+    frames_deduped: int = 0  # Near-duplicate frames dropped before storage/scoring
 
 
 # =============================================================================
@@ -108,6 +135,26 @@ def resize_frame(frame: np.ndarray, target_width: int) -> np.ndarray:
     return cv2.resize(frame, (target_width, new_h))
 
 
+def dedup_thumbnail(frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None,
+                    size: int = 32) -> np.ndarray:
+    """
+    Small grayscale thumbnail for near-duplicate checks.
+    
+    Args:
+        frame: BGR image
+        roi: Optional (x1, y1, x2, y2) region in frame coordinates
+        size: Thumbnail width and height
+    
+    Returns:
+        size x size uint8 grayscale image
+    """
+    if roi is not None:
+        x1, y1, x2, y2 = roi
+        frame = frame[y1:y2, x1:x2]
+    thumb = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY) if thumb.ndim == 3 else thumb
+
+
 def save_visitor_image(frame: np.ndarray, visitor_id: int, session_id: str) -> str:
     """Save a sample image for a visitor."""
     os.makedirs(cfg.OUTPUT_DIR, exist_ok=True)
@@ -121,31 +168,101 @@ def save_visitor_image(frame: np.ndarray, visitor_id: int, session_id: str) -> s
 # FRAME CAPTURE
 # =============================================================================
 
+# The dedup region follows the face once its box overlaps the region's face box by less than this
+DEDUP_ROI_MIN_IOU = 0.5
+
+
+def dedup_roi(bbox: Tuple[int, int, int, int], hires_shape: Tuple[int, ...],
+              scale: float) -> Tuple[int, int, int, int]:
+    """Dedup region in hires coordinates: lowres face bbox plus one face width/height on each side."""
+    x1, y1, x2, y2 = bbox
+    fw, fh = x2 - x1, y2 - y1
+    h, w = hires_shape[:2]
+    return (max(0, int((x1 - fw) * scale)), max(0, int((y1 - fh) * scale)),
+            min(w, int((x2 + fw) * scale)), min(h, int((y2 + fh) * scale)))
+
+
+def tracked_bbox(scorer: Union[OnlineBurstScorer, MultiFaceBurstScorer]) -> Optional[Tuple[int, int, int, int]]:
+    """Latest face box seen by the scorer (union over all lanes), in lowres coordinates."""
+    lanes = scorer.lanes if isinstance(scorer, MultiFaceBurstScorer) else [scorer]
+    boxes = [lane.last_bbox for lane in lanes if lane.last_bbox is not None]
+    if not boxes:
+        return None
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
 def capture_frames_for_person(
     cap: cv2.VideoCapture,
     trigger_frame: np.ndarray,
     duration: float,
     frame_skip: int,
-    target_width: int
+    target_width: int,
+    scorer: Optional[Union[OnlineBurstScorer, MultiFaceBurstScorer]] = None,
+    keep_frames: bool = True,
+    face_bbox: Optional[Tuple[int, int, int, int]] = None,
+    dedup_threshold: float = 0.0,
+    dedup_max_skip: int = 0,
+    frame_store: Optional[FrameStore] = None
 ) -> PersonCapture:
     """
     Capture frames for a detected person over specified duration.
     
+    With a scorer, every kept frame is handed to it as it arrives and scored
+    concurrently; frames are only stored in PersonCapture.frames if keep_frames
+    is set (e.g. for the debug frame stream). The scorer can also end the burst
+    early (enough good frames, or face left the ROI); duration stays the ceiling.
+    
+    With dedup_threshold > 0, a frame whose thumbnail (around the face)
+    differs from the last kept frame by less than the threshold (mean absolute
+    difference, 0-255) is dropped before it is resized, stored or scored. With
+    a scorer, the region follows the face as scored so far; when the face has
+    moved away from the region, the frame is kept and the region moves with it.
+    
     Args:
         cap: Video capture object
         trigger_frame: The frame that triggered detection
         duration: How long to capture (seconds)
         frame_skip: Keep every Nth frame
         target_width: Resize frames to this width
+        scorer: Optional OnlineBurstScorer (or MultiFaceBurstScorer) for scoring during capture
+        keep_frames: Store all frames in PersonCapture.frames
+        face_bbox: Trigger face bbox in lowres coordinates (dedup region)
+        dedup_threshold: Near-duplicate threshold (0 = keep every frame)
+        dedup_max_skip: Keep a frame anyway after this many consecutive drops (0 = no limit)
+        frame_store: Empty store to keep frames in instead of a list (e.g. JpegFrameStore)
     
     Returns:
         PersonCapture with collected frames
     """
     session_id = datetime.now().strftime('%Y%m%d_%H%M%S')
-    frames = [trigger_frame]  # Include the trigger frame
+    frames = [trigger_frame] if keep_frames else []  # Include the trigger frame
+    if keep_frames and frame_store is not None:
+        frame_store.add(*trigger_frame)
+        frames = frame_store
+    timestamps = [0.0]
+    burst_len = 1
     frame_count = 0
+    stop_reason = "duration"
     start_time = time.time()
     
+    # Dedup region: face plus one face width/height on each side, in hires coordinates
+    frames_deduped = 0
+    consecutive_dups = 0
+    last_thumb = None
+    roi = None
+    roi_bbox = face_bbox  # Lowres face box the region was built around
+    if dedup_threshold > 0:
+        trigger_hires, trigger_lowres = trigger_frame
+        scale = trigger_hires.shape[1] / trigger_lowres.shape[1]
+        if face_bbox is not None:
+            roi = dedup_roi(face_bbox, trigger_hires.shape, scale)
+        last_thumb = dedup_thumbnail(trigger_hires, roi)
+    
+    if scorer is not None:
+        scorer.start()
+        scorer.submit(0, *trigger_frame)
+    
     logger.debug(f"Capturing frames for {duration}s (every {frame_skip} frame)...")
     
     while time.time() - start_time < duration:
@@ -158,47 +275,216 @@ def capture_frames_for_person(
             # Apply same cropping as main loop
             frame_cropped = crop_frame(frame, crop_left=0.35, crop_right=0.35,
                                        crop_top=0.10, crop_bottom=0.40)
+            
+            # Drop near-duplicates of the last kept frame (person standing still)
+            if last_thumb is not None:
+                # Face moved off the region: keep this frame, re-anchor the region on the face
+                moved = False
+                bbox = tracked_bbox(scorer) if scorer is not None and roi_bbox is not None else None
+                if bbox is not None and bbox_iou(bbox, roi_bbox) < DEDUP_ROI_MIN_IOU:
+                    roi_bbox = bbox
+                    roi = dedup_roi(bbox, frame_cropped.shape, scale)
+                    moved = True
+                thumb = dedup_thumbnail(frame_cropped, roi)
+                diff = cv2.norm(thumb, last_thumb, cv2.NORM_L1) / thumb.size
+                if (not moved and diff < dedup_threshold
+                        and (dedup_max_skip <= 0 or consecutive_dups < dedup_max_skip)):
+                    frames_deduped += 1
+                    consecutive_dups += 1
+                    continue
+                last_thumb = thumb
+                consecutive_dups = 0
+            
             frame_resized = resize_frame(frame_cropped, target_width)
-            # Store both: cropped (high-res for recognition) and resized (for scoring)
-            frames.append((frame_cropped, frame_resized))
+            timestamp = time.time() - start_time
+            timestamps.append(timestamp)
+            if scorer is not None:
+                scorer.submit(burst_len, frame_cropped, frame_resized, timestamp)
+            if keep_frames:
+                # Store both: cropped (high-res for recognition) and resized (for scoring)
+                if frame_store is not None:
+                    frame_store.add(frame_cropped, frame_resized)
+                else:
+                    frames.append((frame_cropped, frame_resized))
+            burst_len += 1
+            
+            if scorer is not None:
+                reason = scorer.stop_reason()
+                if reason is not None:
+                    stop_reason = reason
+                    break
     
-    logger.debug(f"Captured {len(frames)} frames ({frame_count} total, kept every {frame_skip})")
+    logger.debug(f"Captured {burst_len} frames ({frame_count} total, kept every {frame_skip}, "
+                 f"{frames_deduped} near-duplicates dropped, "
+                 f"stopped on {stop_reason} after {time.time() - start_time:.1f}s)")
     
     return PersonCapture(
         session_id=session_id,
         frames=frames,
         start_time=start_time,
-        trigger_frame=trigger_frame
+        trigger_frame=trigger_frame,
+        frame_count=burst_len,
+        scorer=scorer,
+        stop_reason=stop_reason,
+        timestamps=timestamps,
+        frames_deduped=frames_deduped
     )
 
 
+def split_capture(capture: PersonCapture, scorer: MultiFaceBurstScorer) -> List[PersonCapture]:
+    """
+    Split a multi-face burst into one PersonCapture per face.
+    
+    Kept burst frames are shared; each capture gets its face's scoring lane
+    and stop reason. Session IDs after the first get a per-face suffix so
+    debug output does not collide.
+    
+    Args:
+        capture: Capture returned by capture_frames_for_person
+        scorer: The MultiFaceBurstScorer used for that capture
+    
+    Returns:
+        List of PersonCapture, in lane (trigger face) order
+    """
+    reasons = scorer.finish(total_frames=capture.frame_count)
+    return [
+        replace(capture,
+                session_id=capture.session_id if k == 0 else f"{capture.session_id}_f{k}",
+                scorer=lane,
+                stop_reason=reason or "duration")
+        for k, (lane, reason) in enumerate(zip(scorer.lanes, reasons))
+    ]
+
+
 # =============================================================================
 # QUALITY SCORING & SELECTION
 # =============================================================================
 
-def select_best_frame(capture: PersonCapture, skip_start: int = 0, skip_end: int = 0) -> Tuple[np.ndarray, np.ndarray, QualityScore, List[Tuple[int, np.ndarray, np.ndarray, QualityScore]]]:
+def score_frames_by_embedding_norm(
+    frames: FrameSource,
+    workers: int = 1,
+    timestamps: Optional[List[float]] = None,
+    norm_reference: Optional[float] = None
+) -> SessionTable:
+    """
+    Score frames by raw ArcFace embedding norm instead of handcrafted metrics.
+    
+    YuNet runs on each lowres frame for the bbox and 5 keypoints; the faces are
+    then aligned on the hires frames and embedded in one batched recognition
+    pass. The embeddings are kept in the table, so fusion reuses them.
+    
+    score.total = 1000 × norm / norm_reference (can exceed 1000). The five
+    frame_quality metrics are not computed (reported as skipped, 1.0).
+    
+    Args:
+        frames: List of (cropped_hires, resized_lowres) tuples
+        workers: Number of detection threads
+        timestamps: Capture time of each frame in seconds
+        norm_reference: Embedding norm that maps to a score of 1000
+                        (default: config EMBEDDING_NORM_REFERENCE)
+    
+    Returns:
+        SessionTable of frames with a face, sorted by embedding norm descending
+    """
+    if norm_reference is None:
+        norm_reference = cfg.EMBEDDING_NORM_REFERENCE
+    
+    def detect(i: int):
+        return detect_face_with_landmarks(lowres_frame(frames, i), min_confidence=cfg.MIN_DET_CONF)
+    
+    if workers > 1 and len(frames) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="score") as executor:
+            detections = list(executor.map(detect, range(len(frames))))
+    else:
+        detections = [detect(i) for i in range(len(frames))]
+    
+    faces = [(i, d) for i, d in enumerate(detections) if d is not None]
+    
+    # YuNet keypoints are in lowres coordinates - scale to the hires frame
+    hires_frames = []
+    keypoints = []
+    for i, (bbox, landmarks) in faces:
+        frame_hires, frame_lowres = frames[i]
+        scale_x = frame_hires.shape[1] / frame_lowres.shape[1]
+        scale_y = frame_hires.shape[0] / frame_lowres.shape[0]
+        kps = np.array([landmarks[name] for name in KEYPOINT_NAMES], dtype=np.float32)
+        hires_frames.append(frame_hires)
+        keypoints.append(kps * np.array([scale_x, scale_y], dtype=np.float32))
+    
+    embeddings, norms = extract_aligned_embeddings(hires_frames, keypoints)
+    
+    rows = np.zeros(len(faces), dtype=SESSION_DTYPE)
+    slot_embeddings = np.zeros((len(frames), embeddings.shape[1]), dtype=embeddings.dtype)
+    for k, (i, (bbox, landmarks)) in enumerate(faces):
+        yaw, pitch = estimate_head_pose_from_landmarks(landmarks, bbox)
+        score = QualityScore(
+            total=1000.0 * float(norms[k]) / norm_reference,
+            face_size=1.0, sharpness=1.0, brightness=1.0, contrast=1.0, frontality=1.0,
+            yaw=yaw, pitch=pitch, bbox=bbox, skipped=METRIC_EVAL_ORDER
+        )
+        timestamp = timestamps[i] if timestamps is not None else 0.0
+        SessionTable.set_row(rows, k, i, score, slot=i, timestamp=timestamp,
+                             det_score=landmarks['score'], embedding_norm=float(norms[k]))
+        slot_embeddings[i] = embeddings[k]
+    
+    return SessionTable(rows, as_store(frames), slot_embeddings).sort_by_total()
+
+
+def select_best_frame(
+    capture: PersonCapture,
+    skip_start: int = 0,
+    skip_end: int = 0,
+    min_quality_score: Optional[float] = None,
+    top_n: Optional[int] = None,
+    workers: int = 1,
+    scoring_mode: str = "metrics",
+    locator: Optional[FaceLocator] = None
+) -> Tuple[np.ndarray, np.ndarray, QualityScore, SessionTable]:
     """
     Score all frames and select the best one.
     
     Frames are stored as (cropped_hires, resized_lowres) tuples.
     Scoring uses resized_lowres, but returns cropped_hires for recognition.
+    If the capture was scored online, this only collects the scorer's top-K.
+    With scoring_mode="embedding_norm", frames are ranked by ArcFace embedding
+    norm (see score_frames_by_embedding_norm) and the embeddings are kept.
     
     Args:
         capture: PersonCapture containing frames
         skip_start: Number of frames to skip from start (person entering)
         skip_end: Number of frames to skip from end (person leaving)
+        min_quality_score: Quality gate for early-exit scoring (None = score fully)
+        top_n: Number of frames used downstream, for early-exit scoring (None = all)
+        workers: Number of scoring threads
+        scoring_mode: "metrics" (frame_quality score) or "embedding_norm"
+        locator: Bbox-local face detection for metrics scoring (None = full-frame)
     
     Returns:
-        (best_frame_hires, best_frame_lowres, best_score, all_scored_frames)
+        (best_frame_hires, best_frame_lowres, best_score, scored_table)
     """
-    # Trim frames from start and end
-    frames = capture.frames
-    total = len(frames)
-    if skip_start + skip_end < total:
-        frames = frames[skip_start:total - skip_end if skip_end > 0 else total]
-        logger.debug(f"Trimmed frames: {total} -> {len(frames)} (skip {skip_start} start, {skip_end} end)")
-    
-    scored = score_frames_dual(frames)
+    if capture.scorer is not None:
+        # Scored during capture - trimming is applied by the scorer
+        scored = capture.scorer.finish(total_frames=capture.frame_count,
+                                       trim_tail=capture.stop_reason not in ("quality", "identified"))
+        logger.debug(f"Online scoring: {capture.scorer.frames_with_face}/{capture.frame_count} frames "
+                     f"with faces, kept top {len(scored)}")
+    else:
+        # Trim frames from start and end
+        frames = capture.frames
+        timestamps = capture.timestamps if len(capture.timestamps) == len(frames) else None
+        total = len(frames)
+        if skip_start + skip_end < total:
+            end = total - skip_end if skip_end > 0 else total
+            frames = frames[skip_start:end]
+            if timestamps is not None:
+                timestamps = timestamps[skip_start:end]
+            logger.debug(f"Trimmed frames: {total} -> {len(frames)} (skip {skip_start} start, {skip_end} end)")
+        
+        if scoring_mode == "embedding_norm":
+            scored = score_frames_by_embedding_norm(frames, workers=workers, timestamps=timestamps)
+        else:
+            scored = score_frames_dual(frames, min_score=min_quality_score, top_n=top_n,
+                                       workers=workers, timestamps=timestamps, locator=locator)
     
     if not scored:
         # Fallback to trigger frame if no faces detected in any frame
@@ -212,28 +498,79 @@ def select_best_frame(capture: PersonCapture, skip_start: int = 0, skip_end: int
                 brightness=0.0, contrast=0.0, frontality=0.0,
                 yaw=0.0, pitch=0.0, bbox=(0, 0, 0, 0)
             )
-        return (trigger_hires, trigger_lowres, score, [])
+        return (trigger_hires, trigger_lowres, score, SessionTable.empty())
     
-    best_idx, best_frame_hires, best_frame_lowres, best_score = scored[0]
+    best_frame_hires, best_frame_lowres = scored.frame(0)
+    best_score = scored.score(0)
     return (best_frame_hires, best_frame_lowres, best_score, scored)
 
 
+def embed_sessions_batched(tables: List[SessionTable], min_quality_score: float) -> int:
+    """
+    Embed the fusion candidates of several faces in one recognition call.
+    
+    Candidates are the rows passing the quality gate that carry YuNet keypoints
+    (multi-face online scoring). They are aligned on their stored hires frames
+    and embedded together (extract_aligned_embeddings); the embeddings are
+    attached to each table, so compute_fused_embedding reuses them with the
+    YuNet confidence as detection score. Aligning on the lane's own keypoints
+    also keeps a neighbour's face in the same crop from being embedded instead.
+    
+    Args:
+        tables: Scored table of each face
+        min_quality_score: Quality gate for fusion candidates
+    
+    Returns:
+        Number of frames embedded
+    """
+    hires_frames, keypoints, targets = [], [], []
+    for t, table in enumerate(tables):
+        gate = (table.rows['total'] >= min_quality_score) & ~table.rows['partial']
+        for i in np.flatnonzero(gate):
+            kps = table.hires_keypoints(i)
+            if kps is None:
+                continue
+            hires_frames.append(table.frame(i)[0])
+            keypoints.append(kps)
+            targets.append((t, int(table.rows['slot'][i])))
+    
+    embeddings, _ = extract_aligned_embeddings(hires_frames, keypoints)
+    for table in tables:
+        table.embeddings = np.zeros((len(table.store), embeddings.shape[1]), dtype=embeddings.dtype)
+    for (t, slot), embedding in zip(targets, embeddings):
+        tables[t].embeddings[slot] = embedding
+    return len(targets)
+
+
 def compute_fused_embedding(
-    scored_frames: List[Tuple[int, np.ndarray, np.ndarray, QualityScore]],
+    scored_frames: SessionTable,
     min_quality_score: float,
     min_detection_score: float,
     top_n: int = 3,
-    weight_power: float = 0.3
+    weight_power: float = 0.3,
+    workers: int = 1,
+    selection: str = "top"
 ) -> Tuple[Optional[np.ndarray], List[Tuple[float, float, float]], Optional[np.ndarray], Optional[Tuple]]:
     """
     Compute soft-weighted average embedding from top N frames above quality threshold.
     
+    Embeddings are extracted in rounds of (top_n - valid so far) candidates;
+    with workers > 1 each round runs on a thread pool sharing the ONNX session.
+    If the table already holds embeddings (embedding_norm scoring), those are
+    used directly and the YuNet confidence is the detection score.
+    
+    With selection="diverse", candidates are taken in greedy quality/diversity
+    order (SessionTable.diverse_order) instead of by score, so the fused frames
+    spread across pose and time rather than being near-identical neighbours.
+    
     Args:
-        scored_frames: List of (idx, frame_hires, frame_lowres, QualityScore), sorted by score
+        scored_frames: SessionTable sorted by score
         min_quality_score: Minimum quality score to consider a frame
         min_detection_score: Minimum InsightFace detection confidence
         top_n: Maximum number of frames to fuse
         weight_power: Exponent for soft weighting (0.3 = lenient, 1.0 = linear)
+        workers: Number of embedding threads
+        selection: "top" (highest scores) or "diverse" (pose/time-spread)
     
     Returns:
         (fused_embedding, fusion_details, best_frame_for_api, best_frame_bbox)
@@ -241,7 +578,13 @@ def compute_fused_embedding(
         - fusion_details: List of (quality_score, det_score, weight) for each fused frame
         - best_frame_for_api: The lowres frame from the highest-scoring valid frame
         - best_frame_bbox: The bbox from the same frame (matching coordinates)
+    
+    Raises:
+        ValueError: If selection is not one of FUSION_SELECTIONS
     """
+    if selection not in FUSION_SELECTIONS:
+        raise ValueError(f"Invalid fusion selection '{selection}' (expected one of {', '.join(FUSION_SELECTIONS)})")
+    
     embeddings = []
     weights = []
     det_scores = []
@@ -249,38 +592,61 @@ def compute_fused_embedding(
     best_frame_lowres = None
     best_frame_bbox = None
     
-    for idx, frame_hires, frame_lowres, score in scored_frames:
-        # Quality gate: skip frames below threshold
-        if score.total < min_quality_score:
-            continue
-        
-        # Extract embedding from high-res frame
-        face_results = extract_embeddings(frame_hires)
-        if not face_results:
-            continue
-        
-        emb, bbox, det_score = face_results[0]
-        
-        # Detection confidence gate
-        if det_score < min_detection_score:
-            continue
-        
-        # Valid frame - add to fusion
-        embeddings.append(emb)
-        det_scores.append(det_score)
-        quality_scores.append(score.total)
-        
-        # Soft weight: score^power dampens quality differences
-        weights.append(score.total ** weight_power)
-        
-        # Keep first valid frame and its bbox for API image
-        if best_frame_lowres is None:
-            best_frame_lowres = frame_lowres
-            best_frame_bbox = score.bbox  # Use bbox from same frame
-        
-        # Stop after top_n valid frames
-        if len(embeddings) >= top_n:
-            break
+    # Quality gate: skip frames below threshold
+    # (partial scores were cut short below the gate or the top-N cutoff)
+    candidates = scored_frames.passing(min_quality_score)
+    if selection == "diverse":
+        candidates = candidates.diverse_order(
+            diversity=cfg.EMBEDDING_FUSION_DIVERSITY,
+            pose_scale_deg=cfg.EMBEDDING_FUSION_POSE_SCALE_DEG,
+            time_scale_sec=cfg.EMBEDDING_FUSION_TIME_SCALE_SEC
+        )
+    totals = candidates.rows['total']
+    
+    use_pool = workers > 1 and candidates.embeddings is None
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") if use_pool else None
+    pos = 0
+    try:
+        while pos < len(candidates) and len(embeddings) < top_n:
+            batch = range(pos, min(len(candidates), pos + top_n - len(embeddings)))
+            pos = batch.stop
+            batch_frames = [candidates.frame(i) for i in batch]
+            
+            # Extract embeddings from high-res frames (unless computed while scoring)
+            if candidates.embeddings is not None:
+                batch_results = [[(candidates.embedding(i), None, float(candidates.rows['det_score'][i]))]
+                                 for i in batch]
+            elif executor is not None:
+                batch_results = list(executor.map(lambda f: extract_embeddings(f[0]), batch_frames))
+            else:
+                batch_results = [extract_embeddings(f[0]) for f in batch_frames]
+            
+            for i, (frame_hires, frame_lowres), face_results in zip(batch, batch_frames, batch_results):
+                if not face_results:
+                    continue
+                
+                emb, bbox, det_score = face_results[0]
+                
+                # Detection confidence gate
+                if det_score < min_detection_score:
+                    continue
+                
+                # Valid frame - add to fusion
+                embeddings.append(emb)
+                det_scores.append(det_score)
+                total = float(totals[i])
+                quality_scores.append(total)
+                
+                # Soft weight: score^power dampens quality differences
+                weights.append(total ** weight_power)
+                
+                # Keep first valid frame and its bbox for API image
+                if best_frame_lowres is None:
+                    best_frame_lowres = frame_lowres
+                    best_frame_bbox = candidates.local_bbox(i)  # Use bbox from same (possibly compact) frame
+    finally:
+        if executor is not None:
+            executor.shutdown()
     
     if not embeddings:
         return None, [], None, None
@@ -379,7 +745,7 @@ def draw_face_box_detailed(image: np.ndarray, bbox: Tuple[int, int, int, int],
 
 def generate_debug_report(
     capture: PersonCapture,
-    scored_frames: List[Tuple[int, np.ndarray, np.ndarray, QualityScore]],
+    scored_frames: SessionTable,
     best_score: QualityScore,
     visitor_result: str,
     visitor_id: int,
@@ -391,7 +757,7 @@ def generate_debug_report(
     
     Args:
         capture: PersonCapture with frames
-        scored_frames: List of (frame_idx, frame_hires, frame_lowres, QualityScore)
+        scored_frames: SessionTable sorted by score
         best_score: QualityScore of best frame
         visitor_result: Result string (NEW, RETURNING, LOW_QUALITY, etc.)
         visitor_id: Visitor ID if identified
@@ -447,7 +813,7 @@ def generate_debug_report(
 
 | Metric | Value |
 |--------|-------|
-| Total Frames Captured | {len(capture.frames)} |
+| Total Frames Captured | {capture.frame_count} |
 | Frames with Faces | {len(scored_frames)} |
 | Face Bounding Box | ({x1}, {y1}) to ({x2}, {y2}) |
 | Face Dimensions | {face_width} x {face_height} px |
@@ -492,12 +858,17 @@ Frontality:
 """
     
     # Add best frame with detailed visualization
-    # scored_frames format: (idx, hires, lowres, score) - use lowres for display
+    # Use lowres for display
+    # (compact frames hold only the face region; the thumbnail shows the scene)
     if scored_frames:
-        best_frame_lowres = scored_frames[0][2]
-        annotated = draw_face_box_detailed(best_frame_lowres, best_score.bbox, best_score, det_score)
+        _, best_frame_lowres = scored_frames.frame(0)
+        annotated = draw_face_box_detailed(best_frame_lowres, scored_frames.local_bbox(0), best_score, det_score)
         b64_img = image_to_base64(annotated, max_width=600)
         md += f"![Best Frame]({b64_img})\n\n"
+        
+        thumbnail = scored_frames.store.thumbnail(int(scored_frames.rows['slot'][0]))
+        if thumbnail is not None:
+            md += f"![Context]({image_to_base64(thumbnail)})\n\n"
     
     
     # Save report
@@ -509,8 +880,8 @@ Frontality:
     
     # Also save best frame as image
     if cfg.DEBUG_SAVE_TOP_FRAMES and scored_frames:
-        best_frame_lowres = scored_frames[0][2]
-        best_annotated = draw_face_box_detailed(best_frame_lowres, best_score.bbox, best_score, det_score)
+        _, best_frame_lowres = scored_frames.frame(0)
+        best_annotated = draw_face_box_detailed(best_frame_lowres, scored_frames.local_bbox(0), best_score, det_score)
         best_path = os.path.join(cfg.DEBUG_OUTPUT_DIR, f"best_{capture.session_id}.jpg")
         cv2.imwrite(best_path, best_annotated)
         logger.debug(f"Best frame saved: {best_path}")
@@ -520,7 +891,7 @@ def save_debug_frame_stream(
     capture: PersonCapture,
     visitor_result: str,
     visitor_id: int,
-    scored_frames: List[Tuple[int, np.ndarray, np.ndarray, 'QualityScore']] = None
+    scored_frames: Optional[SessionTable] = None
 ) -> None:
     """
     Save ALL captured frames to disk for later analysis.
@@ -534,12 +905,13 @@ def save_debug_frame_stream(
             frame_001_0100ms.jpg
             ...
             metadata.json
+            scores.npz   (SessionTable columns, if scored_frames given)
     
     Args:
         capture: PersonCapture with all frames
         visitor_result: Result string (NEW, RETURNING, LOW_QUALITY, etc.)
         visitor_id: Visitor ID if identified
-        scored_frames: Optional list of scored frames for metadata
+        scored_frames: Optional SessionTable for metadata
     """
     if not cfg.DEBUG_MODE or not cfg.DEBUG_SAVE_FRAME_STREAM:
         return
@@ -566,6 +938,13 @@ def save_debug_frame_stream(
     def save_single_frame(args):
         """Save a single frame (for parallel execution)."""
         idx, frame_data, timestamp_ms = args
+        filename = f"frame_{idx:03d}_{int(timestamp_ms):04d}ms.jpg"
+        filepath = os.path.join(session_dir, filename)
+        
+        # JPEG frame store: hires is already encoded
+        if isinstance(frame_data, np.ndarray) and frame_data.ndim == 1:
+            frame_data.tofile(filepath)
+            return filename
         
         # Handle both tuple (hires, lowres) and single frame formats
         if isinstance(frame_data, tuple):
@@ -575,15 +954,17 @@ def save_debug_frame_stream(
             frame_lowres = frame_data
         
         # Save high-res version for analysis
-        filename = f"frame_{idx:03d}_{int(timestamp_ms):04d}ms.jpg"
-        filepath = os.path.join(session_dir, filename)
         cv2.imwrite(filepath, frame_hires)
         return filename
     
     # Prepare frame data with timestamps
     frame_tasks = []
-    for idx, frame_data in enumerate(capture.frames):
-        timestamp_ms = idx * time_per_frame_ms
+    # Use recorded capture times when available, estimate otherwise
+    measured = len(capture.timestamps) == frame_count
+    encoded = isinstance(capture.frames, JpegFrameStore)
+    for idx in range(frame_count):
+        frame_data = capture.frames.encoded(idx) if encoded else capture.frames[idx]
+        timestamp_ms = capture.timestamps[idx] * 1000 if measured else idx * time_per_frame_ms
         frame_tasks.append((idx, frame_data, timestamp_ms))
     
     # Save frames in parallel (non-blocking I/O)
@@ -608,17 +989,8 @@ def save_debug_frame_stream(
     
     # Add quality scores if available
     if scored_frames:
-        metadata["scored_frames"] = [
-            {
-                "frame_idx": idx,
-                "quality_score": score.total,
-                "frontality": score.frontality,
-                "face_size": score.face_size,
-                "yaw": score.yaw,
-                "pitch": score.pitch,
-            }
-            for idx, _, _, score in scored_frames
-        ]
+        metadata["scored_frames"] = scored_frames.to_records()
+        scored_frames.save_npz(os.path.join(session_dir, "scores.npz"))
     
     # Save metadata
     metadata_path = os.path.join(session_dir, "metadata.json")
@@ -637,7 +1009,8 @@ def run_visitor_counter(
     api_base_url: Optional[str] = None,
     api_key: Optional[str] = None,
     location_id: Optional[int] = None,
-    debug_mode: bool = False
+    debug_mode: bool = False,
+    on_ready: Optional[Callable[[], None]] = None
 ) -> None:
     """
     Main visitor counting loop with frame quality scoring.
@@ -648,6 +1021,7 @@ def run_visitor_counter(
         api_key: API key. If None, uses camera_config or config.py.
         location_id: Location ID. If None, uses camera_config or config.py.
         debug_mode: Enable debug output.
+        on_ready: Called once models are loaded and warmed up, before the first frame is processed.
     
     Flow:
     1. Fast face detection (YuNet)
@@ -680,6 +1054,18 @@ def run_visitor_counter(
         cooldown_seconds = settings.cooldown_seconds
         min_quality_score = settings.min_quality_score
         min_detection_score = settings.min_detection_score
+        scoring_workers = settings.scoring_workers
+        scoring_mode = settings.scoring_mode
+        fusion_selection = settings.fusion_selection
+        entry_line = settings.entry_line
+        ort_options = dict(
+            intra_op_threads=settings.ort_intra_op_threads,
+            inter_op_threads=settings.ort_inter_op_threads,
+            execution_mode=settings.ort_execution_mode,
+            graph_optimization=settings.ort_graph_optimization,
+            memory_arena=settings.ort_memory_arena,
+            spin_wait=settings.ort_spin_wait
+        )
     else:
         # Legacy: Use config.py
         camera_source = cfg.RTSP_URL
@@ -694,6 +1080,18 @@ def run_visitor_counter(
         cooldown_seconds = cfg.COOLDOWN_SECONDS
         min_quality_score = cfg.MIN_QUALITY_SCORE
         min_detection_score = cfg.MIN_DETECTION_SCORE
+        scoring_workers = cfg.SCORING_WORKERS
+        scoring_mode = cfg.QUALITY_SCORING_MODE
+        fusion_selection = cfg.EMBEDDING_FUSION_SELECTION
+        entry_line = cfg.ENTRY_LINE
+        ort_options = dict(
+            intra_op_threads=cfg.ORT_INTRA_OP_THREADS,
+            inter_op_threads=cfg.ORT_INTER_OP_THREADS,
+            execution_mode=cfg.ORT_EXECUTION_MODE,
+            graph_optimization=cfg.ORT_GRAPH_OPTIMIZATION,
+            memory_arena=cfg.ORT_MEMORY_ARENA,
+            spin_wait=cfg.ORT_SPIN_WAIT
+        )
     
     # API configuration (priority: function args > camera_config > config.py)
     if api_base_url is None:
@@ -703,6 +1101,21 @@ def run_visitor_counter(
     if location_id is None:
         location_id = cfg.API_LOCATION_ID
     
+    # A misspelled mode would silently turn off everything that needs metrics scoring
+    # (online scoring, early stop, multi-face, speculative identify, local detection)
+    if scoring_mode not in SCORING_MODES:
+        raise ValueError(f"Invalid scoring_mode '{scoring_mode}' (expected one of {', '.join(SCORING_MODES)})")
+    # Likewise an unknown selection would quietly fall back to "top"
+    if fusion_selection not in FUSION_SELECTIONS:
+        raise ValueError(f"Invalid fusion_selection '{fusion_selection}' "
+                         f"(expected one of {', '.join(FUSION_SELECTIONS)})")
+    
+    # Fail here rather than in the first burst's scorer thread
+    sharpness_estimator = getattr(cfg, 'QUALITY_SHARPNESS_ESTIMATOR', 'laplacian')
+    if sharpness_estimator not in SHARPNESS_ESTIMATORS:
+        raise ValueError(f"Invalid QUALITY_SHARPNESS_ESTIMATOR '{sharpness_estimator}' "
+                         f"(expected one of {', '.join(SHARPNESS_ESTIMATORS)})")
+    
     # Display camera source (hide credentials)
     camera_display = str(camera_source) if isinstance(camera_source, int) else camera_source.split('@')[-1]
     
@@ -712,16 +1125,40 @@ def run_visitor_counter(
     logger.info(f"Camera: {camera_display}")
     logger.info(f"Location ID: {location_id}")
     logger.info(f"Similarity threshold: {similarity_threshold}")
-    logger.info(f"Cooldown: {cooldown_seconds}s")
+    logger.info(f"Cooldown: {cooldown_seconds}s" + (" per track" if cfg.TRACKER_ENABLED else ""))
+    if entry_line is not None and not cfg.TRACKER_ENABLED:
+        logger.warning("Entry line ignored: requires TRACKER_ENABLED")
+        entry_line = None
+    if entry_line is not None:
+        logger.info(f"Entry line: {entry_line.get('points')}, direction={entry_line.get('direction', 'any')}")
     logger.info(f"Quality capture: {capture_duration}s, every {frame_skip} frame")
     logger.info(f"Quality gates: score >= {min_quality_score}, det >= {min_detection_score}")
+    logger.info(f"Scoring/embedding threads: {scoring_workers}")
+    logger.info(f"ORT sessions: intra-op {ort_options['intra_op_threads'] or 'default'}, "
+                f"inter-op {ort_options['inter_op_threads'] or 'default'}, {ort_options['execution_mode']}, "
+                f"opt={ort_options['graph_optimization']}, arena={ort_options['memory_arena']}, "
+                f"spin={ort_options['spin_wait']}")
+    logger.info(f"Frame scoring mode: {scoring_mode}")
+    logger.info(f"Fusion: top {cfg.EMBEDDING_FUSION_TOP_N} frames, selection={fusion_selection}")
+    speculative_enabled = cfg.SPECULATIVE_IDENTIFY and cfg.ONLINE_SCORING and scoring_mode == "metrics"
+    multi_face = cfg.MULTI_FACE_ENABLED and cfg.ONLINE_SCORING and scoring_mode == "metrics"
+    logger.info(f"Multi-face capture: {f'up to {cfg.MULTI_FACE_MAX} faces' if multi_face else False}")
+    logger.info(f"Speculative identify: {speculative_enabled}")
     logger.info(f"Debug mode: {cfg.DEBUG_MODE}")
     logger.info("Press Ctrl+C to stop")
     logger.info("=" * 70)
     
+    # Diverse selection needs more fully scored frames than it fuses
+    fusion_pool = cfg.EMBEDDING_FUSION_TOP_N
+    if fusion_selection == "diverse":
+        fusion_pool = max(fusion_pool, cfg.EMBEDDING_FUSION_CANDIDATES)
+    
     # Load face recognition model (downloads on first run)
     logger.info("Loading face recognition model...")
+    configure_sessions(**ort_options)
+    load_start = time.perf_counter()
     get_face_analyzer()
+    logger.info(f"Face recognition model loaded in {(time.perf_counter() - load_start) * 1000:.0f}ms")
     
     # Initialize API client (required for server-side matching)
     logger.info(f"Connecting to API: {api_base_url}")
@@ -736,6 +1173,16 @@ def run_visitor_counter(
         logger.error("✗ API not reachable - cannot continue without server")
         return
     
+    # Speculative identify runs on its own thread, one request per burst
+    speculative = None
+    if speculative_enabled:
+        speculative = SpeculativeIdentifier(
+            api,
+            min_detection_score=min_detection_score,
+            confident_similarity=similarity_threshold + cfg.SPECULATIVE_CONFIDENT_MARGIN,
+            confirm_similarity=cfg.SPECULATIVE_CONFIRM_SIMILARITY
+        )
+    
     # Connect to camera
     logger.info("Connecting to camera...")
     # Use TCP transport for more stable RTSP connection
@@ -766,13 +1213,39 @@ def run_visitor_counter(
     logger.info(f"After crop (35%L/R, 10%T/40%B): {frame_cropped.shape[1]}x{frame_cropped.shape[0]}")
     logger.info(f"Processing resolution: {w}x{h}")
     
+    # Warm-up: first inferences build the detector, select ORT kernels and grow
+    # arenas - do it now, at the real shapes, instead of on the first visitor
+    if cfg.MODEL_WARMUP_ENABLED:
+        warmup_start = time.perf_counter()
+        # One YuNet per scoring thread (the detection loop reuses one of them)
+        warm_up_detectors(frame_resized.shape, scoring_workers)
+        warmup_ms = {f'yunet x{max(1, scoring_workers)}': (time.perf_counter() - warmup_start) * 1000}
+        warmup_ms.update(warm_up_analyzer(frame_cropped.shape, batch_sizes=(1, fusion_pool)))
+        logger.info(f"Models warmed up in {(time.perf_counter() - warmup_start) * 1000:.0f}ms "
+                    f"({', '.join(f'{name} {ms:.0f}ms' for name, ms in warmup_ms.items())})")
+    
+    # Each tracked face is identified once; cooldown only gates retries per track.
+    # With an entry line (normalized to the processing frame), tracks must cross it first.
+    tracker = None
+    if cfg.TRACKER_ENABLED:
+        tracker = FaceTracker(
+            iou_threshold=cfg.TRACKER_IOU_THRESHOLD,
+            max_centroid_distance=cfg.TRACKER_MAX_CENTROID_DISTANCE,
+            max_age_sec=cfg.TRACKER_MAX_AGE_SEC,
+            kalman=cfg.TRACKER_KALMAN,
+            entry_line=EntryLine.from_config(entry_line, (w, h)) if entry_line is not None else None
+        )
+    
+    if on_ready is not None:
+        on_ready()
     logger.info("\nVisitor counting started. Waiting for faces...")
     
     frame_count = 0
     last_capture_time = 0
     
     # Timing stats
-    timing_stats = {'detection': [], 'capture': [], 'scoring': [], 'recognition': [], 'total': []}
+    timing_stats = {'detection': [], 'capture': [], 'scoring': [], 'recognition': [], 'total': [],
+                    'time_to_identify': []}
     stats_window = 100
     
     # Session stats
@@ -782,7 +1255,18 @@ def run_visitor_counter(
         'total_detections': 0,
         'frames_captured': 0,
         'frames_scored': 0,
-        'camera_id': camera_id
+        'frames_deduped': 0,
+        'identifications': 0,
+        'burst_stops': {'duration': 0, 'quality': 0, 'face_lost': 0, 'identified': 0},  # Per person
+        'multi_face_bursts': 0,  # Bursts that captured more than one face
+        'local_detection': {'window': 0, 'full': 0},  # Burst frames located in the bbox window / full frame
+        # Speculative identify: responses used, confident (burst cut), confirmed by the
+        # fused embedding, refined (superseded), and ms saved vs the fused path
+        'speculative': {'results': 0, 'confident': 0, 'confirmed': 0, 'refined': 0, 'saved_ms': []},
+        'prefilter_skipped': {reason: 0 for reason in PREFILTER_REASONS},
+        'start_time': time.time(),
+        'camera_id': camera_id,
+        'jpeg_store': JpegStoreStats()  # Aggregated over all JPEG-stored bursts
     }
     
     try:
@@ -802,9 +1286,9 @@ def run_visitor_counter(
             if frame_count % process_every_n != 0:
                 continue
             
-            # Check cooldown BEFORE processing
+            # Check cooldown BEFORE processing (per track when tracking)
             current_time = time.time()
-            if current_time - last_capture_time < cooldown_seconds:
+            if tracker is None and current_time - last_capture_time < cooldown_seconds:
                 continue
             
             # Crop edges then resize for processing
@@ -812,197 +1296,370 @@ def run_visitor_counter(
             # This focuses on center region and makes faces larger relative to frame
             frame_cropped = crop_frame(frame, crop_left=0.35, crop_right=0.35, 
                                        crop_top=0.10, crop_bottom=0.40)
+            
+            # Prefilter: skip resize + detection for frames that cannot yield a usable face
+            # (lights off, IR switch-over, refocusing)
+            if cfg.PREFILTER_ENABLED:
+                reason = prefilter_frame(
+                    frame_cropped,
+                    min_mean=cfg.PREFILTER_MIN_MEAN,
+                    max_mean=cfg.PREFILTER_MAX_MEAN,
+                    min_std=cfg.PREFILTER_MIN_STD,
+                    min_gradient=cfg.PREFILTER_MIN_GRADIENT
+                )
+                if reason is not None:
+                    session_stats['prefilter_skipped'][reason] += 1
+                    continue
+            
             frame_resized = resize_frame(frame_cropped, target_width)
             
             # =================================================================
             # PHASE 1: Fast face detection (YuNet) with confidence filter
             # =================================================================
             t0 = time.perf_counter()
-            detection_result = detect_face(frame_resized, min_confidence=cfg.MIN_DET_CONF)
+            if multi_face:
+                faces = [(bbox, landmarks['score']) for bbox, landmarks in
+                         detect_faces(frame_resized, min_confidence=cfg.MIN_DET_CONF)[:cfg.MULTI_FACE_MAX]]
+            else:
+                detection_result = detect_face(frame_resized, min_confidence=cfg.MIN_DET_CONF)
+                faces = [detection_result] if detection_result is not None else []
             detection_time = (time.perf_counter() - t0) * 1000
             timing_stats['detection'].append(detection_time)
             
-            if detection_result is None:
-                continue  # No face detected above confidence threshold
+            # Faces to capture, largest first (tracking: skip identified / cooling-down tracks)
+            if tracker is not None:
+                tracks = tracker.update([bbox for bbox, _ in faces], current_time)
+                targets = [(bbox, conf, track) for (bbox, conf), track in zip(faces, tracks)
+                           if tracker.should_capture(track, current_time, cooldown_seconds)]
+            else:
+                targets = [(bbox, conf, None) for bbox, conf in faces]
+            if not targets:
+                continue  # No face detected above confidence threshold (or none to capture)
             
-            face_bbox, det_conf = detection_result
-            logger.info(f"Face detected (conf={det_conf:.2f})! Starting capture...")
-            session_stats['total_detections'] += 1
+            face_bbox = targets[0][0]
+            trigger_time = time.perf_counter()
+            faces_str = "; ".join(f"conf={conf:.2f}" + (f", track #{track.track_id}" if track is not None else "")
+                                  for _, conf, track in targets)
+            if len(targets) == 1:
+                logger.info(f"Face detected ({faces_str})! Starting capture...")
+            else:
+                logger.info(f"{len(targets)} faces detected ({faces_str})! Starting capture...")
+            session_stats['total_detections'] += len(targets)
             
             # =================================================================
             # PHASE 2: Capture frames for quality scoring
             # =================================================================
             t0 = time.perf_counter()
+            scorer = None
+            # Single-face bursts search a window around the trigger face (multi-face
+            # bursts already run one full-frame detection per frame for all lanes)
+            locator = None
+            if cfg.LOCAL_DETECTION_ENABLED and len(targets) == 1 and scoring_mode == "metrics":
+                locator = FaceLocator(face_bbox, pad=cfg.LOCAL_DETECTION_PAD, min_confidence=cfg.MIN_DET_CONF)
+            # Embedding-norm scoring batches the whole burst after capture
+            if cfg.ONLINE_SCORING and scoring_mode == "metrics":
+                lane_kwargs = dict(
+                    top_k=max(cfg.ONLINE_SCORING_TOP_K, fusion_pool),
+                    min_score=min_quality_score,
+                    skip_start=cfg.FRAMES_SKIP_START,
+                    skip_end=cfg.FRAMES_SKIP_END,
+                    early_exit=cfg.QUALITY_EARLY_EXIT,
+                    stop_after_passed=cfg.EMBEDDING_FUSION_TOP_N if cfg.EARLY_STOP_ENABLED else 0,
+                    stop_margin=cfg.EARLY_STOP_SCORE_MARGIN,
+                    stop_after_missed=cfg.EARLY_STOP_FACE_LOST_FRAMES if cfg.EARLY_STOP_ENABLED else 0,
+                    compact_scale=cfg.CAPTURE_FACE_CROP_SCALE if cfg.CAPTURE_COMPACT_FRAMES else 0.0,
+                    thumb_width=cfg.CAPTURE_THUMBNAIL_WIDTH
+                )
+                if len(targets) > 1:
+                    # One detection pass per frame, one scoring lane per face
+                    scorer = MultiFaceBurstScorer(
+                        [bbox for bbox, _, _ in targets],
+                        min_det_conf=cfg.MIN_DET_CONF,
+                        iou_threshold=cfg.TRACKER_IOU_THRESHOLD,
+                        max_centroid_distance=cfg.TRACKER_MAX_CENTROID_DISTANCE,
+                        queue_size=cfg.ONLINE_SCORING_QUEUE_SIZE,
+                        num_workers=scoring_workers,
+                        **lane_kwargs
+                    )
+                    primary = scorer.lanes[0]
+                    # Dedup region covering every face
+                    boxes = np.array([bbox for bbox, _, _ in targets])
+                    face_bbox = (*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0))
+                else:
+                    scorer = OnlineBurstScorer(queue_size=cfg.ONLINE_SCORING_QUEUE_SIZE,
+                                               num_workers=scoring_workers, locator=locator, **lane_kwargs)
+                    primary = scorer
+                # Speculative identify follows the largest face
+                if speculative is not None:
+                    primary.on_pass = speculative.submit
+                    speculative.start(trigger_time, on_confident=primary.request_stop)
             capture = capture_frames_for_person(
                 cap=cap,
                 trigger_frame=(frame_cropped, frame_resized),  # (hires, lowres)
                 duration=capture_duration,
                 frame_skip=frame_skip,
-                target_width=target_width
+                target_width=target_width,
+                scorer=scorer,
+                keep_frames=scorer is None or (cfg.DEBUG_MODE and cfg.DEBUG_SAVE_FRAME_STREAM),
+                face_bbox=face_bbox,
+                dedup_threshold=cfg.CAPTURE_DEDUP_THRESHOLD if cfg.CAPTURE_DEDUP_ENABLED else 0.0,
+                dedup_max_skip=cfg.CAPTURE_DEDUP_MAX_SKIP,
+                frame_store=JpegFrameStore(cfg.CAPTURE_JPEG_QUALITY, cfg.CAPTURE_JPEG_WORKERS,
+                                           session_stats['jpeg_store']) if cfg.CAPTURE_JPEG_STORE else None
             )
             capture_time = (time.perf_counter() - t0) * 1000
             timing_stats['capture'].append(capture_time)
-            session_stats['frames_captured'] += len(capture.frames)
-            
-            # =================================================================
-            # PHASE 3: Score frames and select best
-            # =================================================================
-            t0 = time.perf_counter()
-            best_frame_hires, best_frame_lowres, best_score, scored_frames = select_best_frame(
-                capture,
-                skip_start=cfg.FRAMES_SKIP_START,
-                skip_end=cfg.FRAMES_SKIP_END
-            )
-            scoring_time = (time.perf_counter() - t0) * 1000
-            timing_stats['scoring'].append(scoring_time)
-            session_stats['frames_scored'] += len(scored_frames)
-            
-            logger.info(f"Best frame score: {best_score.total:.0f}/1000 "
-                        f"(sharp={best_score.sharpness:.2f}, frontal={best_score.frontality:.2f}, "
-                        f"size={best_score.face_size:.2f}, yaw={best_score.yaw:.1f}°)")
+            session_stats['frames_captured'] += capture.frame_count
+            session_stats['frames_deduped'] += capture.frames_deduped
+            if isinstance(scorer, MultiFaceBurstScorer):
+                captures = split_capture(capture, scorer)
+                session_stats['multi_face_bursts'] += 1
+            else:
+                captures = [capture]
+            for person in captures:
+                session_stats['burst_stops'][person.stop_reason] += 1
             
             # =================================================================
-            # QUALITY GATE: Check if best frame meets minimum quality
+            # PHASE 3: Score frames and select best (per person)
             # =================================================================
-            if best_score.total < min_quality_score:
-                logger.warning(f"Best quality score {best_score.total:.0f} below threshold "
-                              f"{min_quality_score:.0f} - skipping recognition")
+            people = []
+            for capture, (_, _, track) in zip(captures, targets):
+                t0 = time.perf_counter()
+                best_frame_hires, best_frame_lowres, best_score, scored_frames = select_best_frame(
+                    capture,
+                    skip_start=cfg.FRAMES_SKIP_START,
+                    skip_end=cfg.FRAMES_SKIP_END,
+                    min_quality_score=min_quality_score if cfg.QUALITY_EARLY_EXIT else None,
+                    top_n=fusion_pool if cfg.QUALITY_EARLY_EXIT else None,
+                    workers=scoring_workers,
+                    scoring_mode=scoring_mode,
+                    locator=locator
+                )
+                scoring_time = (time.perf_counter() - t0) * 1000
+                timing_stats['scoring'].append(scoring_time)
+                if capture.scorer is not None:
+                    session_stats['frames_scored'] += capture.scorer.frames_with_face
+                else:
+                    session_stats['frames_scored'] += len(scored_frames)
+                if locator is not None:
+                    session_stats['local_detection']['window'] += locator.window_hits
+                    session_stats['local_detection']['full'] += locator.full_searches
                 
-                if debug_mode and scored_frames:
-                    generate_debug_report(
-                        capture=capture,
-                        scored_frames=scored_frames,
-                        best_score=best_score,
-                        visitor_result="LOW_QUALITY",
-                        visitor_id=0,
-                        det_score=None,
-                        api_sent=False
-                    )
-                    save_debug_frame_stream(
-                        capture=capture,
-                        visitor_result="LOW_QUALITY",
-                        visitor_id=0,
-                        scored_frames=scored_frames
-                    )
+                # Move the track to where the face was last seen in the burst
+                if track is not None:
+                    if capture.scorer is not None:
+                        last_bbox = capture.scorer.last_bbox
+                    elif len(scored_frames):
+                        last_bbox = tuple(scored_frames.rows['bbox'][np.argmax(scored_frames.rows['frame_idx'])])
+                    else:
+                        last_bbox = None
+                    tracker.record_capture(track, last_bbox, time.time())
                 
-                last_capture_time = time.time()
-                continue
+                people.append((capture, track, best_score, scored_frames, scoring_time))
             
-            # =================================================================
-            # PHASE 4: Multi-frame embedding fusion
-            # =================================================================
-            # Extract embeddings from top N frames (above quality threshold)
-            # and compute soft-weighted average for more robust recognition
-            t0 = time.perf_counter()
-            fused_embedding, fusion_details, api_frame, api_bbox = compute_fused_embedding(
-                scored_frames=scored_frames,
-                min_quality_score=min_quality_score,
-                min_detection_score=min_detection_score,
-                top_n=cfg.EMBEDDING_FUSION_TOP_N,
-                weight_power=cfg.EMBEDDING_FUSION_WEIGHT_POWER
-            )
-            recognition_time = (time.perf_counter() - t0) * 1000
-            timing_stats['recognition'].append(recognition_time)
+            # All faces of a multi-face burst go through recognition in one batch
+            batch_time = 0.0
+            if len(people) > 1:
+                t0 = time.perf_counter()
+                n_embedded = embed_sessions_batched([p[3] for p in people], min_quality_score)
+                batch_time = (time.perf_counter() - t0) * 1000
+                logger.debug(f"Embedded {n_embedded} frames of {len(people)} faces in one batch "
+                             f"({batch_time:.0f}ms)")
             
-            if fused_embedding is None:
-                logger.warning("No valid frames for embedding fusion (all failed quality/detection gates)")
+            for k, (capture, track, best_score, scored_frames, scoring_time) in enumerate(people):
+                # Speculative response for this burst (bounded by the API timeout).
+                # Once sent, it must be used or superseded - the server has acted on it.
+                # (speculative identify follows the largest face only)
+                spec_result = None
+                if k == 0 and capture.scorer is not None and speculative is not None:
+                    spec_result = speculative.result()
+                
+                if len(people) > 1:
+                    logger.info(f"Face {k + 1}/{len(people)}"
+                                + (f" (track #{track.track_id})" if track is not None else "") + ":")
+                logger.info(f"Best frame score: {best_score.total:.0f}/1000 "
+                            f"(sharp={best_score.sharpness:.2f}, frontal={best_score.frontality:.2f}, "
+                            f"size={best_score.face_size:.2f}, yaw={best_score.yaw:.1f}°)")
                 
-                if debug_mode and scored_frames:
-                    generate_debug_report(
-                        capture=capture,
+                # =================================================================
+                # QUALITY GATE: Check if best frame meets minimum quality
+                # =================================================================
+                if spec_result is None and best_score.total < min_quality_score:
+                    logger.warning(f"Best quality score {best_score.total:.0f} below threshold "
+                                  f"{min_quality_score:.0f} - skipping recognition")
+                    
+                    if debug_mode and scored_frames:
+                        generate_debug_report(
+                            capture=capture,
+                            scored_frames=scored_frames,
+                            best_score=best_score,
+                            visitor_result="LOW_QUALITY",
+                            visitor_id=0,
+                            det_score=None,
+                            api_sent=False
+                        )
+                        save_debug_frame_stream(
+                            capture=capture,
+                            visitor_result="LOW_QUALITY",
+                            visitor_id=0,
+                            scored_frames=scored_frames
+                        )
+                    
+                    last_capture_time = time.time()
+                    continue
+                
+                # =================================================================
+                # PHASE 4: Multi-frame embedding fusion
+                # =================================================================
+                # Extract embeddings from top N frames (above quality threshold)
+                # and compute soft-weighted average for more robust recognition
+                # A confident speculative result is final - no fusion needed
+                t0 = time.perf_counter()
+                if spec_result is not None and spec_result.confident:
+                    fused_embedding, fusion_details, api_frame, api_bbox = None, [], None, None
+                else:
+                    fused_embedding, fusion_details, api_frame, api_bbox = compute_fused_embedding(
                         scored_frames=scored_frames,
-                        best_score=best_score,
-                        visitor_result="NO_VALID_FRAMES",
-                        visitor_id=0,
-                        det_score=None,
-                        api_sent=False
-                    )
-                    save_debug_frame_stream(
-                        capture=capture,
-                        visitor_result="NO_VALID_FRAMES",
-                        visitor_id=0,
-                        scored_frames=scored_frames
+                        min_quality_score=min_quality_score,
+                        min_detection_score=min_detection_score,
+                        top_n=cfg.EMBEDDING_FUSION_TOP_N,
+                        weight_power=cfg.EMBEDDING_FUSION_WEIGHT_POWER,
+                        workers=scoring_workers,
+                        selection=fusion_selection
                     )
+                recognition_time = (time.perf_counter() - t0) * 1000 + batch_time / len(people)
+                timing_stats['recognition'].append(recognition_time)
                 
-                last_capture_time = time.time()
-                continue
-            
-            # Log fusion details
-            n_fused = len(fusion_details)
-            weights_str = ", ".join([f"{w:.2f}" for _, _, w in fusion_details])
-            scores_str = ", ".join([f"{s:.0f}" for s, _, _ in fusion_details])
-            det_scores_str = ", ".join([f"{d:.2f}" for _, d, _ in fusion_details])
-            logger.info(f"Fused {n_fused} embeddings: scores=[{scores_str}], "
-                       f"det=[{det_scores_str}], weights=[{weights_str}]")
-            
-            # Use average det_score for logging/debug
-            avg_det_score = sum(d for _, d, _ in fusion_details) / n_fused
-            
-            # =================================================================
-            # PHASE 5: Send to server for identification
-            # =================================================================
-            # Server performs matching and decides new vs returning
-            # Use lowres frame for the image upload (smaller file size)
-            logger.debug(f"Average detection confidence: {avg_det_score:.3f}")
-            api_response = api.identify(fused_embedding, api_frame, api_bbox)
-            
-            if api_response.success:
-                visitor_id = api_response.customer_id
+                if fused_embedding is None and spec_result is None:
+                    logger.warning("No valid frames for embedding fusion (all failed quality/detection gates)")
+                    
+                    if debug_mode and scored_frames:
+                        generate_debug_report(
+                            capture=capture,
+                            scored_frames=scored_frames,
+                            best_score=best_score,
+                            visitor_result="NO_VALID_FRAMES",
+                            visitor_id=0,
+                            det_score=None,
+                            api_sent=False
+                        )
+                        save_debug_frame_stream(
+                            capture=capture,
+                            visitor_result="NO_VALID_FRAMES",
+                            visitor_id=0,
+                            scored_frames=scored_frames
+                        )
+                    
+                    last_capture_time = time.time()
+                    continue
                 
-                if api_response.status == "returning":
-                    visitor_result = "RETURNING"
-                    logger.info(f"  → RETURNING visitor #{visitor_id} "
-                               f"(similarity: {api_response.similarity:.3f}, "
-                               f"visit #{api_response.visit_count})")
-                    session_stats['returning_visitors'] += 1
+                if fusion_details:
+                    # Log fusion details
+                    n_fused = len(fusion_details)
+                    weights_str = ", ".join([f"{w:.2f}" for _, _, w in fusion_details])
+                    scores_str = ", ".join([f"{s:.0f}" for s, _, _ in fusion_details])
+                    det_scores_str = ", ".join([f"{d:.2f}" for _, d, _ in fusion_details])
+                    logger.info(f"Fused {n_fused} embeddings: scores=[{scores_str}], "
+                               f"det=[{det_scores_str}], weights=[{weights_str}]")
+                    
+                    # Use average det_score for logging/debug
+                    avg_det_score = sum(d for _, d, _ in fusion_details) / n_fused
                 else:
-                    visitor_result = "NEW"
-                    logger.info(f"  → NEW visitor #{visitor_id} enrolled")
-                    session_stats['new_visitors'] += 1
-            else:
-                visitor_result = "ERROR"
-                visitor_id = 0
-                logger.error(f"  → API error: {api_response.message}")
-            
-            # =================================================================
-            # DEBUG: Generate report if enabled
-            # =================================================================
-            generate_debug_report(
-                capture=capture,
-                scored_frames=scored_frames,
-                best_score=best_score,
-                visitor_result=visitor_result,
-                visitor_id=visitor_id,
-                det_score=avg_det_score,
-                api_sent=True
-            )
-            save_debug_frame_stream(
-                capture=capture,
-                visitor_result=visitor_result,
-                visitor_id=visitor_id,
-                scored_frames=scored_frames
-            )
-            
-            # Update cooldown
-            last_capture_time = time.time()
-            
-            # Calculate total time for this detection
-            total_time = detection_time + capture_time + scoring_time + recognition_time
-            timing_stats['total'].append(total_time)
-            
-            # Trim timing stats
-            for key in timing_stats:
-                if len(timing_stats[key]) > stats_window:
-                    timing_stats[key] = timing_stats[key][-stats_window:]
-            
-            # Log current stats
-            logger.debug(f"  Timing: detect={detection_time:.0f}ms, capture={capture_time:.0f}ms, "
-                        f"score={scoring_time:.0f}ms, recog={recognition_time:.0f}ms")
+                    avg_det_score = spec_result.det_score
                 
+                # =================================================================
+                # PHASE 5: Send to server for identification
+                # =================================================================
+                # Server performs matching and decides new vs returning
+                # Use lowres frame for the image upload (smaller file size)
+                logger.debug(f"Average detection confidence: {avg_det_score:.3f}")
+                if spec_result is not None:
+                    spec_stats = session_stats['speculative']
+                    spec_stats['results'] += 1
+                    if fused_embedding is None or not speculative.needs_refinement(spec_result, fused_embedding):
+                        # Speculative result stands - it arrived before the fused path finished
+                        api_response = spec_result.response
+                        time_to_identify = spec_result.latency_ms
+                        spec_stats['confident' if spec_result.confident else 'confirmed'] += 1
+                        spec_stats['saved_ms'].append((time.perf_counter() - trigger_time) * 1000 - time_to_identify)
+                        logger.info(f"Speculative result stands (frame {spec_result.frame_idx}, "
+                                    f"{'confident' if spec_result.confident else 'confirmed by fusion'}, "
+                                    f"{time_to_identify:.0f}ms)")
+                    else:
+                        api_response = api.identify(fused_embedding, api_frame, api_bbox,
+                                                    supersedes=spec_result.response)
+                        time_to_identify = (time.perf_counter() - trigger_time) * 1000
+                        spec_stats['refined'] += 1
+                        logger.info(f"Refined speculative {spec_result.response.status} "
+                                    f"#{spec_result.response.customer_id} with fused embedding")
+                else:
+                    api_response = api.identify(fused_embedding, api_frame, api_bbox)
+                    time_to_identify = (time.perf_counter() - trigger_time) * 1000
+                timing_stats['time_to_identify'].append(time_to_identify)
+                
+                if api_response.success:
+                    visitor_id = api_response.customer_id
+                    session_stats['identifications'] += 1
+                    if track is not None:
+                        tracker.mark_identified(track, visitor_id)
+                    
+                    if api_response.status == "returning":
+                        visitor_result = "RETURNING"
+                        logger.info(f"  → RETURNING visitor #{visitor_id} "
+                                   f"(similarity: {api_response.similarity:.3f}, "
+                                   f"visit #{api_response.visit_count})")
+                        session_stats['returning_visitors'] += 1
+                    else:
+                        visitor_result = "NEW"
+                        logger.info(f"  → NEW visitor #{visitor_id} enrolled")
+                        session_stats['new_visitors'] += 1
+                else:
+                    visitor_result = "ERROR"
+                    visitor_id = 0
+                    logger.error(f"  → API error: {api_response.message}")
+                
+                # =================================================================
+                # DEBUG: Generate report if enabled
+                # =================================================================
+                generate_debug_report(
+                    capture=capture,
+                    scored_frames=scored_frames,
+                    best_score=best_score,
+                    visitor_result=visitor_result,
+                    visitor_id=visitor_id,
+                    det_score=avg_det_score,
+                    api_sent=True
+                )
+                save_debug_frame_stream(
+                    capture=capture,
+                    visitor_result=visitor_result,
+                    visitor_id=visitor_id,
+                    scored_frames=scored_frames
+                )
+                
+                # Update cooldown
+                last_capture_time = time.time()
+                
+                # Calculate total time for this detection
+                total_time = detection_time + capture_time + scoring_time + recognition_time
+                timing_stats['total'].append(total_time)
+                
+                # Trim timing stats
+                for key in timing_stats:
+                    if len(timing_stats[key]) > stats_window:
+                        timing_stats[key] = timing_stats[key][-stats_window:]
+                
+                # Log current stats
+                logger.debug(f"  Timing: detect={detection_time:.0f}ms, capture={capture_time:.0f}ms, "
+                            f"score={scoring_time:.0f}ms, recog={recognition_time:.0f}ms, "
+                            f"time-to-identify={time_to_identify:.0f}ms")
+                    
     except KeyboardInterrupt:
         logger.info("\nStopping visitor counter...")
     finally:
         cap.release()
+        if speculative is not None:
+            speculative.close()
         
         # Final summary
         logger.info("\n" + "=" * 70)
@@ -1013,16 +1670,53 @@ def run_visitor_counter(
         logger.info(f"Returning visitors:    {session_stats['returning_visitors']}")
         logger.info(f"Frames captured:       {session_stats['frames_captured']}")
         logger.info(f"Frames scored:         {session_stats['frames_scored']}")
+        burst_frames = session_stats['frames_captured'] + session_stats['frames_deduped']
+        if burst_frames > 0:
+            logger.info(f"Near-duplicates:       {session_stats['frames_deduped']} dropped before scoring "
+                        f"({session_stats['frames_deduped'] / burst_frames * 100:.0f}% of burst frames)")
+        skipped = session_stats['prefilter_skipped']
+        if any(skipped.values()):
+            logger.info(f"Prefilter skipped:     {sum(skipped.values())} frames ("
+                        + ", ".join(f"{n} {reason}" for reason, n in skipped.items()) + ")")
+        if session_stats['jpeg_store'].frames:
+            logger.info(f"JPEG frame store:      {session_stats['jpeg_store'].summary()}")
+        if session_stats['multi_face_bursts']:
+            logger.info(f"Multi-face bursts:     {session_stats['multi_face_bursts']}")
+        located = session_stats['local_detection']
+        if located['window'] + located['full']:
+            logger.info(f"Bbox-local detection:  {located['window']}/{located['window'] + located['full']} "
+                        f"burst frames found in the window, {located['full']} full-frame searches")
+        stops = session_stats['burst_stops']
+        logger.info(f"Burst stops:           {stops['quality']} quality, {stops['face_lost']} face lost, "
+                    f"{stops['identified']} identified, {stops['duration']} full duration")
+        spec_stats = session_stats['speculative']
+        if spec_stats['results']:
+            hits = spec_stats['confident'] + spec_stats['confirmed']
+            saved = spec_stats['saved_ms']
+            logger.info(f"Speculative identify:  {hits}/{spec_stats['results']} early hits "
+                        f"({spec_stats['confident']} confident, {spec_stats['confirmed']} confirmed), "
+                        f"{spec_stats['refined']} refined"
+                        + (f", {sum(saved) / len(saved):.0f} ms saved per hit" if saved else ""))
         
         total_visitors = session_stats['new_visitors'] + session_stats['returning_visitors']
         logger.info(f"\nTotal visitors this session: {total_visitors}")
         
+        elapsed_min = (time.time() - session_stats['start_time']) / 60
+        if elapsed_min > 0:
+            logger.info(f"Throughput: {session_stats['identifications'] / elapsed_min:.2f} identifications/min")
+            if tracker is not None:
+                logger.info(f"Tracks: {tracker.tracks_created} ({tracker.tracks_created / elapsed_min:.2f}/min), "
+                            f"identifications avoided: {tracker.identifications_avoided}")
+            if tracker is not None and tracker.entry_line is not None:
+                logger.info(f"Entry line: {tracker.entries} tracks crossed, {tracker.inside_starts} appeared inside, "
+                            f"{tracker.triggers_suppressed} triggers suppressed (tracks that never got past it)")
+        
         if timing_stats['total']:
             logger.info("\nTIMING (averages):")
-            for key in ['detection', 'capture', 'scoring', 'recognition', 'total']:
+            for key in ['detection', 'capture', 'scoring', 'recognition', 'total', 'time_to_identify']:
                 if timing_stats[key]:
                     avg = sum(timing_stats[key]) / len(timing_stats[key])
-                    logger.info(f"  {key.capitalize():12}: {avg:.1f} ms")
+                    logger.info(f"  {key.replace('_', ' ').capitalize():16}: {avg:.1f} ms")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Face Recognition Worker")
@@ -1062,7 +1756,17 @@ if __name__ == "__main__":
             'similarity_threshold': cfg.SIMILARITY_THRESHOLD,
             'cooldown_seconds': cfg.COOLDOWN_SECONDS,
             'min_quality_score': cfg.MIN_QUALITY_SCORE,
-            'min_detection_score': cfg.MIN_DETECTION_SCORE
+            'min_detection_score': cfg.MIN_DETECTION_SCORE,
+            'scoring_workers': cfg.SCORING_WORKERS,
+            'scoring_mode': cfg.QUALITY_SCORING_MODE,
+            'fusion_selection': cfg.EMBEDDING_FUSION_SELECTION,
+            'entry_line': cfg.ENTRY_LINE,
+            'ort_intra_op_threads': cfg.ORT_INTRA_OP_THREADS,
+            'ort_inter_op_threads': cfg.ORT_INTER_OP_THREADS,
+            'ort_execution_mode': cfg.ORT_EXECUTION_MODE,
+            'ort_graph_optimization': cfg.ORT_GRAPH_OPTIMIZATION,
+            'ort_memory_arena': cfg.ORT_MEMORY_ARENA,
+            'ort_spin_wait': cfg.ORT_SPIN_WAIT
         }
         webcam_config = CameraConfig(
             id="webcam",
@@ -0,0 +1,88 @@
+import type { VercelRequest, VercelResponse } from '@vercel/node';
+import { drizzle } from 'drizzle-orm/node-postgres';
+import { Pool } from 'pg';
+import { pgTable, serial, text, integer, timestamp, uniqueIndex } from 'drizzle-orm/pg-core';
+
+// Inline schema
+const footfallCounts = pgTable('footfall_counts', {
+  id: serial('id').primaryKey(),
+  locationId: integer('location_id').notNull(),
+  cameraId: text('camera_id').notNull(),
+  periodStart: timestamp('period_start').notNull(),
+  periodEnd: timestamp('period_end').notNull(),
+  entries: integer('entries').notNull().default(0),
+  exits: integer('exits').notNull().default(0),
+}, (table) => [
+  uniqueIndex('footfall_counts_period_idx').on(table.locationId, table.cameraId, table.periodStart),
+]);
+
+// Inline DB connection
+const pool = new Pool({
+  connectionString: process.env.DATABASE_URL,
+  max: 1,
+});
+const db = drizzle(pool);
+
+const EDGE_API_KEY = process.env.EDGE_API_KEY;
+
+export default async function handler(
+  req: VercelRequest,
+  res: VercelResponse
+) {
+  // Only allow POST
+  if (req.method !== 'POST') {
+    return res.status(405).json({ message: 'Method not allowed' });
+  }
+
+  // Verify API key
+  const apiKey = req.headers['x-api-key'];
+  if (!EDGE_API_KEY || apiKey !== EDGE_API_KEY) {
+    return res.status(401).json({ success: false, message: 'Invalid API key' });
+  }
+
+  try {
+    const { locationId, cameraId, periods } = req.body;
+
+    // Validate required fields
+    if (!locationId || !cameraId || !Array.isArray(periods)) {
+      return res.status(400).json({
+        success: false,
+        message: 'locationId, cameraId and periods are required'
+      });
+    }
+
+    const counts = periods.map((p: any) => ({
+      locationId: parseInt(locationId),
+      cameraId: String(cameraId),
+      periodStart: new Date(p.start),
+      periodEnd: new Date(p.end),
+      entries: Math.max(0, parseInt(p.entries) || 0),
+      exits: Math.max(0, parseInt(p.exits) || 0),
+    }));
+    if (counts.some(c => isNaN(c.periodStart.getTime()) || isNaN(c.periodEnd.getTime()))) {
+      return res.status(400).json({ success: false, message: 'Invalid period start/end' });
+    }
+
+    // Periods already stored (resent after a failed response) are skipped
+    let stored = 0;
+    if (counts.length > 0) {
+      const inserted = await db.insert(footfallCounts).values(counts)
+        .onConflictDoNothing({
+          target: [footfallCounts.locationId, footfallCounts.cameraId, footfallCounts.periodStart],
+        })
+        .returning({ id: footfallCounts.id });
+      stored = inserted.length;
+    }
+    console.log(`[EDGE] Footfall ${cameraId}: ${stored} period(s)`
+      + (stored < counts.length ? ` (${counts.length - stored} already stored)` : ''));
+
+    return res.json({ success: true, stored });
+
+  } catch (error) {
+    console.error('[EDGE] Counts error:', error);
+    return res.status(500).json({
+      success: false,
+      message: error instanceof Error ? error.message : 'Internal server error'
+    });
+  }
+}
@@ -2,7 +2,7 @@ import type { VercelRequest, VercelResponse } from '@vercel/node';
 import { drizzle } from 'drizzle-orm/node-postgres';
 import { Pool } from 'pg';
 import { pgTable, serial, text, integer, timestamp } from 'drizzle-orm/pg-core';
-import { eq } from 'drizzle-orm';
+import { and, eq } from 'drizzle-orm';
 import { createClient } from '@supabase/supabase-js';
 
 // Inline schema
@@ -130,7 +130,7 @@ export default async function handler(
   }
 
   try {
-    const { embedding, imageBase64, locationId } = req.body;
+    const { embedding, imageBase64, locationId, supersedes } = req.body;
 
     // Validate required fields
     if (!embedding || !Array.isArray(embedding)) {
@@ -161,8 +161,32 @@ export default async function handler(
       .from(customers)
       .where(eq(customers.locationId, locId));
 
+    // Refinement of an earlier (speculative) result for the same person:
+    // revert that result first, then match the refined embedding as usual.
+    // A visitor the earlier request enrolled is excluded from matching - it is
+    // deleted if the refined embedding matches someone else, or reused (same ID)
+    // if the visitor is still new. A counted visit is taken back.
+    let supersededId: number | null = null;
+    let candidates = allCustomers;
+    if (supersedes && supersedes.customerId) {
+      const previousId = parseInt(supersedes.customerId);
+      const previous = allCustomers.find(c => c.id === previousId);
+      if (previous && supersedes.status === 'new') {
+        supersededId = previousId;
+        candidates = allCustomers.filter(c => c.id !== previousId);
+      } else if (previous && supersedes.status === 'returning') {
+        previous.points = Math.max((previous.points || 0) - 1, 0);
+        await db
+          .update(customers)
+          .set({ points: previous.points })
+          .where(eq(customers.id, previousId));
+      }
+      console.log(`[EDGE] Superseding ${supersedes.status} result for customer #${previousId}`);
+    }
+    const superseded = Boolean(supersedes && supersedes.customerId);
+
     // Find best match using cosine similarity
-    const match = findBestMatch(embedding, allCustomers, SIMILARITY_THRESHOLD);
+    const match = findBestMatch(embedding, candidates, SIMILARITY_THRESHOLD);
 
     if (match) {
       // Returning customer - increment visit count
@@ -179,12 +203,46 @@ export default async function handler(
 
       console.log(`[EDGE] Returning customer #${match.id} (similarity: ${match.similarity.toFixed(3)}, visits: ${newPoints})`);
 
+      // The speculatively enrolled visitor was a duplicate of this customer
+      if (supersededId !== null) {
+        await db
+          .delete(customers)
+          .where(and(eq(customers.id, supersededId), eq(customers.locationId, locId)));
+        console.log(`[EDGE] Removed superseded customer #${supersededId}`);
+      }
+
       return res.json({
         success: true,
         status: 'returning',
         customerId: match.id,
         visitCount: newPoints,
-        similarity: match.similarity
+        similarity: match.similarity,
+        superseded
+      });
+    } else if (supersededId !== null) {
+      // Still a new visitor - keep the enrolled record, store the refined embedding
+      const previous = allCustomers.find(c => c.id === supersededId);
+      const photoUrl = imageBase64 && previous
+        ? await uploadImage(imageBase64, previous.faceId)
+        : null;
+
+      await db
+        .update(customers)
+        .set({
+          embedding: JSON.stringify(embedding),
+          ...(photoUrl ? { photoUrl } : {}),
+          lastSeen: new Date()
+        })
+        .where(eq(customers.id, supersededId));
+
+      console.log(`[EDGE] Refined embedding for new customer #${supersededId}`);
+
+      return res.json({
+        success: true,
+        status: 'new',
+        customerId: supersededId,
+        visitCount: previous?.points || 1,
+        superseded
       });
     } else {
       // New customer - create record with embedding
@@ -212,7 +270,8 @@ export default async function handler(
         success: true,
         status: 'new',
         customerId: newCustomer.id,
-        visitCount: 1
+        visitCount: 1,
+        superseded
       });
     }
   } catch (error) {
@@ -2,7 +2,7 @@ import { eq, desc } from 'drizzle-orm';
 import { db } from './db';
 import { 
   users, videoClips, customers, reviews, inventoryItems, notifications,
-  locations, cameras
+  locations, cameras, footfallCounts
 } from '../shared/schema';
 import type {
   User, InsertUser,
@@ -12,7 +12,8 @@ import type {
   InventoryItem, InsertInventoryItem,
   Notification, InsertNotification,
   Location, InsertLocation,
-  Camera, InsertCamera
+  Camera, InsertCamera,
+  FootfallCount, InsertFootfallCount
 } from "../shared/schema";
 import type { IStorage } from './storage';
 
@@ -171,6 +172,25 @@ export class DatabaseStorage implements IStorage {
     return result[0];
   }
 
+  async decrementCustomerPoints(id: number): Promise<Customer | undefined> {
+    const customer = await this.getCustomerById(id);
+    if (!customer) return undefined;
+    
+    const result = await db.update(customers)
+      .set({ points: Math.max(customer.points - 1, 0) })
+      .where(eq(customers.id, id))
+      .returning();
+    return result[0];
+  }
+
+  async updateCustomerEmbedding(id: number, embedding: string, photoUrl?: string | null): Promise<Customer | undefined> {
+    const result = await db.update(customers)
+      .set({ embedding, lastSeen: new Date(), ...(photoUrl ? { photoUrl } : {}) })
+      .where(eq(customers.id, id))
+      .returning();
+    return result[0];
+  }
+
   async updateCustomerName(id: number, name: string | null): Promise<Customer | undefined> {
     const result = await db.update(customers)
       .set({ name })
@@ -274,6 +294,17 @@ export class DatabaseStorage implements IStorage {
   async markAllNotificationsAsRead(): Promise<void> {
     await db.update(notifications).set({ isRead: true });
   }
+
+  // Footfall count methods
+  // Periods already stored (resent after a failed response) are skipped; returns the new rows
+  async createFootfallCounts(counts: InsertFootfallCount[]): Promise<FootfallCount[]> {
+    if (counts.length === 0) return [];
+    return db.insert(footfallCounts).values(counts)
+      .onConflictDoNothing({
+        target: [footfallCounts.locationId, footfallCounts.cameraId, footfallCounts.periodStart],
+      })
+      .returning();
+  }
 }
 
 // Seed data function for initial database setup
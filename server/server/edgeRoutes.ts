@@ -74,21 +74,31 @@ export function registerEdgeRoutes(app: Application, storage: IStorage) {
    * {
    *   "embedding": [0.1, 0.2, ...],  // 512 floats
    *   "imageBase64": "...",          // Face image (optional)
-   *   "locationId": 1
+   *   "locationId": 1,
+   *   "supersedes": {                // Optional: earlier result for the same person
+   *     "customerId": 122,
+   *     "status": "new" | "returning"
+   *   }
    * }
    * 
+   * With supersedes, the earlier (speculative) result is reverted before
+   * matching: a visitor it enrolled is excluded from matching and deleted if
+   * the refined embedding matches someone else (or kept, with the refined
+   * embedding, if still new); a visit it counted is taken back.
+   * 
    * Response:
    * {
    *   "success": true,
    *   "status": "new" | "returning",
    *   "customerId": 123,
    *   "visitCount": 5,
-   *   "similarity": 0.87  // Only for returning customers
+   *   "similarity": 0.87,  // Only for returning customers
+   *   "superseded": false  // True if an earlier result was reverted
    * }
    */
   app.post("/api/edge/identify", requireApiKey, async (req: Request, res: Response) => {
     try {
-      const { embedding, imageBase64, locationId } = req.body;
+      const { embedding, imageBase64, locationId, supersedes } = req.body;
       
       // Validate required fields
       if (!embedding || !Array.isArray(embedding)) {
@@ -107,12 +117,27 @@ export function registerEdgeRoutes(app: Application, storage: IStorage) {
       
       // Get all customers with embeddings for this location
       const customers = await storage.getAllCustomers(parseInt(locationId));
-      const customersWithEmbeddings = customers.map((c: { id: number; faceId: string; embedding: string | null }) => ({
+      let customersWithEmbeddings = customers.map((c: { id: number; faceId: string; embedding: string | null }) => ({
         id: c.id,
         faceId: c.faceId,
         embedding: c.embedding
       }));
       
+      // Revert an earlier (speculative) result for the same person
+      let supersededId: number | null = null;
+      if (supersedes && supersedes.customerId) {
+        const previousId = parseInt(supersedes.customerId);
+        const previous = customers.find((c: { id: number }) => c.id === previousId);
+        if (previous && supersedes.status === "new") {
+          supersededId = previousId;
+          customersWithEmbeddings = customersWithEmbeddings.filter(c => c.id !== previousId);
+        } else if (previous && supersedes.status === "returning") {
+          await storage.decrementCustomerPoints(previousId);
+        }
+        console.log(`[EDGE] Superseding ${supersedes.status} result for customer #${previousId}`);
+      }
+      const superseded = Boolean(supersedes && supersedes.customerId);
+      
       // Find best match using cosine similarity
       const match = findBestMatch(embedding, customersWithEmbeddings, SIMILARITY_THRESHOLD);
       
@@ -129,12 +154,34 @@ export function registerEdgeRoutes(app: Application, storage: IStorage) {
         
         console.log(`[EDGE] Returning customer #${match.id} (similarity: ${match.similarity.toFixed(3)}, visits: ${updatedCustomer.points})`);
         
+        // The speculatively enrolled visitor was a duplicate of this customer
+        if (supersededId !== null) {
+          await storage.deleteCustomer(supersededId);
+          console.log(`[EDGE] Removed superseded customer #${supersededId}`);
+        }
+        
         return res.json({
           success: true,
           status: "returning",
           customerId: updatedCustomer.id,
           visitCount: updatedCustomer.points,
-          similarity: match.similarity
+          similarity: match.similarity,
+          superseded
+        });
+      } else if (supersededId !== null) {
+        // Still a new visitor - keep the enrolled record, store the refined embedding
+        const previous = customers.find((c: { id: number; faceId: string }) => c.id === supersededId);
+        const photoUrl = imageBase64 && previous ? saveBase64Image(imageBase64, previous.faceId) : null;
+        const customer = await storage.updateCustomerEmbedding(supersededId, JSON.stringify(embedding), photoUrl);
+        
+        console.log(`[EDGE] Refined embedding for new customer #${supersededId}`);
+        
+        return res.json({
+          success: true,
+          status: "new",
+          customerId: supersededId,
+          visitCount: customer?.points ?? 1,
+          superseded
         });
       } else {
         // New customer - create record with embedding
@@ -162,7 +209,8 @@ export function registerEdgeRoutes(app: Application, storage: IStorage) {
           success: true,
           status: "new",
           customerId: customer.id,
-          visitCount: 1
+          visitCount: 1,
+          superseded
         });
       }
       
@@ -175,6 +223,66 @@ export function registerEdgeRoutes(app: Application, storage: IStorage) {
     }
   });
 
+  /**
+   * POST /api/edge/counts
+   * 
+   * Anonymous footfall counts from people_count cameras (no embeddings, no images).
+   * The edge device batches line crossings per period; periods that could not be
+   * delivered are resent with the next report. A period already stored for the
+   * camera (same start) is skipped, so a resend after a lost response is not
+   * counted twice; "stored" is the number of new periods.
+   * 
+   * Request body:
+   * {
+   *   "locationId": 1,
+   *   "cameraId": "cam_exit",
+   *   "periods": [
+   *     { "start": "2024-01-01T10:00:00Z", "end": "2024-01-01T10:01:00Z", "entries": 3, "exits": 1 }
+   *   ]
+   * }
+   * 
+   * Response:
+   * { "success": true, "stored": 1 }
+   */
+  app.post("/api/edge/counts", requireApiKey, async (req: Request, res: Response) => {
+    try {
+      const { locationId, cameraId, periods } = req.body;
+      
+      if (!locationId || !cameraId || !Array.isArray(periods)) {
+        return res.status(400).json({
+          success: false,
+          message: "locationId, cameraId and periods are required"
+        });
+      }
+      
+      const counts = periods.map((p: any) => ({
+        locationId: parseInt(locationId),
+        cameraId: String(cameraId),
+        periodStart: new Date(p.start),
+        periodEnd: new Date(p.end),
+        entries: Math.max(0, parseInt(p.entries) || 0),
+        exits: Math.max(0, parseInt(p.exits) || 0),
+      }));
+      if (counts.some(c => isNaN(c.periodStart.getTime()) || isNaN(c.periodEnd.getTime()))) {
+        return res.status(400).json({ success: false, message: "Invalid period start/end" });
+      }
+      
+      const stored = await storage.createFootfallCounts(counts);
+      console.log(`[EDGE] Footfall ${cameraId}: ${stored.length} period(s), `
+        + `${stored.reduce((n, c) => n + c.entries, 0)} in / ${stored.reduce((n, c) => n + c.exits, 0)} out`
+        + (stored.length < counts.length ? ` (${counts.length - stored.length} already stored)` : ""));
+      
+      return res.json({ success: true, stored: stored.length });
+      
+    } catch (error) {
+      console.error("[EDGE] Counts error:", error);
+      res.status(500).json({ 
+        success: false, 
+        message: error instanceof Error ? error.message : "Internal server error" 
+      });
+    }
+  });
+
   /**
    * GET /api/edge/health
    * 
@@ -188,5 +296,5 @@ export function registerEdgeRoutes(app: Application, storage: IStorage) {
     });
   });
   
-  console.log("[EDGE] Edge device routes registered: /api/edge/identify, /api/edge/health");
+  console.log("[EDGE] Edge device routes registered: /api/edge/identify, /api/edge/counts, /api/edge/health");
 }
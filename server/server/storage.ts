@@ -11,7 +11,8 @@ import type {
   InventoryItem, InsertInventoryItem,
   Notification, InsertNotification,
   Location, InsertLocation,
-  Camera, InsertCamera
+  Camera, InsertCamera,
+  FootfallCount, InsertFootfallCount
 } from "../shared/schema";
 
 export interface IStorage {
@@ -49,6 +50,8 @@ export interface IStorage {
   getCustomerById(id: number): Promise<Customer | undefined>;
   createCustomer(customer: InsertCustomer): Promise<Customer>;
   incrementCustomerPoints(id: number): Promise<Customer | undefined>;
+  decrementCustomerPoints(id: number): Promise<Customer | undefined>;
+  updateCustomerEmbedding(id: number, embedding: string, photoUrl?: string | null): Promise<Customer | undefined>;
   updateCustomerName(id: number, name: string | null): Promise<Customer | undefined>;
   updateCustomerFlag(id: number, flag: string | null): Promise<Customer | undefined>;
   deleteCustomer(id: number): Promise<boolean>;
@@ -72,6 +75,9 @@ export interface IStorage {
   createNotification(notification: InsertNotification): Promise<Notification>;
   markNotificationAsRead(id: number): Promise<Notification | undefined>;
   markAllNotificationsAsRead(): Promise<void>;
+  
+  // Footfall counts (people_count edge cameras)
+  createFootfallCounts(counts: InsertFootfallCount[]): Promise<FootfallCount[]>;
 }
 
 // In-memory storage for development
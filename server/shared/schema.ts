@@ -1,4 +1,4 @@
-import { pgTable, text, serial, timestamp, integer, boolean } from "drizzle-orm/pg-core";
+import { pgTable, text, serial, timestamp, integer, boolean, uniqueIndex } from "drizzle-orm/pg-core";
 import { createInsertSchema } from "drizzle-zod";
 import { z } from "zod";
 
@@ -136,3 +136,24 @@ export const insertNotificationSchema = createInsertSchema(notifications)
   .omit({ id: true, createdAt: true });
 export type InsertNotification = z.infer<typeof insertNotificationSchema>;
 export type Notification = typeof notifications.$inferSelect;
+
+// Anonymous footfall counts reported by people_count edge cameras (line crossings per period).
+// One row per camera period: the edge resends periods whose report failed, so a
+// resend of an already stored period is ignored.
+export const footfallCounts = pgTable("footfall_counts", {
+  id: serial("id").primaryKey(),
+  locationId: integer("location_id").notNull().references(() => locations.id),
+  cameraId: text("camera_id").notNull(), // Edge camera ID from cameras.yaml
+  periodStart: timestamp("period_start").notNull(),
+  periodEnd: timestamp("period_end").notNull(),
+  entries: integer("entries").notNull().default(0),
+  exits: integer("exits").notNull().default(0),
+  createdAt: timestamp("created_at").defaultNow().notNull(),
+}, (table) => [
+  uniqueIndex("footfall_counts_period_idx").on(table.locationId, table.cameraId, table.periodStart),
+]);
+
+export const insertFootfallCountSchema = createInsertSchema(footfallCounts)
+  .omit({ id: true, createdAt: true });
+export type InsertFootfallCount = z.infer<typeof insertFootfallCountSchema>;
+export type FootfallCount = typeof footfallCounts.$inferSelect;